@@ -0,0 +1,11 @@
+from .harness import PROFILES, Profile, Suite, compare, measure
+from .stub import StubAnthropic
+
+__all__ = [
+    "PROFILES",
+    "Profile",
+    "Suite",
+    "compare",
+    "measure",
+    "StubAnthropic",
+]
@@ -0,0 +1,93 @@
+"""Run the benchmark suite and print the results as JSON.
+
+Usage:
+    python -m benchmarks [--profile quick|default|full] [--only PATTERN ...]
+                         [--output FILE] [--baseline FILE] [--threshold 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from . import bench_agent, bench_tools
+from .harness import PROFILES, Suite, compare
+
+SCHEMA_VERSION = 1
+
+
+def git_revision() -> dict[str, object]:
+    """Return the current commit and whether the tree has local changes."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=root, capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def main() -> int:
+    """Entry point for ``python -m benchmarks``."""
+    parser = argparse.ArgumentParser(description="Benchmark the tool layer and agent loop")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default",
+                        help="Amount of work: quick, default or full (adds 1 GB files)")
+    parser.add_argument("--only", nargs="+", metavar="PATTERN",
+                        help="Only run benchmarks whose names match these globs, e.g. 'read.*'")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Median slowdown that counts as a regression (default: 0.25)")
+    parser.add_argument("--workdir", help="Directory for generated files (default: a temp dir)")
+    args = parser.parse_args()
+
+    suite = Suite(PROFILES[args.profile], only=args.only)
+    workdir = tempfile.mkdtemp(prefix="assistant-bench-", dir=args.workdir)
+    try:
+        bench_tools.run(suite, workdir)
+        bench_agent.run(suite, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            **git_revision(),
+            "profile": args.profile,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": suite.results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("profile") != args.profile:
+            print("\nWarning: the baseline was recorded with a different profile.", file=sys.stderr)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import os
+
+from config.settings import Settings
+from llm.client import LLMClient
+from prompts.system import SYSTEM_PROMPT
+from tools import BashTool, EditTool, GlobTool, GrepTool, ReadTool, ToolRegistry, WriteTool
+
+from .bench_tools import EDIT_MARKERS, make_text_file
+from .harness import KB, Suite
+from .stub import StubAnthropic
+
+
+def make_client(workdir: str, script: list) -> LLMClient:
+    """An LLMClient with the standard tools whose API calls are answered by a stub."""
+    settings = Settings(
+        anthropic_api_key="benchmark",
+        model_name="stub-model",
+        max_tokens=1024,
+        temperature=0.0,
+    )
+    registry = ToolRegistry(max_workers=settings.max_tool_workers)
+    registry.register(ReadTool())
+    registry.register(WriteTool())
+    registry.register(EditTool())
+    registry.register(GlobTool(root=workdir))
+    registry.register(GrepTool(root=workdir))
+    registry.register(BashTool(persistent=settings.persistent_shell))
+    registry.freeze()
+
+    return LLMClient(settings, registry, transport=StubAnthropic(script))
+
+
+def bench_agent(suite: Suite, workdir: str) -> None:
+    """Full send_message turns against a stubbed API, from a plain reply to several tool rounds."""
+    names = ["agent.text_turn", "agent.multi_tool_turn", "agent.conversation[10]"]
+    if not any(suite.wants(name) for name in names):
+        return
+
+    project = os.path.join(workdir, "agent")
+    os.makedirs(project, exist_ok=True)
+    source = os.path.join(project, "notes.txt")
+    make_text_file(source, 64 * KB)
+    markers = list(EDIT_MARKERS)
+
+    # Read, Glob and Grep run together, then an edit, a command and the reply
+    multi_tool = [
+        ("tool_use", [
+            ("Read", {"path": source, "limit": 200}),
+            ("Glob", {"pattern": "**/*.txt", "path": project}),
+            ("Grep", {"pattern": "lazy dog", "path": project, "max_results": 20}),
+        ]),
+        ("tool_use", [("Edit", {"path": source, "old_str": markers[0], "new_str": markers[1]})]),
+        ("tool_use", [("Edit", {"path": source, "old_str": markers[1], "new_str": markers[0]})]),
+        ("tool_use", [("Bash", {"command": "wc -l notes.txt", "timeout": 30})]),
+        ("text", "Updated the notes and counted the lines."),
+    ]
+
+    text_client = make_client(project, [("text", "Hello! How can I help?")])
+    tool_client = make_client(project, multi_tool)
+    tool_client.tool_registry.execute("Bash", command=f"cd {project}")
+
+    def text_turn() -> None:
+        text_client.send_message("Hi there", SYSTEM_PROMPT)
+        text_client.clear_history()
+
+    def multi_tool_turn() -> None:
+        tool_client.send_message("Tidy up the notes file", SYSTEM_PROMPT)
+        tool_client.clear_history()
+
+    def conversation() -> None:
+        for _ in range(10):
+            tool_client.send_message("Tidy up the notes file", SYSTEM_PROMPT)
+        tool_client.clear_history()
+
+    try:
+        suite.time("agent.text_turn", text_turn)
+        suite.time("agent.multi_tool_turn", multi_tool_turn)
+        suite.time("agent.conversation[10]", conversation, repeat=3)
+    finally:
+        text_client.close()
+        tool_client.close()
+
+
+def run(suite: Suite, workdir: str) -> None:
+    """Run every agent-loop benchmark."""
+    bench_agent(suite, workdir)
@@ -0,0 +1,186 @@
+import os
+from typing import Any
+
+from tools import (
+    BaseTool,
+    BashTool,
+    DirectorySnapshot,
+    EditTool,
+    GlobTool,
+    GrepTool,
+    ReadTool,
+    ToolRegistry,
+    ToolResult,
+    TrigramIndex,
+)
+
+from .harness import Suite, size_label
+
+LINE = "{:08d} The quick brown fox jumps over the lazy dog; pack my box with five dozen liquor jugs.\n"
+EDIT_MARKERS = ("EDIT_MARKER_ALPHA", "EDIT_MARKER_OMEGA")
+
+
+class NoopTool(BaseTool):
+    """A tool that does nothing, to isolate dispatch overhead."""
+
+    name = "Noop"
+    description = "Do nothing."
+    parallel_safe = True
+
+    def get_schema(self) -> dict[str, Any]:
+        """Return the JSON schema for the Noop tool."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": {"type": "object", "properties": {"value": {"type": "integer"}}},
+        }
+
+    def execute(self, value: int = 0) -> ToolResult:
+        """Return immediately."""
+        return ToolResult(success=True, output="")
+
+
+def checked(result: ToolResult) -> ToolResult:
+    """Fail the benchmark if a tool call did not succeed."""
+    if not result.success:
+        raise RuntimeError(result.error)
+    return result
+
+
+def make_text_file(path: str, size: int) -> int:
+    """Write a text file of about ``size`` bytes with a unique edit marker near the end.
+
+    Returns the number of lines.
+    """
+    block = "".join(LINE.format(i) for i in range(16384)).encode()
+    tail = f"{EDIT_MARKERS[0]}\n{LINE.format(0)}".encode()
+    body = max(0, size - len(tail))
+    with open(path, "wb") as f:
+        written = 0
+        while written + len(block) <= body:
+            f.write(block)
+            written += len(block)
+        remainder = block[:body - written]
+        f.write(remainder[:remainder.rfind(b"\n") + 1])
+        f.write(tail)
+    with open(path, "rb") as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+
+def make_tree(root: str, files: int) -> None:
+    """Write a source-like tree of small text files, ten per directory."""
+    for i in range(files):
+        directory = os.path.join(root, f"pkg{i // 1000:02d}", f"mod{i // 10:04d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file{i:05d}.py"), "w") as f:
+            f.write(f"def function_{i}(value):\n    return value * {i}\n")
+            f.write("".join(LINE.format(j) for j in range(40)))
+            if i % 97 == 0:
+                f.write("RARE_SEARCH_TOKEN = True\n")
+
+
+def bench_registry(suite: Suite) -> None:
+    """Dispatch overhead of ToolRegistry.execute and execute_many."""
+    registry = ToolRegistry(max_workers=8)
+    registry.register(NoopTool())
+    registry.freeze()
+    calls = [("Noop", {"value": i}) for i in range(8)]
+
+    suite.time("registry.execute", lambda: registry.execute("Noop", value=1))
+    suite.time("registry.execute_many[1]", lambda: registry.execute_many(calls[:1]))
+    suite.time("registry.execute_many[8]", lambda: registry.execute_many(calls))
+    suite.time("registry.plan_batches[8]", lambda: registry.plan_batches(calls))
+    registry.close()
+
+
+def bench_read(suite: Suite, workdir: str) -> None:
+    """ReadTool on files of each profile size: first page, a deep page and the tail."""
+    tool = ReadTool()
+    for size in suite.profile.file_sizes:
+        label = size_label(size)
+        names = [f"read.{kind}[{label}]" for kind in ("first_page", "deep_page", "tail")]
+        if not any(suite.wants(name) for name in names):
+            continue
+        path = os.path.join(workdir, f"read_{label}.txt")
+        lines = make_text_file(path, size)
+        deep = max(1, lines - 1000)
+
+        suite.time(names[0], lambda: checked(tool.execute(path)))
+        suite.time(names[1], lambda: checked(tool.execute(path, offset=deep, limit=100)))
+        suite.time(names[2], lambda: checked(tool.execute(path, mode="tail", limit=100)))
+        os.remove(path)
+
+
+def bench_edit(suite: Suite, workdir: str) -> None:
+    """EditTool replacing a unique string near the end of files of each profile size."""
+    tool = EditTool()
+    for size in suite.profile.file_sizes:
+        label = size_label(size)
+        name = f"edit.replace[{label}]"
+        if not suite.wants(name):
+            continue
+        path = os.path.join(workdir, f"edit_{label}.txt")
+        make_text_file(path, size)
+        markers = list(EDIT_MARKERS)
+
+        def edit() -> None:
+            checked(tool.execute(path, old_str=markers[0], new_str=markers[1]))
+            markers.reverse()
+
+        suite.time(name, edit, bytes_per_call=size, repeat=3 if size > 64 * 1024 * 1024 else None)
+        os.remove(path)
+
+
+def bench_bash(suite: Suite) -> None:
+    """BashTool spawn latency, persistent-shell latency and large-output capture."""
+    fresh = BashTool()
+    persistent = BashTool(persistent=True)
+    try:
+        suite.time("bash.spawn", lambda: checked(fresh.execute("true")))
+        suite.time("bash.persistent", lambda: checked(persistent.execute("true")))
+        for size in suite.profile.bash_output_bytes:
+            command = f"yes '{LINE.format(0).strip()}' | head -c {size}"
+            suite.time(
+                f"bash.output[{size_label(size)}]",
+                lambda: checked(fresh.execute(command, timeout=300)),
+                bytes_per_call=size,
+            )
+    finally:
+        persistent.close()
+
+
+def bench_search(suite: Suite, workdir: str) -> None:
+    """Building the directory snapshot and trigram index, then warm Glob and Grep calls."""
+    names = ["snapshot.build", "grep.index_build", "glob.warm", "grep.rare", "grep.common"]
+    if not any(suite.wants(name) for name in names):
+        return
+    root = os.path.join(workdir, "tree")
+    make_tree(root, suite.profile.tree_files)
+
+    def build_snapshot() -> None:
+        snapshot = DirectorySnapshot(root)
+        snapshot.refresh()
+        snapshot.close()
+
+    def build_index() -> None:
+        snapshot = DirectorySnapshot(root)
+        TrigramIndex(snapshot).refresh()
+        snapshot.close()
+
+    suite.time("snapshot.build", build_snapshot, repeat=3)
+    suite.time("grep.index_build", build_index, repeat=3)
+
+    glob = GlobTool(root=root)
+    grep = GrepTool(root=root)
+    suite.time("glob.warm", lambda: checked(glob.execute(pattern="**/*.py")))
+    suite.time("grep.rare", lambda: checked(grep.execute(pattern="RARE_SEARCH_TOKEN")))
+    suite.time("grep.common", lambda: checked(grep.execute(pattern=r"def function_\d+")))
+
+
+def run(suite: Suite, workdir: str) -> None:
+    """Run every tool benchmark."""
+    bench_registry(suite)
+    bench_read(suite, workdir)
+    bench_edit(suite, workdir)
+    bench_bash(suite)
+    bench_search(suite, workdir)
@@ -0,0 +1,169 @@
+import fnmatch
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, TextIO
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+
+
+@dataclass(frozen=True)
+class Profile:
+    """How much work a benchmark run does."""
+
+    name: str
+    file_sizes: tuple[int, ...]
+    bash_output_bytes: tuple[int, ...]
+    tree_files: int
+    repeat: int
+    min_time: float
+    max_time: float
+
+
+PROFILES = {
+    "quick": Profile("quick", (KB, MB), (MB,), 500, 5, 0.2, 2.0),
+    "default": Profile("default", (KB, MB, 64 * MB), (MB, 64 * MB), 5000, 10, 0.5, 10.0),
+    "full": Profile("full", (KB, MB, 64 * MB, GB), (MB, 64 * MB, GB), 20000, 10, 1.0, 30.0),
+}
+
+
+def size_label(size: int) -> str:
+    """Format a byte count as a short label, e.g. 64MB."""
+    for unit, factor in (("GB", GB), ("MB", MB), ("KB", KB)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+def measure(
+    fn: Callable[[], Any],
+    repeat: int,
+    min_time: float,
+    max_time: float,
+    number: int | None = None,
+) -> dict[str, Any]:
+    """Time fn and return per-call statistics in seconds.
+
+    Each sample runs fn ``number`` times; when number is not given it is
+    chosen so that a sample takes at least a millisecond, which keeps timer
+    resolution out of sub-microsecond results. Sampling stops once there are
+    ``repeat`` samples and ``min_time`` has passed, or at ``max_time``.
+    """
+    # The first call warms caches and calibrates number; it is not a sample
+    first = time.perf_counter()
+    fn()
+    first = time.perf_counter() - first
+    if number is None:
+        number = max(1, min(100_000, int(1e-3 / max(first, 1e-9))))
+
+    samples = []
+    started = time.perf_counter()
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+        elapsed = time.perf_counter() - started
+        if (len(samples) >= repeat and elapsed >= min_time) or elapsed >= max_time:
+            break
+
+    ordered = sorted(samples)
+    return {
+        "unit": "s",
+        "samples": len(samples),
+        "number": number,
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+class Suite:
+    """Runs benchmarks for one profile and collects their results by name.
+
+    ``only`` holds glob patterns; benchmarks whose names match none of them
+    are skipped. Progress goes to ``log`` so stdout can carry the JSON.
+    """
+
+    def __init__(self, profile: Profile, only: list[str] | None = None, log: TextIO = sys.stderr):
+        self.profile = profile
+        self.only = only
+        self.log = log
+        self.results: dict[str, dict[str, Any]] = {}
+
+    def wants(self, name: str) -> bool:
+        """Whether a benchmark is selected by the ``only`` patterns."""
+        return not self.only or any(fnmatch.fnmatchcase(name, pattern) for pattern in self.only)
+
+    def time(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        number: int | None = None,
+        bytes_per_call: int | None = None,
+        repeat: int | None = None,
+    ) -> None:
+        """Measure fn under ``name``, adding throughput when bytes_per_call is given."""
+        if not self.wants(name):
+            return
+        result = measure(
+            fn,
+            repeat=repeat or self.profile.repeat,
+            min_time=self.profile.min_time,
+            max_time=self.profile.max_time,
+            number=number,
+        )
+        if bytes_per_call:
+            result["bytes"] = bytes_per_call
+            result["mb_per_s"] = bytes_per_call / result["median"] / MB
+        self.results[name] = result
+
+        line = f"{name:<48} {format_seconds(result['median']):>10}  (n={result['samples']}x{result['number']})"
+        if bytes_per_call:
+            line += f"  {result['mb_per_s']:.1f} MB/s"
+        print(line, file=self.log, flush=True)
+
+
+def format_seconds(seconds: float) -> str:
+    """Format a duration with a unit that suits its size."""
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:.0f} ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float, out: TextIO = sys.stderr
+) -> list[str]:
+    """Print median changes between two result files and return the regressed names.
+
+    A benchmark regresses when its median grew by more than ``threshold``
+    (0.25 means 25% slower).
+    """
+    regressions = []
+    base_results = baseline.get("results", {})
+    print(f"\n{'benchmark':<48} {'baseline':>10} {'current':>10} {'change':>8}", file=out)
+    for name, result in current.get("results", {}).items():
+        base = base_results.get(name)
+        if base is None:
+            print(f"{name:<48} {'-':>10} {format_seconds(result['median']):>10} {'new':>8}", file=out)
+            continue
+        change = result["median"] / base["median"] - 1 if base["median"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<48} {format_seconds(base['median']):>10} "
+            f"{format_seconds(result['median']):>10} {change:>+7.0%}{flag}",
+            file=out,
+        )
+    return regressions
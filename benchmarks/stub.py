@@ -0,0 +1,54 @@
+import itertools
+from typing import Any
+
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+
+class StubMessages:
+    """Stands in for ``client.messages``, replaying a script of responses.
+
+    Each script step is either ``("text", reply)`` or ``("tool_use",
+    [(tool name, input), ...])``. Steps are returned in order and the
+    script starts over after the last one, so a script ending in a text
+    step describes one complete turn of the agent loop.
+    """
+
+    def __init__(self, script: list[tuple[str, Any]]):
+        self.script = script
+        self.position = 0
+        self.calls = 0
+        self._ids = itertools.count(1)
+
+    def create(self, **params: Any) -> Message:
+        """Return the next scripted response, ignoring the request."""
+        kind, payload = self.script[self.position]
+        self.position = (self.position + 1) % len(self.script)
+        self.calls += 1
+
+        if kind == "text":
+            content = [TextBlock(type="text", text=payload)]
+            stop_reason = "end_turn"
+        else:
+            content = [
+                ToolUseBlock(type="tool_use", id=f"toolu_{next(self._ids):08d}", name=name, input=tool_input)
+                for name, tool_input in payload
+            ]
+            stop_reason = "tool_use"
+
+        return Message(
+            id=f"msg_{self.calls:08d}",
+            type="message",
+            role="assistant",
+            model=params.get("model", "stub"),
+            content=content,
+            stop_reason=stop_reason,
+            stop_sequence=None,
+            usage=Usage(input_tokens=1000, output_tokens=100),
+        )
+
+
+class StubAnthropic:
+    """Stands in for ``anthropic.Anthropic`` without touching the network."""
+
+    def __init__(self, script: list[tuple[str, Any]]):
+        self.messages = StubMessages(script)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
@@ -11,6 +12,42 @@ class Settings:
     model_name: str
     max_tokens: int
     temperature: float
+    max_sessions: int = 100
+    session_idle_ttl: float = 1800.0
+    session_memory_limit_bytes: int = 256 * 1024 * 1024
+    conversation_db: str = "data/conversations.db"
+    max_tool_workers: int = 8
+    persistent_shell: bool = True
+    prompt_caching: bool = True
+    context_token_budget: int = 100_000
+    context_keep_recent_turns: int = 4
+    tool_output_stub_chars: int = 4000
+    whisper_model: str = "small"
+    transcription_workers: int = 1
+    transcription_queue_size: int = 8
+    max_audio_upload_bytes: int = 25 * 1024 * 1024
+    max_audio_seconds: float = 600.0
+    tts_cache_dir: str = os.path.join(tempfile.gettempdir(), "assistant_tts_cache")
+    tts_cache_max_bytes: int = 256 * 1024 * 1024
+    tts_cache_max_age: float = 7 * 24 * 3600.0
+    tts_workers: int = 2
+    tts_wait_timeout: float = 60.0
+    llm_transport: str = "live"
+    llm_cassette: str = "cassettes/llm.jsonl"
+    replay_latency_scale: float = 0.0
+    replay_strict: bool = True
+    api_scheduler: bool = True
+    api_max_in_flight: int = 8
+    api_max_queue: int = 64
+    api_max_retries: int = 4
+    api_retry_base: float = 0.5
+    api_retry_max: float = 30.0
+    api_hedge_after: float = 0.0
+    api_pool_max_connections: int = 64
+    api_pool_max_keepalive: int = 32
+    api_pool_keepalive_expiry: float = 30.0
+    api_http2: bool = False
+    api_pool_warm_connections: int = 2
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -18,7 +55,9 @@ class Settings:
         load_dotenv()
 
         anthropic_api_key = os.getenv("ANTHROPIC_API_KEY", "")
-        if not anthropic_api_key:
+        llm_transport = os.getenv("LLM_TRANSPORT", "live").lower()
+        # Replaying a cassette never reaches the API, so it needs no key
+        if not anthropic_api_key and llm_transport != "replay":
             raise ValueError(
                 "ANTHROPIC_API_KEY environment variable is required. "
                 "Set it in a .env file or export it in your shell."
@@ -29,6 +68,44 @@ class Settings:
             model_name=os.getenv("MODEL_NAME", "claude-sonnet-4-20250514"),
             max_tokens=int(os.getenv("MAX_TOKENS", "4096")),
             temperature=float(os.getenv("TEMPERATURE", "0.7")),
+            max_sessions=int(os.getenv("MAX_SESSIONS", "100")),
+            session_idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "1800")),
+            session_memory_limit_bytes=int(os.getenv("SESSION_MEMORY_LIMIT_MB", "256"))
+            * 1024
+            * 1024,
+            conversation_db=os.getenv("CONVERSATION_DB", cls.conversation_db),
+            max_tool_workers=int(os.getenv("MAX_TOOL_WORKERS", "8")),
+            persistent_shell=os.getenv("PERSISTENT_SHELL", "true").lower() in ("1", "true", "yes"),
+            prompt_caching=os.getenv("PROMPT_CACHING", "true").lower() in ("1", "true", "yes"),
+            context_token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "100000")),
+            context_keep_recent_turns=int(os.getenv("CONTEXT_KEEP_RECENT_TURNS", "4")),
+            tool_output_stub_chars=int(os.getenv("TOOL_OUTPUT_STUB_CHARS", "4000")),
+            whisper_model=os.getenv("WHISPER_MODEL", "small"),
+            transcription_workers=int(os.getenv("TRANSCRIPTION_WORKERS", "1")),
+            transcription_queue_size=int(os.getenv("TRANSCRIPTION_QUEUE_SIZE", "8")),
+            max_audio_upload_bytes=int(os.getenv("MAX_AUDIO_UPLOAD_MB", "25")) * 1024 * 1024,
+            max_audio_seconds=float(os.getenv("MAX_AUDIO_SECONDS", "600")),
+            tts_cache_dir=os.getenv("TTS_CACHE_DIR", cls.tts_cache_dir),
+            tts_cache_max_bytes=int(os.getenv("TTS_CACHE_MAX_MB", "256")) * 1024 * 1024,
+            tts_cache_max_age=float(os.getenv("TTS_CACHE_MAX_AGE_HOURS", "168")) * 3600,
+            tts_workers=int(os.getenv("TTS_WORKERS", "2")),
+            tts_wait_timeout=float(os.getenv("TTS_WAIT_TIMEOUT", "60")),
+            llm_transport=llm_transport,
+            llm_cassette=os.getenv("LLM_CASSETTE", cls.llm_cassette),
+            replay_latency_scale=float(os.getenv("REPLAY_LATENCY_SCALE", "0")),
+            replay_strict=os.getenv("REPLAY_STRICT", "true").lower() in ("1", "true", "yes"),
+            api_scheduler=os.getenv("API_SCHEDULER", "true").lower() in ("1", "true", "yes"),
+            api_max_in_flight=int(os.getenv("API_MAX_IN_FLIGHT", "8")),
+            api_max_queue=int(os.getenv("API_MAX_QUEUE", "64")),
+            api_max_retries=int(os.getenv("API_MAX_RETRIES", "4")),
+            api_retry_base=float(os.getenv("API_RETRY_BASE", "0.5")),
+            api_retry_max=float(os.getenv("API_RETRY_MAX", "30")),
+            api_hedge_after=float(os.getenv("API_HEDGE_AFTER", "0")),
+            api_pool_max_connections=int(os.getenv("API_POOL_MAX_CONNECTIONS", "64")),
+            api_pool_max_keepalive=int(os.getenv("API_POOL_MAX_KEEPALIVE", "32")),
+            api_pool_keepalive_expiry=float(os.getenv("API_POOL_KEEPALIVE_EXPIRY", "30")),
+            api_http2=os.getenv("API_HTTP2", "false").lower() in ("1", "true", "yes"),
+            api_pool_warm_connections=int(os.getenv("API_POOL_WARM_CONNECTIONS", "2")),
         )
 
 
@@ -1,3 +1,31 @@
-from .client import LLMClient
+from .client import BaseLLMClient, LLMClient
+from .async_client import AsyncLLMClient
+from .session import Session, SessionManager
+from .store import ConversationStore
+from .batch import BatchItem, BatchRunner, read_batch
+from .pool import ConnectionPool
+from .scheduler import APIScheduler, Priority, SchedulerBusy, ScheduledTransport, api_priority
+from .transport import Cassette, CassetteMiss, RecordingTransport, ReplayTransport, create_transport
 
-__all__ = ["LLMClient"]
+__all__ = [
+    "BaseLLMClient",
+    "LLMClient",
+    "AsyncLLMClient",
+    "Session",
+    "SessionManager",
+    "ConversationStore",
+    "BatchItem",
+    "BatchRunner",
+    "read_batch",
+    "ConnectionPool",
+    "APIScheduler",
+    "Priority",
+    "SchedulerBusy",
+    "ScheduledTransport",
+    "api_priority",
+    "Cassette",
+    "CassetteMiss",
+    "RecordingTransport",
+    "ReplayTransport",
+    "create_transport",
+]
@@ -0,0 +1,117 @@
+import time
+from typing import Any, AsyncIterator
+
+from config.settings import Settings
+from metrics import LLM_REQUEST_ERRORS
+from tools import ToolRegistry
+
+from .client import BaseLLMClient
+from .transport import create_transport
+
+
+class AsyncLLMClient(BaseLLMClient):
+    """Asyncio client for Claude, for use inside an event loop.
+
+    API calls go through ``anthropic.AsyncAnthropic`` and tools run through
+    ``BaseTool.execute_async``, so a long turn never blocks other requests on
+    the same loop.
+    """
+
+    def __init__(self, settings: Settings, tool_registry: ToolRegistry, transport: Any | None = None):
+        super().__init__(settings, tool_registry)
+        self.client = transport if transport is not None else create_transport(settings, asynchronous=True)
+
+    async def send_message(self, user_message: str, system_prompt: str) -> str:
+        """Send a message to the LLM and process the response, handling tool calls."""
+        self._begin_turn(user_message)
+
+        try:
+            while True:
+                response = await self._call_api(system_prompt)
+                self._record_usage(response)
+                assistant_content = response.content
+                self._append_message("assistant", assistant_content)
+
+                if response.stop_reason == "tool_use":
+                    tool_results = await self._process_tool_calls(assistant_content)
+                    self._append_message("user", tool_results)
+                else:
+                    self._end_turn()
+                    return self._extract_text_response(assistant_content)
+        except BaseException:
+            self._rollback_turn()
+            raise
+
+    async def send_message_stream(
+        self, user_message: str, system_prompt: str
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Send a message to the LLM and yield response events as they arrive.
+
+        Yields the same events as ``LLMClient.send_message_stream``.
+        """
+        self._begin_turn(user_message)
+
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    async with self._stream_api(system_prompt) as stream:
+                        async for text in stream.text_stream:
+                            yield {"type": "text", "text": text}
+                        response = await stream.get_final_message()
+                except Exception:
+                    LLM_REQUEST_ERRORS.inc(mode="stream")
+                    raise
+                self._observe_api_call("stream", started)
+                self._record_usage(response)
+
+                assistant_content = response.content
+                self._append_message("assistant", assistant_content)
+
+                if response.stop_reason == "tool_use":
+                    for event in self._tool_use_events(assistant_content):
+                        yield event
+                    tool_results = await self._process_tool_calls(assistant_content)
+                    for event in self._tool_result_events(tool_results):
+                        yield event
+                    self._append_message("user", tool_results)
+                else:
+                    self._end_turn()
+                    yield {
+                        "type": "done",
+                        "text": self._extract_text_response(assistant_content),
+                        "usage": dict(self.turn_usage),
+                    }
+                    return
+        except BaseException:
+            self._rollback_turn()
+            raise
+
+    async def _call_api(self, system_prompt: str) -> Any:
+        """Make an API call to Claude."""
+        params = self._request_params(system_prompt)
+        started = time.perf_counter()
+        try:
+            response = await self.client.messages.create(**params)
+        except Exception:
+            LLM_REQUEST_ERRORS.inc(mode="create")
+            raise
+        self._observe_api_call("create", started)
+        return response
+
+    def _stream_api(self, system_prompt: str) -> Any:
+        """Open a streaming API call to Claude."""
+        return self.client.messages.stream(**self._request_params(system_prompt))
+
+    async def _process_tool_calls(
+        self, assistant_content: list[Any]
+    ) -> list[dict[str, Any]]:
+        """Process tool calls from the assistant's response off the event loop."""
+        blocks = self._tool_use_blocks(assistant_content)
+        results = await self.tool_registry.execute_many_async(
+            [(block.name, block.input) for block in blocks]
+        )
+        return [
+            self._format_tool_result(block, result)
+            for block, result in zip(blocks, results)
+        ]
@@ -0,0 +1,275 @@
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import anthropic
+
+from config.settings import Settings
+
+from .client import USAGE_FIELDS, LLMClient
+from .pool import get_pool
+from .scheduler import Priority, api_priority
+
+BATCH_POLL_INTERVAL = 30.0
+# Well under the API's limits on requests and bytes per batch
+MAX_BATCH_REQUESTS = 10_000
+
+
+@dataclass
+class BatchItem:
+    """One independent conversation from a batch input file."""
+
+    id: str
+    prompt: str
+    system: str | None = None
+    # False marks a prompt that needs no tools and may go to the Message Batches API
+    tools: bool = True
+
+
+def read_batch(path: str) -> list[BatchItem]:
+    """Parse a JSONL batch file into items.
+
+    Each line is an object with a ``prompt`` and optionally an ``id``
+    (defaults to the line number), a ``system`` prompt and ``tools``.
+    """
+    items: list[BatchItem] = []
+    seen: set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON: {e}") from e
+            if not isinstance(record, dict) or not isinstance(record.get("prompt"), str):
+                raise ValueError(f"{path}:{number}: expected an object with a string 'prompt'")
+            item_id = str(record.get("id", number))
+            if item_id in seen:
+                raise ValueError(f"{path}:{number}: duplicate id {item_id!r}")
+            seen.add(item_id)
+            items.append(
+                BatchItem(
+                    id=item_id,
+                    prompt=record["prompt"],
+                    system=record.get("system"),
+                    tools=bool(record.get("tools", True)),
+                )
+            )
+    return items
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Replace path with text so a crash leaves either the old or the new file."""
+    temp = path + ".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def load_checkpoint(out_path: str) -> set[str]:
+    """Return the ids already answered in out_path, tidying the file for a resumed run.
+
+    Failed results and a line cut short by a crash are dropped so those
+    items run again and every id appears at most once.
+    """
+    if not os.path.exists(out_path):
+        return set()
+    done: set[str] = set()
+    kept: list[str] = []
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("error") is None and record.get("id") not in done:
+                done.add(record["id"])
+                kept.append(line if line.endswith("\n") else line + "\n")
+    _write_atomic(out_path, "".join(kept))
+    return done
+
+
+class _ResultWriter:
+    """Appends results to the output file, durably, as they finish."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BatchRunner:
+    """Run many independent conversations and stream their results to a JSONL file.
+
+    Each item gets a fresh client from ``client_factory`` and runs the full
+    tool loop on one of ``parallelism`` threads, at background priority so
+    interactive turns sharing the scheduler go first. The output file is
+    the checkpoint: rerunning with the same output skips answered items.
+
+    With ``use_batch_api``, items marked ``"tools": false`` are instead sent
+    through the Message Batches API, which is cheaper but can take hours.
+    Submitted batch ids are kept in ``<out>.batches.json`` so a resumed run
+    collects them rather than submitting again.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        client_factory: Callable[[], LLMClient],
+        system_prompt: str,
+        parallelism: int = 4,
+        use_batch_api: bool = False,
+        poll_interval: float = BATCH_POLL_INTERVAL,
+        batch_client: Any | None = None,
+    ):
+        if use_batch_api and batch_client is None and settings.llm_transport != "live":
+            raise ValueError("The Message Batches API can only be used with LLM_TRANSPORT=live")
+        self.settings = settings
+        self.client_factory = client_factory
+        self.system_prompt = system_prompt
+        self.parallelism = max(1, parallelism)
+        self.use_batch_api = use_batch_api
+        self.poll_interval = poll_interval
+        self._batch_client = batch_client
+        self.counts = {"skipped": 0, "succeeded": 0, "failed": 0}
+
+    def run(self, items: list[BatchItem], out_path: str) -> dict[str, int]:
+        """Answer every item not already in out_path; return counts of each outcome."""
+        done = load_checkpoint(out_path)
+        state_path = out_path + ".batches.json"
+        batches = self._load_batches(state_path)
+        submitted = {item_id for batch in batches for item_id in batch["items"].values()}
+
+        pending = [item for item in items if item.id not in done and item.id not in submitted]
+        self.counts = {"skipped": len(done), "succeeded": 0, "failed": 0}
+
+        writer = _ResultWriter(out_path)
+        try:
+            if self.use_batch_api:
+                offline = [item for item in pending if not item.tools]
+                pending = [item for item in pending if item.tools]
+                batches += self._submit_batches(offline, batches, state_path)
+
+            with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+                futures = [executor.submit(self._converse, item) for item in pending]
+                for future in as_completed(futures):
+                    self._record(writer, future.result())
+
+            for batch in batches:
+                self._collect_batch(batch, writer, done)
+        finally:
+            writer.close()
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return dict(self.counts, total=len(items))
+
+    def _record(self, writer: _ResultWriter, record: dict[str, Any]) -> None:
+        writer.write(record)
+        outcome = "failed" if record.get("error") is not None else "succeeded"
+        self.counts[outcome] += 1
+        status = f"error: {record['error']}" if outcome == "failed" else "ok"
+        print(f"[{self.counts['succeeded'] + self.counts['failed']}] {record['id']}: {status}", file=sys.stderr)
+
+    def _converse(self, item: BatchItem) -> dict[str, Any]:
+        """Run one item through the agent loop on a fresh client."""
+        client = self.client_factory()
+        try:
+            with api_priority(Priority.BACKGROUND):
+                response = client.send_message(item.prompt, item.system or self.system_prompt)
+            return {
+                "id": item.id,
+                "response": response,
+                "usage": dict(client.turn_usage),
+                "api_calls": client.turn_api_calls,
+            }
+        except Exception as e:
+            return {"id": item.id, "error": str(e)}
+        finally:
+            client.close()
+
+    # Message Batches API
+
+    def _api(self) -> Any:
+        if self._batch_client is None:
+            self._batch_client = anthropic.Anthropic(
+                api_key=self.settings.anthropic_api_key,
+                http_client=get_pool(self.settings).client(),
+            )
+        return self._batch_client
+
+    def _load_batches(self, state_path: str) -> list[dict[str, Any]]:
+        if not os.path.exists(state_path):
+            return []
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _submit_batches(
+        self, items: list[BatchItem], existing: list[dict[str, Any]], state_path: str
+    ) -> list[dict[str, Any]]:
+        """Submit items in chunks, checkpointing each batch id as soon as it exists."""
+        batches: list[dict[str, Any]] = []
+        # custom_id must be short and plain, so items are numbered instead
+        offset = sum(len(batch["items"]) for batch in existing)
+        for start in range(0, len(items), MAX_BATCH_REQUESTS):
+            chunk = items[start:start + MAX_BATCH_REQUESTS]
+            custom_ids = {f"item-{offset + start + n}": item.id for n, item in enumerate(chunk)}
+            requests = [
+                {
+                    "custom_id": custom_id,
+                    "params": {
+                        "model": self.settings.model_name,
+                        "max_tokens": self.settings.max_tokens,
+                        "system": item.system or self.system_prompt,
+                        "messages": [{"role": "user", "content": item.prompt}],
+                    },
+                }
+                for custom_id, item in zip(custom_ids, chunk)
+            ]
+            batch = self._api().messages.batches.create(requests=requests)
+            batches.append({"batch_id": batch.id, "items": custom_ids})
+            _write_atomic(state_path, json.dumps(existing + batches))
+            print(f"Submitted {len(chunk)} prompt(s) as message batch {batch.id}", file=sys.stderr)
+        return batches
+
+    def _collect_batch(self, batch: dict[str, Any], writer: _ResultWriter, done: set[str]) -> None:
+        """Wait for a message batch to end and write the results not already in the output."""
+        api = self._api()
+        while api.messages.batches.retrieve(batch["batch_id"]).processing_status != "ended":
+            time.sleep(self.poll_interval)
+
+        for entry in api.messages.batches.results(batch["batch_id"]):
+            item_id = batch["items"].get(entry.custom_id)
+            if item_id is None or item_id in done:
+                continue
+            result = entry.result
+            if result.type == "succeeded":
+                message = result.message
+                record = {
+                    "id": item_id,
+                    "response": "".join(block.text for block in message.content if block.type == "text"),
+                    "usage": {field: getattr(message.usage, field, None) or 0 for field in USAGE_FIELDS},
+                    "api_calls": 1,
+                }
+            elif result.type == "errored":
+                record = {"id": item_id, "error": result.error.error.message}
+            else:
+                record = {"id": item_id, "error": f"batch request {result.type}"}
+            self._record(writer, record)
@@ -1,89 +1,260 @@
 import json
-from typing import Any
-
-import anthropic
+import logging
+import time
+from typing import Any, Iterator
 
 from config.settings import Settings
-from tools import ToolRegistry
+from metrics import LLM_REQUEST_ERRORS, LLM_REQUEST_SECONDS, LLM_TOKENS, TURN_ITERATIONS
+from tools import ToolRegistry, ToolResult
 
+from .context import ContextManager
+from .store import ConversationStore, complete_turns
+from .transport import create_transport
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
 
-class LLMClient:
-    """Client for communicating with Claude/Anthropic API."""
+
+class BaseLLMClient:
+    """Conversation state and request building shared by the sync and async clients."""
 
     def __init__(self, settings: Settings, tool_registry: ToolRegistry):
         self.settings = settings
         self.tool_registry = tool_registry
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
         self.conversation_history: list[dict[str, Any]] = []
+        self.context = ContextManager(
+            token_budget=settings.context_token_budget,
+            keep_recent_turns=settings.context_keep_recent_turns,
+            stub_threshold_chars=settings.tool_output_stub_chars,
+        )
+        self.usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self.turn_usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self.turn_api_calls = 0
+        self.store: ConversationStore | None = None
+        self.session_id: str | None = None
+        self._cached_tools: list[dict[str, Any]] | None = None
+        self._cached_tools_source: list[dict[str, Any]] | None = None
 
-    def send_message(self, user_message: str, system_prompt: str) -> str:
-        """Send a message to the LLM and process the response, handling tool calls."""
-        self.conversation_history.append({"role": "user", "content": user_message})
+    @property
+    def history_bytes(self) -> int:
+        """Approximate size of the conversation history."""
+        return self.context.total_chars
 
-        while True:
-            response = self._call_api(system_prompt)
-            assistant_content = response.content
-            self.conversation_history.append(
-                {"role": "assistant", "content": assistant_content}
-            )
+    def attach_store(self, store: ConversationStore, session_id: str) -> None:
+        """Load the session's stored history and persist every change from now on.
 
-            if response.stop_reason == "tool_use":
-                tool_results = self._process_tool_calls(assistant_content)
-                self.conversation_history.append(
-                    {"role": "user", "content": tool_results}
-                )
-            else:
-                return self._extract_text_response(assistant_content)
+        A turn left unfinished by a restart is dropped, so the conversation
+        resumes after the last complete reply.
+        """
+        stored = store.load(session_id)
+        history = complete_turns(stored)
+        if len(history) != len(stored):
+            store.replace(session_id, history)
 
-    def _call_api(self, system_prompt: str) -> Any:
-        """Make an API call to Claude."""
-        return self.client.messages.create(
-            model=self.settings.model_name,
-            max_tokens=self.settings.max_tokens,
-            system=system_prompt,
-            tools=self.tool_registry.get_all_schemas(),
-            messages=self.conversation_history,
+        self.store = store
+        self.session_id = session_id
+        self._set_history(history)
+
+    def _set_history(self, history: list[dict[str, Any]]) -> None:
+        """Replace the in-memory history and re-track its size."""
+        self.conversation_history = []
+        self.context.reset()
+        for message in history:
+            self.conversation_history.append(message)
+            self.context.track(message)
+
+    def detach_store(self) -> None:
+        """Stop persisting changes; the stored history is kept."""
+        if self.store is not None:
+            self.store.forget(self.session_id)
+        self.store = None
+        self.session_id = None
+
+    def _append_message(self, role: str, content: Any) -> None:
+        """Append a message to the history, storing SDK blocks as plain dicts."""
+        if isinstance(content, list):
+            content = [
+                block.model_dump(exclude_none=True)
+                if hasattr(block, "model_dump")
+                else block
+                for block in content
+            ]
+        message = {"role": role, "content": content}
+        self.conversation_history.append(message)
+        self.context.track(message)
+        if self.store is not None:
+            self.store.append(self.session_id, message)
+
+    def _enforce_context_budget(self) -> None:
+        """Compact the history if it has grown past the token budget."""
+        compacted = self.context.enforce(self.conversation_history)
+        if compacted is not None:
+            self.conversation_history = compacted
+            if self.store is not None:
+                self.store.replace(self.session_id, compacted)
+
+    def _begin_turn(self, user_message: str) -> None:
+        """Record the user's message and reset the per-turn usage counters."""
+        self.turn_usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self.turn_api_calls = 0
+        self._append_message("user", user_message)
+
+    def _rollback_turn(self) -> None:
+        """Drop a turn that was interrupted, e.g. cancelled by a client disconnect.
+
+        Without this a tool call left without its result would make every
+        later request in the session fail.
+        """
+        history = complete_turns(self.conversation_history)
+        if len(history) == len(self.conversation_history):
+            return
+        self._set_history(history)
+        if self.store is not None:
+            self.store.replace(self.session_id, history)
+
+    def _request_params(self, system_prompt: str) -> dict[str, Any]:
+        """Build the keyword arguments for a Messages API call.
+
+        With prompt caching enabled, cache breakpoints are placed on the tool
+        list, the system prompt and the newest message, so each iteration of
+        the tool loop reads the previous iteration's prefix from the cache.
+        """
+        self._enforce_context_budget()
+        tools = self.tool_registry.get_all_schemas()
+        if not self.settings.prompt_caching:
+            return {
+                "model": self.settings.model_name,
+                "max_tokens": self.settings.max_tokens,
+                "system": system_prompt,
+                "tools": tools,
+                "messages": self.conversation_history,
+            }
+
+        return {
+            "model": self.settings.model_name,
+            "max_tokens": self.settings.max_tokens,
+            "system": [
+                {"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}
+            ],
+            "tools": self._cacheable_tools(tools),
+            "messages": self._cacheable_messages(),
+        }
+
+    def _cacheable_tools(self, tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Return the tool list with a cache breakpoint on its last entry."""
+        if tools is not self._cached_tools_source:
+            self._cached_tools = list(tools)
+            if self._cached_tools:
+                self._cached_tools[-1] = {
+                    **self._cached_tools[-1],
+                    "cache_control": CACHE_CONTROL,
+                }
+            self._cached_tools_source = tools
+        return self._cached_tools
+
+    def _cacheable_messages(self) -> list[dict[str, Any]]:
+        """Return the history with a rolling cache breakpoint on the last message.
+
+        Only the last message is copied; the stored history is left untouched
+        so the breakpoint moves forward on the next call.
+        """
+        if not self.conversation_history:
+            return self.conversation_history
+
+        last = self.conversation_history[-1]
+        content = last["content"]
+        if isinstance(content, str):
+            blocks = [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+        elif content:
+            blocks = [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]
+        else:
+            return self.conversation_history
+
+        return [*self.conversation_history[:-1], {**last, "content": blocks}]
+
+    def _end_turn(self) -> None:
+        """Export how many API calls the finished turn took."""
+        TURN_ITERATIONS.observe(self.turn_api_calls)
+
+    def _observe_api_call(self, mode: str, started: float) -> None:
+        """Export the latency of an API call that began at ``started``."""
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, mode=mode)
+
+    def _record_usage(self, response: Any) -> None:
+        """Accumulate token counts, including cache reads and writes, from a response."""
+        self.turn_api_calls += 1
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        for field in USAGE_FIELDS:
+            value = getattr(usage, field, None) or 0
+            self.usage[field] += value
+            self.turn_usage[field] += value
+            if value:
+                LLM_TOKENS.inc(value, model=self.settings.model_name, kind=field.removesuffix("_tokens"))
+        self.context.observe_prompt_tokens(
+            (usage.input_tokens or 0)
+            + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+            + (getattr(usage, "cache_read_input_tokens", None) or 0)
         )
 
-    def _process_tool_calls(
-        self, assistant_content: list[Any]
-    ) -> list[dict[str, Any]]:
-        """Process tool calls from the assistant's response."""
-        tool_results = []
+    def _tool_use_blocks(self, assistant_content: list[Any]) -> list[Any]:
+        """Return the tool_use blocks of an assistant turn, logging each call."""
+        blocks = [block for block in assistant_content if block.type == "tool_use"]
+        for block in blocks:
+            logger.info("Executing tool %s: %s", block.name, json.dumps(block.input))
+        return blocks
 
-        for block in assistant_content:
-            if block.type == "tool_use":
-                tool_name = block.name
-                tool_input = block.input
-                tool_use_id = block.id
-
-                print(f"\n🔧 Executing tool: {tool_name}")
-                print(f"   Input: {json.dumps(tool_input, indent=2)}")
-
-                result = self.tool_registry.execute(tool_name, **tool_input)
-
-                print(f"   Success: {result.success}")
-                if result.output:
-                    output_preview = (
-                        result.output[:200] + "..."
-                        if len(result.output) > 200
-                        else result.output
-                    )
-                    print(f"   Output: {output_preview}")
-                if result.error:
-                    print(f"   Error: {result.error}")
-
-                content = result.output if result.success else result.error
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": content or "(no output)",
-                        "is_error": not result.success,
-                    }
-                )
+    def _format_tool_result(self, block: Any, result: ToolResult) -> dict[str, Any]:
+        """Log a tool result and convert it to a tool_result content block."""
+        if result.success:
+            logger.info("Finished tool %s", block.name)
+        else:
+            logger.info("Tool %s failed: %s", block.name, result.error)
+        if result.output and logger.isEnabledFor(logging.DEBUG):
+            output_preview = (
+                result.output[:200] + "..."
+                if len(result.output) > 200
+                else result.output
+            )
+            logger.debug("Output of %s: %s", block.name, output_preview)
+
+        content = result.output if result.success else result.error
+        return {
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": content or "(no output)",
+            "is_error": not result.success,
+        }
 
-        return tool_results
+    def _tool_use_events(self, assistant_content: list[Any]) -> list[dict[str, Any]]:
+        """Stream events announcing the tool calls in an assistant turn."""
+        return [
+            {"type": "tool_use", "name": block.name, "input": block.input}
+            for block in assistant_content
+            if block.type == "tool_use"
+        ]
+
+    def _tool_result_events(
+        self, tool_results: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Stream events reporting the outcome of each tool call."""
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": result["tool_use_id"],
+                "is_error": result["is_error"],
+            }
+            for result in tool_results
+        ]
 
     def _extract_text_response(self, assistant_content: list[Any]) -> str:
         """Extract text content from the assistant's response."""
@@ -94,5 +265,118 @@ class LLMClient:
         return "\n".join(text_parts) if text_parts else "(No response)"
 
     def clear_history(self) -> None:
-        """Clear the conversation history."""
+        """Clear the conversation history, including its stored copy."""
         self.conversation_history = []
+        self.context.reset()
+        if self.store is not None:
+            self.store.clear(self.session_id)
+
+    def close(self) -> None:
+        """Release the client's tools, e.g. its persistent shell."""
+        self.tool_registry.close()
+
+
+class LLMClient(BaseLLMClient):
+    """Client for communicating with Claude/Anthropic API."""
+
+    def __init__(self, settings: Settings, tool_registry: ToolRegistry, transport: Any | None = None):
+        super().__init__(settings, tool_registry)
+        # Anything with the shape of anthropic.Anthropic; see llm.transport
+        self.client = transport if transport is not None else create_transport(settings)
+
+    def send_message(self, user_message: str, system_prompt: str) -> str:
+        """Send a message to the LLM and process the response, handling tool calls."""
+        self._begin_turn(user_message)
+
+        try:
+            while True:
+                response = self._call_api(system_prompt)
+                self._record_usage(response)
+                assistant_content = response.content
+                self._append_message("assistant", assistant_content)
+
+                if response.stop_reason == "tool_use":
+                    tool_results = self._process_tool_calls(assistant_content)
+                    self._append_message("user", tool_results)
+                else:
+                    self._end_turn()
+                    return self._extract_text_response(assistant_content)
+        except BaseException:
+            self._rollback_turn()
+            raise
+
+    def send_message_stream(
+        self, user_message: str, system_prompt: str
+    ) -> Iterator[dict[str, Any]]:
+        """Send a message to the LLM and yield response events as they arrive.
+
+        Yields ``{"type": "text", "text": ...}`` for every text delta,
+        ``tool_use``/``tool_result`` events around each tool execution, and a
+        final ``{"type": "done", "text": ..., "usage": ...}`` carrying the full
+        reply and the turn's token usage. A turn that fails or is closed
+        before it finishes is removed from the history.
+        """
+        self._begin_turn(user_message)
+
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    with self._stream_api(system_prompt) as stream:
+                        for text in stream.text_stream:
+                            yield {"type": "text", "text": text}
+                        response = stream.get_final_message()
+                except Exception:
+                    LLM_REQUEST_ERRORS.inc(mode="stream")
+                    raise
+                self._observe_api_call("stream", started)
+                self._record_usage(response)
+
+                assistant_content = response.content
+                self._append_message("assistant", assistant_content)
+
+                if response.stop_reason == "tool_use":
+                    yield from self._tool_use_events(assistant_content)
+                    tool_results = self._process_tool_calls(assistant_content)
+                    yield from self._tool_result_events(tool_results)
+                    self._append_message("user", tool_results)
+                else:
+                    self._end_turn()
+                    yield {
+                        "type": "done",
+                        "text": self._extract_text_response(assistant_content),
+                        "usage": dict(self.turn_usage),
+                    }
+                    return
+        except BaseException:
+            self._rollback_turn()
+            raise
+
+    def _call_api(self, system_prompt: str) -> Any:
+        """Make an API call to Claude."""
+        params = self._request_params(system_prompt)
+        started = time.perf_counter()
+        try:
+            response = self.client.messages.create(**params)
+        except Exception:
+            LLM_REQUEST_ERRORS.inc(mode="create")
+            raise
+        self._observe_api_call("create", started)
+        return response
+
+    def _stream_api(self, system_prompt: str) -> Any:
+        """Open a streaming API call to Claude."""
+        return self.client.messages.stream(**self._request_params(system_prompt))
+
+    def _process_tool_calls(
+        self, assistant_content: list[Any]
+    ) -> list[dict[str, Any]]:
+        """Process tool calls from the assistant's response."""
+        blocks = self._tool_use_blocks(assistant_content)
+        results = self.tool_registry.execute_many(
+            [(block.name, block.input) for block in blocks]
+        )
+        return [
+            self._format_tool_result(block, result)
+            for block, result in zip(blocks, results)
+        ]
@@ -0,0 +1,203 @@
+import json
+from typing import Any
+
+# Rough characters-per-token ratio used until the API reports real counts
+CHARS_PER_TOKEN = 4
+
+STUB_PREVIEW_CHARS = 200
+SUMMARY_SNIPPET_CHARS = 150
+SUMMARY_MAX_CHARS = 2000
+SUMMARY_HEADER = (
+    "[Earlier conversation was removed to stay within the context budget. "
+    "Summary of the removed turns:]"
+)
+
+
+def message_chars(message: dict[str, Any]) -> int:
+    """Return the serialized size of a message in characters."""
+    return len(json.dumps(message, ensure_ascii=False))
+
+
+def is_turn_start(message: dict[str, Any]) -> bool:
+    """Whether a message is real user input rather than a batch of tool results."""
+    if message["role"] != "user":
+        return False
+    content = message["content"]
+    if isinstance(content, str):
+        return True
+    return not any(block.get("type") == "tool_result" for block in content)
+
+
+def _text_blocks(message: dict[str, Any]) -> list[str]:
+    """Return the texts of a message's text blocks."""
+    content = message["content"]
+    if isinstance(content, str):
+        return [content]
+    return [block["text"] for block in content if block.get("type") == "text"]
+
+
+def _snippet(text: str) -> str:
+    """Collapse whitespace and shorten text for a summary line."""
+    text = " ".join(text.split())
+    if len(text) > SUMMARY_SNIPPET_CHARS:
+        return text[:SUMMARY_SNIPPET_CHARS] + "..."
+    return text
+
+
+class ContextManager:
+    """Tracks per-message token estimates and keeps the history within a budget.
+
+    Estimates are anchored to the prompt size the API last reported, so the
+    system prompt and tool schemas are accounted for. When the estimate
+    exceeds ``token_budget`` the history is compacted down to
+    ``target_ratio * token_budget``: first stale tool outputs outside the
+    most recent ``keep_recent_turns`` turns are collapsed to short stubs,
+    then the oldest whole turns are replaced by a brief summary. Whole turns
+    are dropped so every tool_use keeps its matching tool_result. Compacting
+    below the budget means the cached prompt prefix is only invalidated
+    occasionally rather than on every call.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 100_000,
+        keep_recent_turns: int = 4,
+        stub_threshold_chars: int = 4000,
+        target_ratio: float = 0.75,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.stub_threshold_chars = stub_threshold_chars
+        self.target_ratio = target_ratio
+        self.message_chars: list[int] = []
+        self.total_chars = 0
+        self.compactions = 0
+        self._base_tokens = 0
+        self._base_chars = 0
+
+    @property
+    def estimated_tokens(self) -> int:
+        """Estimated prompt size of the next request, in tokens."""
+        unreported_chars = max(0, self.total_chars - self._base_chars)
+        return self._base_tokens + unreported_chars // CHARS_PER_TOKEN
+
+    def track(self, message: dict[str, Any]) -> None:
+        """Account for a message appended to the history."""
+        size = message_chars(message)
+        self.message_chars.append(size)
+        self.total_chars += size
+
+    def observe_prompt_tokens(self, prompt_tokens: int) -> None:
+        """Anchor the estimate to the prompt size reported for the current history."""
+        self._base_tokens = prompt_tokens
+        self._base_chars = self.total_chars
+
+    def reset(self) -> None:
+        """Forget all tracked messages."""
+        self.message_chars = []
+        self.total_chars = 0
+        self._base_tokens = 0
+        self._base_chars = 0
+
+    def enforce(self, history: list[dict[str, Any]]) -> list[dict[str, Any]] | None:
+        """Compact the history if it is over budget.
+
+        Returns the compacted history, or None if it was left untouched,
+        including when the current turn alone is over budget and nothing
+        could be removed.
+        """
+        if self.estimated_tokens <= self.token_budget:
+            return None
+
+        turn_starts = [i for i, message in enumerate(history) if is_turn_start(message)]
+        if not turn_starts:
+            return None
+
+        target_tokens = int(self.token_budget * self.target_ratio)
+        tokens_before = self.estimated_tokens
+        chars_before = self.total_chars
+
+        recent_start = turn_starts[max(0, len(turn_starts) - self.keep_recent_turns)]
+        compacted = [
+            self._stub_tool_results(message) if i < recent_start else message
+            for i, message in enumerate(history)
+        ]
+        sizes = [message_chars(message) for message in compacted]
+
+        def tokens_after(removed_chars: int) -> int:
+            return tokens_before - removed_chars // CHARS_PER_TOKEN
+
+        removed_chars = chars_before - sum(sizes)
+        cut = 0
+        # Never drop the current turn, which is the last one
+        for start in turn_starts[1:]:
+            if tokens_after(removed_chars) <= target_tokens:
+                break
+            removed_chars += sum(sizes[cut:start])
+            cut = start
+
+        if not cut and removed_chars <= 0:
+            return None
+
+        if cut:
+            summary = self._summarize(compacted[:cut])
+            compacted = [self._with_summary(compacted[cut], summary), *compacted[cut + 1:]]
+            sizes = [message_chars(compacted[0]), *sizes[cut + 1:]]
+
+        self.message_chars = sizes
+        self.total_chars = sum(sizes)
+        self._base_tokens = max(0, tokens_before - (chars_before - self.total_chars) // CHARS_PER_TOKEN)
+        self._base_chars = self.total_chars
+        self.compactions += 1
+        return compacted
+
+    def _stub_tool_results(self, message: dict[str, Any]) -> dict[str, Any]:
+        """Replace large tool_result contents in a message with short stubs."""
+        content = message["content"]
+        if message["role"] != "user" or isinstance(content, str):
+            return message
+
+        changed = False
+        blocks = []
+        for block in content:
+            output = block.get("content")
+            if (
+                block.get("type") == "tool_result"
+                and isinstance(output, str)
+                and len(output) > self.stub_threshold_chars
+            ):
+                block = {
+                    **block,
+                    "content": (
+                        f"[Earlier tool output elided: {len(output)} characters. "
+                        f"It began with:]\n{output[:STUB_PREVIEW_CHARS]}"
+                    ),
+                }
+                changed = True
+            blocks.append(block)
+        return {**message, "content": blocks} if changed else message
+
+    def _summarize(self, messages: list[dict[str, Any]]) -> str:
+        """Build a short extractive summary of the turns being dropped."""
+        lines = []
+        for message in messages:
+            texts = _text_blocks(message)
+            if is_turn_start(message):
+                # Carry forward the summary left by an earlier compaction
+                if texts and texts[0].startswith(SUMMARY_HEADER):
+                    lines.append(texts.pop(0)[len(SUMMARY_HEADER):].strip())
+                lines.append(f"- User: {_snippet(' '.join(texts))}")
+            elif message["role"] == "assistant" and texts:
+                lines.append(f"- Assistant: {_snippet(' '.join(texts))}")
+
+        body = "\n".join(lines)
+        if len(body) > SUMMARY_MAX_CHARS:
+            body = "..." + body[-SUMMARY_MAX_CHARS:]
+        return f"{SUMMARY_HEADER}\n{body}"
+
+    def _with_summary(self, message: dict[str, Any], summary: str) -> dict[str, Any]:
+        """Prefix a user message with the summary of the dropped turns."""
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        return {**message, "content": [{"type": "text", "text": summary}, *content]}
@@ -0,0 +1,194 @@
+import asyncio
+import importlib
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import anthropic
+
+from config.settings import Settings
+
+DEFAULT_BASE_URL = "https://api.anthropic.com"
+
+
+def _http_module() -> Any:
+    """The httpx package the installed SDK's HTTP clients are built on.
+
+    Some SDK releases build on a fork of httpx and reject clients from the
+    original, so limits and clients must come from the same package.
+    """
+    base = anthropic.DefaultHttpxClient.__mro__[1]
+    return importlib.import_module(base.__module__.partition(".")[0])
+
+
+def _connection_stats(client: Any) -> dict[str, int] | None:
+    """Count a client's pooled connections by state, or None if the pool is not visible."""
+    try:
+        connections = list(client._transport._pool.connections)
+    except AttributeError:
+        return None
+    stats = {"connections": len(connections), "idle": 0, "active": 0, "http2": 0}
+    for connection in connections:
+        if connection.is_idle():
+            stats["idle"] += 1
+        elif not connection.is_closed():
+            stats["active"] += 1
+        if "HTTP/2" in connection.info():
+            stats["http2"] += 1
+    return stats
+
+
+class ConnectionPool:
+    """Keep-alive HTTP clients shared by every Anthropic client in the process.
+
+    Sessions reuse the same connections instead of each paying for its
+    own TCP and TLS handshakes and holding its own idle sockets. There is
+    one client for threads and one for the event loop; the async client
+    belongs to the loop that first uses it. ``warm`` and ``warm_async``
+    open connections ahead of the first request.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 64,
+        max_keepalive: int = 32,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        base_url: str = DEFAULT_BASE_URL,
+        warm_connections: int = 2,
+    ):
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("Warning: h2 not installed. API connections will use HTTP/1.1.")
+            http2 = False
+        self.http2 = http2
+        self.base_url = base_url
+        self.warm_connections = warm_connections
+        http = _http_module()
+        self._limits = http.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._lock = threading.Lock()
+        self._sync_client: Any = None
+        self._async_client: Any = None
+        self.requests = 0
+        self._sync_hooks = {"request": [self._count_request]}
+        self._async_hooks = {"request": [self._count_request_async]}
+
+    def _count_request(self, request: Any) -> None:
+        with self._lock:
+            self.requests += 1
+
+    async def _count_request_async(self, request: Any) -> None:
+        self._count_request(request)
+
+    def client(self, asynchronous: bool = False) -> Any:
+        """Return the shared HTTP client to pass to the SDK as ``http_client``."""
+        with self._lock:
+            if asynchronous:
+                if self._async_client is None:
+                    self._async_client = anthropic.DefaultAsyncHttpxClient(
+                        limits=self._limits, http2=self.http2, event_hooks=self._async_hooks
+                    )
+                return self._async_client
+            if self._sync_client is None:
+                self._sync_client = anthropic.DefaultHttpxClient(
+                    limits=self._limits, http2=self.http2, event_hooks=self._sync_hooks
+                )
+            return self._sync_client
+
+    def warm(self, connections: int | None = None) -> int:
+        """Open up to ``connections`` connections to the API concurrently.
+
+        Defaults to ``warm_connections``. Returns how many handshakes
+        succeeded; any response, even an error status, leaves its
+        connection in the pool.
+        """
+        if connections is None:
+            connections = self.warm_connections
+        if connections <= 0:
+            return 0
+        client = self.client()
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            results = list(executor.map(lambda _: self._touch(client), range(connections)))
+        return sum(results)
+
+    async def warm_async(self, connections: int | None = None) -> int:
+        """Async counterpart of ``warm``; run it on the loop that will use the pool."""
+        if connections is None:
+            connections = self.warm_connections
+        if connections <= 0:
+            return 0
+        client = self.client(asynchronous=True)
+        results = await asyncio.gather(*(self._touch_async(client) for _ in range(connections)))
+        return sum(results)
+
+    def _touch(self, client: Any) -> bool:
+        try:
+            client.head(self.base_url)
+            return True
+        except Exception:
+            return False
+
+    async def _touch_async(self, client: Any) -> bool:
+        try:
+            await client.head(self.base_url)
+            return True
+        except Exception:
+            return False
+
+    def stats(self) -> dict[str, Any]:
+        """Return request counts and the state of each client's connections."""
+        with self._lock:
+            sync_client, async_client, requests = self._sync_client, self._async_client, self.requests
+        return {
+            "http2": self.http2,
+            "max_connections": self._limits.max_connections,
+            "max_keepalive": self._limits.max_keepalive_connections,
+            "requests": requests,
+            "sync": _connection_stats(sync_client) if sync_client is not None else None,
+            "async": _connection_stats(async_client) if async_client is not None else None,
+        }
+
+    def close(self) -> None:
+        """Close the sync client; the async one is closed with ``aclose``."""
+        with self._lock:
+            client, self._sync_client = self._sync_client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close both clients."""
+        with self._lock:
+            client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+        self.close()
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def active_pool() -> ConnectionPool | None:
+    """Return the process-wide pool if any client has created it."""
+    return _pool
+
+
+def get_pool(settings: Settings) -> ConnectionPool:
+    """Return the process-wide connection pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                max_connections=settings.api_pool_max_connections,
+                max_keepalive=settings.api_pool_max_keepalive,
+                keepalive_expiry=settings.api_pool_keepalive_expiry,
+                http2=settings.api_http2,
+                base_url=os.getenv("ANTHROPIC_BASE_URL") or DEFAULT_BASE_URL,
+                warm_connections=settings.api_pool_warm_connections,
+            )
+        return _pool
@@ -0,0 +1,674 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from enum import IntEnum
+from typing import Any, Callable, Iterator
+
+import anthropic
+
+from config.settings import Settings
+from metrics import (
+    API_HEDGES,
+    API_QUEUE_SECONDS,
+    API_RATE_LIMIT_WAIT_SECONDS,
+    API_REJECTED,
+    API_RETRIES,
+)
+
+RATELIMIT_PREFIX = "anthropic-ratelimit-"
+# Token limits are per request size, not per call, so stop short of zero
+TOKEN_LOW_WATER = 0.02
+MAX_RESET_WAIT = 60.0
+
+
+class Priority(IntEnum):
+    """Scheduling class of an API call; lower values are admitted first."""
+
+    VOICE = 0
+    TEXT = 1
+    BACKGROUND = 2
+
+
+_current_priority: ContextVar[Priority] = ContextVar("api_priority", default=Priority.TEXT)
+
+
+@contextmanager
+def api_priority(priority: Priority) -> Iterator[None]:
+    """Run API calls made inside the block, in this thread or task, at ``priority``."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class SchedulerBusy(Exception):
+    """Raised when an API call cannot even be queued."""
+
+
+def _int_header(headers: Any, name: str) -> int | None:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _seconds_until(timestamp: str | None) -> float:
+    """Seconds until an RFC 3339 reset time, clamped to [0, MAX_RESET_WAIT]."""
+    if not timestamp:
+        return 0.0
+    try:
+        reset = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    delay = (reset - datetime.now(timezone.utc)).total_seconds()
+    return min(max(delay, 0.0), MAX_RESET_WAIT)
+
+
+def _retry_after(error: Exception) -> float | None:
+    """The server's Retry-After for an error response, in seconds."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_reason(error: Exception) -> str | None:
+    """Why an error is worth retrying, or None if it is not."""
+    if isinstance(error, anthropic.APIStatusError):
+        if error.status_code == 429 or error.status_code >= 500:
+            return str(error.status_code)
+        return None
+    if isinstance(error, anthropic.APITimeoutError):
+        return "timeout"
+    if isinstance(error, anthropic.APIConnectionError):
+        return "connection"
+    return None
+
+
+class RateLimiter:
+    """Token bucket for requests, kept in step with the API's rate-limit headers.
+
+    Until a response reports ``anthropic-ratelimit-requests-limit`` nothing
+    is throttled. After that the bucket refills at limit per minute and is
+    clamped to the reported remaining count, so other processes sharing the
+    key are accounted for. Token limits close to exhaustion, and 429s,
+    block every call until the reported reset or Retry-After.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rate: float | None = None
+        self.capacity = 0.0
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a request token; returns 0, or how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                return self.blocked_until - now
+            if self.rate is None:
+                return 0.0
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def try_reserve(self) -> bool:
+        """Take a request token only if one is available right now."""
+        return self.reserve() == 0.0
+
+    def update(self, headers: Any) -> None:
+        """Resynchronize with the rate-limit headers of a response."""
+        if headers is None:
+            return
+        limit = _int_header(headers, RATELIMIT_PREFIX + "requests-limit")
+        remaining = _int_header(headers, RATELIMIT_PREFIX + "requests-remaining")
+        with self._lock:
+            now = time.monotonic()
+            if limit:
+                known = self.rate is not None
+                self._refill(now)
+                self.rate = limit / 60.0
+                self.capacity = float(limit)
+                if remaining is not None:
+                    self.tokens = min(self.tokens, remaining) if known else float(remaining)
+            for kind in ("tokens", "input-tokens", "output-tokens"):
+                token_limit = _int_header(headers, f"{RATELIMIT_PREFIX}{kind}-limit")
+                token_remaining = _int_header(headers, f"{RATELIMIT_PREFIX}{kind}-remaining")
+                if token_limit and token_remaining is not None and token_remaining <= token_limit * TOKEN_LOW_WATER:
+                    reset = _seconds_until(headers.get(f"{RATELIMIT_PREFIX}{kind}-reset"))
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def penalize(self, delay: float) -> None:
+        """Hold every call for ``delay`` seconds, e.g. after a 429."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the learned rate and the current bucket level."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "requests_per_minute": self.rate * 60 if self.rate is not None else None,
+                "tokens": round(self.tokens, 2) if self.rate is not None else None,
+                "blocked_seconds": max(0.0, self.blocked_until - now),
+            }
+
+
+class _Waiter:
+    """A call waiting for an in-flight slot, from a thread or an event loop."""
+
+    __slots__ = ("event", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, event: threading.Event | None = None, loop: Any = None, future: Any = None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+        self.cancelled = False
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionQueue:
+    """At most ``max_in_flight`` calls at once; the rest wait in priority order.
+
+    Waiters of equal priority are admitted first come, first served. When
+    ``max_queue`` calls are already waiting, new ones are refused with
+    SchedulerBusy rather than queued without bound. Threads and asyncio
+    tasks share the same slots.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 64):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._heap: list[tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self.in_flight = 0
+        self.waiting = 0
+
+    def _enter(self, priority: Priority, waiter: _Waiter) -> bool:
+        """Take a slot or queue the waiter; returns True if a slot was taken. Caller holds _lock."""
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self.in_flight += 1
+            return True
+        if self.waiting >= self.max_queue:
+            raise SchedulerBusy(f"API call queue is full ({self.max_queue} waiting).")
+        heapq.heappush(self._heap, (priority, next(self._sequence), waiter))
+        self.waiting += 1
+        return False
+
+    def acquire(self, priority: Priority) -> None:
+        """Block the calling thread until a slot is free."""
+        waiter = _Waiter(event=threading.Event())
+        with self._lock:
+            if self._enter(priority, waiter):
+                return
+        waiter.event.wait()
+
+    async def acquire_async(self, priority: Priority) -> None:
+        """Wait for a slot without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop=loop, future=loop.create_future())
+        with self._lock:
+            if self._enter(priority, waiter):
+                return
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    waiter.cancelled = True
+                    self.waiting -= 1
+            # The slot was already handed over; pass it on
+            if granted:
+                self.release()
+            raise
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is waiting for it."""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        """Hand the slot to the most urgent waiter, or free it."""
+        with self._lock:
+            while self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                if waiter.cancelled:
+                    continue
+                self.waiting -= 1
+                waiter.granted = True
+                if waiter.event is not None:
+                    waiter.event.set()
+                    return
+                try:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                    return
+                except RuntimeError:
+                    # Its event loop is gone
+                    continue
+            self.in_flight -= 1
+
+
+class APIScheduler:
+    """Admission control, rate limiting, retries and hedging for Messages API calls.
+
+    Every call first takes an in-flight slot from the AdmissionQueue at the
+    priority set with ``api_priority``, then a request token from the
+    RateLimiter. Rate-limit, overload, server and connection errors are
+    retried up to ``max_retries`` times with full-jitter exponential backoff,
+    never sooner than the server's Retry-After. With ``hedge_after`` > 0 a
+    non-streaming call still running after that many seconds is sent a
+    second time, if a slot is free without waiting and the rate limit
+    allows, and the first answer wins. The hedge's slot is held until both
+    copies have finished, so a loser still running counts against capacity.
+    Streams are only retried while opening, before any event is delivered.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queue: int = 64,
+        max_retries: int = 4,
+        retry_base: float = 0.5,
+        retry_max: float = 30.0,
+        hedge_after: float = 0.0,
+    ):
+        self.admission = AdmissionQueue(max_in_flight, max_queue)
+        self.limiter = RateLimiter()
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.hedge_after = hedge_after
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def stats(self) -> dict[str, Any]:
+        """Return slot usage and rate-limiter state for a status endpoint."""
+        return {
+            "in_flight": self.admission.in_flight,
+            "waiting": self.admission.waiting,
+            "max_in_flight": self.admission.max_in_flight,
+            "max_queue": self.admission.max_queue,
+            "rate_limit": self.limiter.stats(),
+        }
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """Backoff before retrying ``error``, or None if it should be raised."""
+        reason = _retry_reason(error)
+        if reason is None or attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        API_RETRIES.inc(reason=reason)
+        return delay
+
+    def _observe_error(self, error: Exception) -> None:
+        """Feed an error response's headers to the limiter."""
+        if not isinstance(error, anthropic.APIStatusError):
+            return
+        self.limiter.update(error.response.headers)
+        if error.status_code == 429:
+            self.limiter.penalize(_retry_after(error) or self.retry_base)
+
+    def _admitted(self, priority: Priority, started: float) -> None:
+        API_QUEUE_SECONDS.observe(time.perf_counter() - started, priority=priority.name.lower())
+
+    def _rejected(self, priority: Priority) -> None:
+        API_REJECTED.inc(priority=priority.name.lower())
+
+    def _try_hedge_slot(self) -> bool:
+        """Take a slot and a request token for a hedge, or neither."""
+        if not self.admission.try_acquire():
+            return False
+        if not self.limiter.try_reserve():
+            self.admission.release()
+            return False
+        return True
+
+    def _release_when_done(self, futures: list[Any]) -> None:
+        """Release one slot once every future or task in futures has finished."""
+        remaining = len(futures)
+        lock = threading.Lock()
+
+        def finished(_: Any) -> None:
+            nonlocal remaining
+            with lock:
+                remaining -= 1
+                last = remaining == 0
+            if last:
+                self.admission.release()
+
+        for future in futures:
+            future.add_done_callback(finished)
+
+    # Threads
+
+    def _admit(self) -> None:
+        priority = _current_priority.get()
+        started = time.perf_counter()
+        try:
+            self.admission.acquire(priority)
+        except SchedulerBusy:
+            self._rejected(priority)
+            raise
+        self._admitted(priority, started)
+
+    def _wait_for_rate_limit(self) -> None:
+        waited = 0.0
+        while (delay := self.limiter.reserve()) > 0:
+            time.sleep(delay)
+            waited += delay
+        API_RATE_LIMIT_WAIT_SECONDS.observe(waited)
+
+    def _retrying(self, call: Callable[[], Any]) -> Any:
+        attempt = 0
+        while True:
+            self._wait_for_rate_limit()
+            try:
+                return call()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    def _call_once(self, messages: Any, params: dict[str, Any]) -> Any:
+        """One request, reading rate-limit headers when the client exposes them."""
+        try:
+            if hasattr(messages, "with_raw_response"):
+                raw = messages.with_raw_response.create(**params)
+                self.limiter.update(raw.headers)
+                return raw.parse()
+            return messages.create(**params)
+        except Exception as e:
+            self._observe_error(e)
+            raise
+
+    def _call_hedged(self, messages: Any, params: dict[str, Any]) -> Any:
+        """Send a second copy of a slow call; the loser is left to finish and discarded.
+
+        A running request cannot be interrupted from another thread, so a
+        losing call keeps its connection until it ends; the hedge's slot
+        stays taken until then.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=2 * self.admission.max_in_flight, thread_name_prefix="api-hedge"
+                )
+        primary = self._executor.submit(self._call_once, messages, params)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done or not self._try_hedge_slot():
+            return primary.result()
+
+        hedge = self._executor.submit(self._call_once, messages, params)
+        self._release_when_done([primary, hedge])
+        names = {primary: "primary", hedge: "hedge"}
+        pending = set(names)
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        API_HEDGES.inc(winner=names[future])
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            # Only a loser still queued on the executor can be called off
+            for future in pending:
+                future.cancel()
+
+    def create(self, messages: Any, params: dict[str, Any]) -> Any:
+        """Schedule ``messages.create(**params)``."""
+        self._admit()
+        try:
+            if self.hedge_after > 0:
+                return self._retrying(lambda: self._call_hedged(messages, params))
+            return self._retrying(lambda: self._call_once(messages, params))
+        finally:
+            self.admission.release()
+
+    def _open_stream(self, messages: Any, params: dict[str, Any]) -> tuple[Any, Any]:
+        manager = messages.stream(**params)
+        try:
+            stream = manager.__enter__()
+        except Exception as e:
+            self._observe_error(e)
+            raise
+        response = getattr(stream, "response", None)
+        self.limiter.update(getattr(response, "headers", None))
+        return manager, stream
+
+    # Event loop
+
+    async def _admit_async(self) -> None:
+        priority = _current_priority.get()
+        started = time.perf_counter()
+        try:
+            await self.admission.acquire_async(priority)
+        except SchedulerBusy:
+            self._rejected(priority)
+            raise
+        self._admitted(priority, started)
+
+    async def _wait_for_rate_limit_async(self) -> None:
+        waited = 0.0
+        while (delay := self.limiter.reserve()) > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+        API_RATE_LIMIT_WAIT_SECONDS.observe(waited)
+
+    async def _retrying_async(self, call: Callable[[], Any]) -> Any:
+        attempt = 0
+        while True:
+            await self._wait_for_rate_limit_async()
+            try:
+                return await call()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _call_once_async(self, messages: Any, params: dict[str, Any]) -> Any:
+        try:
+            if hasattr(messages, "with_raw_response"):
+                raw = await messages.with_raw_response.create(**params)
+                self.limiter.update(raw.headers)
+                return await raw.parse()
+            return await messages.create(**params)
+        except Exception as e:
+            self._observe_error(e)
+            raise
+
+    async def _call_hedged_async(self, messages: Any, params: dict[str, Any]) -> Any:
+        """Send a second copy of a slow call and cancel whichever loses."""
+        primary = asyncio.ensure_future(self._call_once_async(messages, params))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if done or not self._try_hedge_slot():
+                return await primary
+
+            hedge = asyncio.ensure_future(self._call_once_async(messages, params))
+            tasks.add(hedge)
+            # Cancelled tasks finish on a later loop iteration, which frees the slot
+            self._release_when_done([primary, hedge])
+            names = {primary: "primary", hedge: "hedge"}
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        API_HEDGES.inc(winner=names[task])
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def create_async(self, messages: Any, params: dict[str, Any]) -> Any:
+        """Schedule ``await messages.create(**params)``."""
+        await self._admit_async()
+        try:
+            if self.hedge_after > 0:
+                return await self._retrying_async(lambda: self._call_hedged_async(messages, params))
+            return await self._retrying_async(lambda: self._call_once_async(messages, params))
+        finally:
+            self.admission.release()
+
+    async def _open_stream_async(self, messages: Any, params: dict[str, Any]) -> tuple[Any, Any]:
+        manager = messages.stream(**params)
+        try:
+            stream = await manager.__aenter__()
+        except Exception as e:
+            self._observe_error(e)
+            raise
+        response = getattr(stream, "response", None)
+        self.limiter.update(getattr(response, "headers", None))
+        return manager, stream
+
+
+class _ScheduledStream:
+    """Holds an in-flight slot for the life of a stream; yields the underlying stream."""
+
+    def __init__(self, scheduler: APIScheduler, messages: Any, params: dict[str, Any]):
+        self._scheduler = scheduler
+        self._messages = messages
+        self._params = params
+        self._manager: Any = None
+
+    def __enter__(self) -> Any:
+        self._scheduler._admit()
+        try:
+            self._manager, stream = self._scheduler._retrying(
+                lambda: self._scheduler._open_stream(self._messages, self._params)
+            )
+        except BaseException:
+            self._scheduler.admission.release()
+            raise
+        return stream
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        try:
+            return self._manager.__exit__(*exc_info)
+        finally:
+            self._scheduler.admission.release()
+
+    async def __aenter__(self) -> Any:
+        await self._scheduler._admit_async()
+        try:
+            self._manager, stream = await self._scheduler._retrying_async(
+                lambda: self._scheduler._open_stream_async(self._messages, self._params)
+            )
+        except BaseException:
+            self._scheduler.admission.release()
+            raise
+        return stream
+
+    async def __aexit__(self, *exc_info: Any) -> Any:
+        try:
+            return await self._manager.__aexit__(*exc_info)
+        finally:
+            self._scheduler.admission.release()
+
+
+class _ScheduledMessages:
+    """``messages`` resource that sends every call through an APIScheduler."""
+
+    def __init__(self, inner: Any, scheduler: APIScheduler):
+        self._inner = inner
+        self._scheduler = scheduler
+
+    def create(self, **params: Any) -> Any:
+        return self._scheduler.create(self._inner, params)
+
+    def stream(self, **params: Any) -> _ScheduledStream:
+        return _ScheduledStream(self._scheduler, self._inner, params)
+
+
+class _AsyncScheduledMessages(_ScheduledMessages):
+    """Async counterpart of ``_ScheduledMessages``."""
+
+    async def create(self, **params: Any) -> Any:
+        return await self._scheduler.create_async(self._inner, params)
+
+
+class ScheduledTransport:
+    """Stands in for ``anthropic.Anthropic``, scheduling every call on an APIScheduler.
+
+    Wraps a live client or another transport; pass ``asynchronous=True``
+    for ``anthropic.AsyncAnthropic``.
+    """
+
+    def __init__(self, client: Any, scheduler: APIScheduler, asynchronous: bool = False):
+        self.client = client
+        self.scheduler = scheduler
+        messages_class = _AsyncScheduledMessages if asynchronous else _ScheduledMessages
+        self.messages = messages_class(client.messages, scheduler)
+
+
+_scheduler: APIScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def active_scheduler() -> APIScheduler | None:
+    """Return the process-wide scheduler if any client has created it."""
+    return _scheduler
+
+
+def get_scheduler(settings: Settings) -> APIScheduler:
+    """Return the process-wide scheduler, so every session shares one budget."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = APIScheduler(
+                max_in_flight=settings.api_max_in_flight,
+                max_queue=settings.api_max_queue,
+                max_retries=settings.api_max_retries,
+                retry_base=settings.api_retry_base,
+                retry_max=settings.api_retry_max,
+                hedge_after=settings.api_hedge_after,
+            )
+        return _scheduler
@@ -0,0 +1,200 @@
+import asyncio
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .client import BaseLLMClient
+from .store import ConversationStore
+
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+@dataclass
+class Session:
+    """A single user's conversation, guarded by its own lock.
+
+    Threaded servers serialize turns with ``lock``; asyncio servers use
+    ``async_lock`` so waiting for a busy session never blocks the loop.
+    ``leases`` counts requests that hold the session between
+    ``SessionManager.get_or_create`` and ``release``; a leased session is
+    never evicted, even before its request takes the lock.
+    """
+
+    session_id: str
+    client: BaseLLMClient
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    async_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    created_at: float = field(default_factory=time.monotonic)
+    last_access: float = field(default_factory=time.monotonic)
+    leases: int = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate size of the session's conversation history."""
+        return self.client.history_bytes
+
+    @property
+    def in_use(self) -> bool:
+        """Whether a request is currently running against this session."""
+        return self.leases > 0 or self.lock.locked() or self.async_lock.locked()
+
+
+class SessionManager:
+    """Keeps one LLM client per session with LRU, idle-TTL and memory eviction.
+
+    With a ``store``, every history change is written through to disk, so
+    eviction only frees memory: a session that is asked for again is loaded
+    back from the store on first access, including after a restart.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], BaseLLMClient],
+        max_sessions: int = 100,
+        idle_ttl: float = 1800.0,
+        memory_limit_bytes: int = 256 * 1024 * 1024,
+        store: ConversationStore | None = None,
+    ):
+        self.client_factory = client_factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_limit_bytes = memory_limit_bytes
+        self.store = store
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.restored = 0
+
+    def get_or_create(self, session_id: str | None = None) -> Session:
+        """Return the session for session_id, creating it if needed, and lease it.
+
+        Unknown or malformed ids get a fresh session; callers should hand the
+        returned ``session.session_id`` back to the client. The session cannot
+        be evicted until the caller passes it to ``release``. Creating a
+        client and discarding evicted ones may block, so async servers should
+        call this from a worker thread.
+        """
+        with self._lock:
+            evicted = self._evict_idle()
+
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                if not session_id or not _SESSION_ID_PATTERN.match(session_id):
+                    session_id = secrets.token_urlsafe(24)
+                client = self.client_factory()
+                if self.store is not None:
+                    client.attach_store(self.store, session_id)
+                    if client.conversation_history:
+                        self.restored += 1
+                session = Session(session_id=session_id, client=client)
+                self._sessions[session_id] = session
+
+            self._sessions.move_to_end(session_id)
+            session.last_access = time.monotonic()
+            session.leases += 1
+            evicted += self._enforce_limits(keep=session_id)
+
+        # Closing a client may stop processes, so do it outside the lock
+        for victim in evicted:
+            self._discard(victim)
+        return session
+
+    def release(self, session: Session) -> None:
+        """End a lease taken by get_or_create, making the session evictable again."""
+        with self._lock:
+            session.leases -= 1
+            session.last_access = time.monotonic()
+
+    def remove(self, session_id: str) -> bool:
+        """Drop a session from memory. Returns True if it was loaded.
+
+        Its stored history is kept; clear the client's history first to delete it.
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._discard(session)
+        return True
+
+    def close_all(self) -> None:
+        """Drop every session, e.g. on server shutdown."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._discard(session)
+
+    def total_memory_bytes(self) -> int:
+        """Approximate memory held by all live sessions."""
+        with self._lock:
+            return sum(session.memory_bytes for session in self._sessions.values())
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters suitable for a status endpoint."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "active_sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "memory_bytes": sum(session.memory_bytes for session in sessions),
+            "memory_limit_bytes": self.memory_limit_bytes,
+            "largest_session_bytes": max(
+                (session.memory_bytes for session in sessions), default=0
+            ),
+            "evictions": self.evictions,
+            "restored": self.restored,
+            "store": self.store.stats() if self.store else None,
+        }
+
+    def _evict_idle(self) -> list[Session]:
+        """Drop sessions idle for longer than idle_ttl and return them. Caller holds _lock."""
+        evicted = []
+        cutoff = time.monotonic() - self.idle_ttl
+        for session_id, session in list(self._sessions.items()):
+            # The dict is in LRU order, so the first fresh session ends the scan
+            if session.last_access >= cutoff:
+                break
+            if not session.in_use:
+                del self._sessions[session_id]
+                self.evictions += 1
+                evicted.append(session)
+        return evicted
+
+    def _enforce_limits(self, keep: str) -> list[Session]:
+        """Evict least recently used sessions until under the count and memory caps.
+
+        Returns the evicted sessions. Caller holds _lock.
+        """
+        evicted = []
+        total_bytes = sum(session.memory_bytes for session in self._sessions.values())
+        while (
+            len(self._sessions) > self.max_sessions
+            or total_bytes > self.memory_limit_bytes
+        ):
+            victim = next(
+                (
+                    session
+                    for session_id, session in self._sessions.items()
+                    if session_id != keep and not session.in_use
+                ),
+                None,
+            )
+            if victim is None:
+                break
+            del self._sessions[victim.session_id]
+            total_bytes -= victim.memory_bytes
+            self.evictions += 1
+            evicted.append(victim)
+        return evicted
+
+    def _discard(self, session: Session) -> None:
+        """Release a session that has been removed from the manager."""
+        # Detaching first keeps the stored history; only the memory is freed
+        session.client.detach_store()
+        session.client.clear_history()
+        session.client.close()
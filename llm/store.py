@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID
+"""
+
+
+def complete_turns(history: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Drop a trailing turn that was cut off, e.g. by a restart mid tool loop.
+
+    A history is only valid to continue after a final assistant reply; an
+    unanswered user message or a tool call without its result would make
+    the next request fail.
+    """
+    end = len(history)
+    while end:
+        message = history[end - 1]
+        content = message["content"]
+        calls_tools = isinstance(content, list) and any(
+            isinstance(block, dict) and block.get("type") == "tool_use" for block in content
+        )
+        if message["role"] == "assistant" and not calls_tools:
+            break
+        end -= 1
+    return history[:end]
+
+
+def _dumps(content: Any) -> str:
+    """Serialize message content as compact JSON."""
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False)
+
+
+class ConversationStore:
+    """Durable conversation histories in a single SQLite file.
+
+    Each session's history is an append-only run of rows keyed by
+    ``(session_id, seq)``; a turn only ever appends. Compaction and
+    clearing rewrite the session's rows in one transaction, so the table
+    always holds exactly what the client would send next. Content is stored
+    as compact JSON of the plain dicts kept in ``conversation_history``.
+
+    One connection is shared behind a lock, in WAL mode without a sync on
+    every commit: a crash may lose the last few appends but never corrupts
+    the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        # Next seq per session, so appends need no read
+        self._next_seq: dict[str, int] = {}
+
+    def exists(self, session_id: str) -> bool:
+        """Whether any history is stored for session_id."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM messages WHERE session_id = ? LIMIT 1", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def load(self, session_id: str) -> list[dict[str, Any]]:
+        """Return the stored history for session_id, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, role, content FROM messages WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+            self._next_seq[session_id] = rows[-1][0] + 1 if rows else 0
+        return [{"role": role, "content": json.loads(content)} for _, role, content in rows]
+
+    def append(self, session_id: str, message: dict[str, Any]) -> None:
+        """Append one message to the session's history."""
+        content = _dumps(message["content"])
+        with self._lock:
+            seq = self._next_seq.get(session_id)
+            if seq is None:
+                row = self._conn.execute(
+                    "SELECT MAX(seq) FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                seq = row[0] + 1 if row[0] is not None else 0
+            self._conn.execute(
+                "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                (session_id, seq, message["role"], content),
+            )
+            self._next_seq[session_id] = seq + 1
+
+    def replace(self, session_id: str, messages: list[dict[str, Any]]) -> None:
+        """Atomically replace the session's history, e.g. after compaction."""
+        rows = [
+            (session_id, seq, message["role"], _dumps(message["content"]))
+            for seq, message in enumerate(messages)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)", rows
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._next_seq[session_id] = len(rows)
+
+    def clear(self, session_id: str) -> None:
+        """Delete the session's history."""
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._next_seq[session_id] = 0
+
+    def forget(self, session_id: str) -> None:
+        """Drop cached bookkeeping for a session that is no longer in memory."""
+        with self._lock:
+            self._next_seq.pop(session_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the number of stored sessions and messages and the file size."""
+        with self._lock:
+            sessions, messages = self._conn.execute(
+                "SELECT COUNT(DISTINCT session_id), COUNT(*) FROM messages"
+            ).fetchone()
+        size = sum(
+            os.path.getsize(path)
+            for path in (self.path, self.path + "-wal")
+            if os.path.exists(path)
+        )
+        return {"stored_sessions": sessions, "stored_messages": messages, "bytes": size}
+
+    def close(self) -> None:
+        """Checkpoint the log and close the database."""
+        with self._lock:
+            self._conn.close()
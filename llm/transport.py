@@ -0,0 +1,390 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Iterator
+
+import anthropic
+from anthropic.types import Message
+
+from config.settings import Settings
+
+from .pool import get_pool
+from .scheduler import ScheduledTransport, get_scheduler
+
+TRANSPORT_MODES = ("live", "record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Raised when a replayed request has no recorded response."""
+
+
+def _jsonable(value: Any) -> Any:
+    """JSON fallback for SDK objects, such as content blocks fed back into the history."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def request_hash(params: dict[str, Any]) -> str:
+    """Return a stable hash of a Messages API request."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_jsonable)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _request_summary(params: dict[str, Any]) -> dict[str, Any]:
+    """The parts of a request worth keeping in a cassette for debugging misses.
+
+    The full history is left out: it is repeated in every request, so
+    storing it would make cassettes grow with the square of the
+    conversation length.
+    """
+    messages = params.get("messages") or []
+    return {
+        "model": params.get("model"),
+        "message_count": len(messages),
+        "last_message": messages[-1] if messages else None,
+    }
+
+
+class Cassette:
+    """Recorded request/response pairs, stored one JSON object per line.
+
+    Each line holds the request hash, a summary of the request, the
+    response as returned by the API, how long it took and, for streamed
+    calls, the text deltas with their offsets in seconds. When one request
+    was recorded several times its responses are replayed in order, and the
+    last one is repeated once they run out. With ``strict=False`` a request
+    that was never recorded gets the next unused response in file order.
+    """
+
+    def __init__(self, path: str, strict: bool = True):
+        self.path = path
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._entries: list[dict[str, Any]] = []
+        self._by_hash: dict[str, deque[int]] = defaultdict(deque)
+        self._last_by_hash: dict[str, int] = {}
+        self._used: set[int] = set()
+        self._next_unused = 0
+
+    def append(self, entry: dict[str, Any]) -> None:
+        """Record an interaction at the end of the file."""
+        line = json.dumps(entry, ensure_ascii=False, default=_jsonable)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def lookup(self, key: str) -> dict[str, Any]:
+        """Return the recorded interaction for a request hash.
+
+        Raises CassetteMiss when there is none.
+        """
+        with self._lock:
+            self._load()
+            queue = self._by_hash.get(key)
+            if queue:
+                index = queue.popleft()
+            elif key in self._last_by_hash:
+                index = self._last_by_hash[key]
+            elif not self.strict:
+                while self._next_unused < len(self._entries) and self._next_unused in self._used:
+                    self._next_unused += 1
+                if self._next_unused >= len(self._entries):
+                    raise CassetteMiss(f"No unused responses left in {self.path}")
+                index = self._next_unused
+            else:
+                raise CassetteMiss(
+                    f"No recorded response for request {key[:12]} in {self.path}. "
+                    "Record it again, or replay with strict matching turned off."
+                )
+            self._used.add(index)
+            return self._entries[index]
+
+    def _load(self) -> None:
+        """Read the cassette file on first lookup."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._entries.append(json.loads(line))
+        except FileNotFoundError:
+            raise CassetteMiss(f"Cassette not found: {self.path}") from None
+        for index, entry in enumerate(self._entries):
+            self._by_hash[entry["hash"]].append(index)
+            self._last_by_hash[entry["hash"]] = index
+
+
+_cassettes: dict[tuple[str, bool], Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str, strict: bool = True) -> Cassette:
+    """Return the shared Cassette for a file, so all sessions append to and replay from one place."""
+    key = (os.path.abspath(path), strict)
+    with _cassettes_lock:
+        cassette = _cassettes.get(key)
+        if cassette is None:
+            cassette = Cassette(key[0], strict)
+            _cassettes[key] = cassette
+        return cassette
+
+
+def _entry(key: str, params: dict[str, Any], message: Message, latency: float, chunks: list | None) -> dict[str, Any]:
+    """Build a cassette line for one interaction."""
+    return {
+        "hash": key,
+        "request": _request_summary(params),
+        "response": message.model_dump(mode="json"),
+        "latency": round(latency, 4),
+        "chunks": chunks,
+    }
+
+
+def _replay_chunks(entry: dict[str, Any]) -> list[list[Any]]:
+    """Text deltas to replay for an interaction; one per text block if none were recorded."""
+    if entry.get("chunks") is not None:
+        return entry["chunks"]
+    return [
+        [0.0, block["text"]]
+        for block in entry["response"]["content"]
+        if block.get("type") == "text" and block.get("text")
+    ]
+
+
+class _RecordingStream:
+    """Wraps an SDK message stream, recording its text deltas and final message."""
+
+    def __init__(self, manager: Any, cassette: Cassette, params: dict[str, Any]):
+        self._manager = manager
+        self._cassette = cassette
+        self._params = params
+        self._stream: Any = None
+        self._chunks: list[list[Any]] = []
+        self._started = 0.0
+
+    def __enter__(self) -> "_RecordingStream":
+        self._started = time.monotonic()
+        self._stream = self._manager.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        return self._manager.__exit__(*exc_info)
+
+    async def __aenter__(self) -> "_RecordingStream":
+        self._started = time.monotonic()
+        self._stream = await self._manager.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> Any:
+        return await self._manager.__aexit__(*exc_info)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    @property
+    def text_stream(self) -> Any:
+        """The wrapped stream's text deltas, timestamped as they pass."""
+        if hasattr(self._stream.text_stream, "__aiter__"):
+            return self._atext_stream()
+        return self._text_stream()
+
+    def _text_stream(self) -> Iterator[str]:
+        for text in self._stream.text_stream:
+            self._chunks.append([round(time.monotonic() - self._started, 4), text])
+            yield text
+
+    async def _atext_stream(self) -> AsyncIterator[str]:
+        async for text in self._stream.text_stream:
+            self._chunks.append([round(time.monotonic() - self._started, 4), text])
+            yield text
+
+    def get_final_message(self) -> Any:
+        """Return the final message and record the interaction."""
+        result = self._stream.get_final_message()
+        if asyncio.iscoroutine(result):
+            return self._arecord(result)
+        self._record(result)
+        return result
+
+    async def _arecord(self, pending: Any) -> Message:
+        message = await pending
+        self._record(message)
+        return message
+
+    def _record(self, message: Message) -> None:
+        latency = time.monotonic() - self._started
+        self._cassette.append(_entry(request_hash(self._params), self._params, message, latency, self._chunks))
+
+
+class _ReplayStream:
+    """Plays back a recorded stream, with the recorded pacing scaled by latency_scale."""
+
+    def __init__(self, entry: dict[str, Any], latency_scale: float):
+        self._entry = entry
+        self._latency_scale = latency_scale
+
+    def __enter__(self) -> "_ReplayStream":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        """Replay the recorded text deltas."""
+        elapsed = 0.0
+        for offset, text in _replay_chunks(self._entry):
+            if self._latency_scale and offset > elapsed:
+                time.sleep((offset - elapsed) * self._latency_scale)
+                elapsed = offset
+            yield text
+
+    def get_final_message(self) -> Message:
+        """Return the recorded final message."""
+        return Message.model_validate(self._entry["response"])
+
+
+class _AsyncReplayStream(_ReplayStream):
+    """Async counterpart of ``_ReplayStream``."""
+
+    async def __aenter__(self) -> "_AsyncReplayStream":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+    @property
+    async def text_stream(self) -> AsyncIterator[str]:
+        """Replay the recorded text deltas without blocking the loop."""
+        elapsed = 0.0
+        for offset, text in _replay_chunks(self._entry):
+            if self._latency_scale and offset > elapsed:
+                await asyncio.sleep((offset - elapsed) * self._latency_scale)
+                elapsed = offset
+            yield text
+
+    async def get_final_message(self) -> Message:
+        """Return the recorded final message."""
+        return Message.model_validate(self._entry["response"])
+
+
+class _RecordingMessages:
+    """``messages`` resource that forwards to the live API and records each call."""
+
+    def __init__(self, inner: Any, cassette: Cassette):
+        self._inner = inner
+        self._cassette = cassette
+
+    def create(self, **params: Any) -> Message:
+        started = time.monotonic()
+        message = self._inner.create(**params)
+        self._cassette.append(_entry(request_hash(params), params, message, time.monotonic() - started, None))
+        return message
+
+    def stream(self, **params: Any) -> _RecordingStream:
+        return _RecordingStream(self._inner.stream(**params), self._cassette, params)
+
+
+class _AsyncRecordingMessages(_RecordingMessages):
+    """Async counterpart of ``_RecordingMessages``."""
+
+    async def create(self, **params: Any) -> Message:
+        started = time.monotonic()
+        message = await self._inner.create(**params)
+        self._cassette.append(_entry(request_hash(params), params, message, time.monotonic() - started, None))
+        return message
+
+
+class _ReplayMessages:
+    """``messages`` resource that answers from a cassette."""
+
+    def __init__(self, cassette: Cassette, latency_scale: float):
+        self._cassette = cassette
+        self._latency_scale = latency_scale
+
+    def create(self, **params: Any) -> Message:
+        entry = self._cassette.lookup(request_hash(params))
+        if self._latency_scale:
+            time.sleep(entry.get("latency", 0.0) * self._latency_scale)
+        return Message.model_validate(entry["response"])
+
+    def stream(self, **params: Any) -> _ReplayStream:
+        return _ReplayStream(self._cassette.lookup(request_hash(params)), self._latency_scale)
+
+
+class _AsyncReplayMessages(_ReplayMessages):
+    """Async counterpart of ``_ReplayMessages``."""
+
+    async def create(self, **params: Any) -> Message:
+        entry = self._cassette.lookup(request_hash(params))
+        if self._latency_scale:
+            await asyncio.sleep(entry.get("latency", 0.0) * self._latency_scale)
+        return Message.model_validate(entry["response"])
+
+    def stream(self, **params: Any) -> _AsyncReplayStream:
+        return _AsyncReplayStream(self._cassette.lookup(request_hash(params)), self._latency_scale)
+
+
+class RecordingTransport:
+    """Stands in for ``anthropic.Anthropic``, recording every call to a cassette.
+
+    Pass ``asynchronous=True`` to wrap ``anthropic.AsyncAnthropic`` instead.
+    """
+
+    def __init__(self, client: Any, cassette: Cassette, asynchronous: bool = False):
+        self.client = client
+        self.cassette = cassette
+        messages_class = _AsyncRecordingMessages if asynchronous else _RecordingMessages
+        self.messages = messages_class(client.messages, cassette)
+
+
+class ReplayTransport:
+    """Stands in for ``anthropic.Anthropic``, answering every call from a cassette.
+
+    Responses are matched on the hash of the request. ``latency_scale``
+    of 1.0 reproduces the recorded response times and streaming pace, 0
+    (the default) replays instantly. No network access or API key is needed.
+    """
+
+    def __init__(self, cassette: Cassette, latency_scale: float = 0.0, asynchronous: bool = False):
+        self.cassette = cassette
+        messages_class = _AsyncReplayMessages if asynchronous else _ReplayMessages
+        self.messages = messages_class(cassette, latency_scale)
+
+
+def create_transport(settings: Settings, asynchronous: bool = False) -> Any:
+    """Return the object LLM clients send API calls through, per ``settings.llm_transport``.
+
+    Live clients share the process-wide connection pool. With
+    ``settings.api_scheduler`` the result is wrapped in a ScheduledTransport,
+    which then owns retries instead of the SDK.
+    """
+    mode = settings.llm_transport
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown LLM_TRANSPORT: {mode}. Expected one of: {', '.join(TRANSPORT_MODES)}")
+
+    if mode == "replay":
+        cassette = get_cassette(settings.llm_cassette, strict=settings.replay_strict)
+        transport = ReplayTransport(cassette, settings.replay_latency_scale, asynchronous)
+    else:
+        client_class = anthropic.AsyncAnthropic if asynchronous else anthropic.Anthropic
+        options = {"max_retries": 0} if settings.api_scheduler else {}
+        http_client = get_pool(settings).client(asynchronous)
+        transport = client_class(api_key=settings.anthropic_api_key, http_client=http_client, **options)
+        if mode == "record":
+            transport = RecordingTransport(transport, get_cassette(settings.llm_cassette), asynchronous)
+
+    if settings.api_scheduler:
+        return ScheduledTransport(transport, get_scheduler(settings), asynchronous)
+    return transport
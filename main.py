@@ -8,30 +8,60 @@ Includes web server with voice interaction capabilities.
 
 import sys
 import os
-import tempfile
+import json
+import asyncio
+import threading
 import io
 import argparse
+import importlib.util
+import logging
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uvicorn
 
 from config.settings import Settings
 from llm.client import LLMClient
+from llm.async_client import AsyncLLMClient
+from llm.batch import BatchRunner, read_batch
+from llm.pool import active_pool, get_pool
+from llm.scheduler import Priority, SchedulerBusy, active_scheduler, api_priority
+from llm.session import Session, SessionManager
+from llm.store import ConversationStore
+from metrics import CHAT_STAGE_SECONDS, CONTENT_TYPE, REGISTRY, TTS_SYNTHESIS_SECONDS, MetricsMiddleware
 from prompts.system import SYSTEM_PROMPT
-from tools import ToolRegistry, ReadTool, WriteTool, EditTool, BashTool
+from tools import ToolRegistry, ReadTool, WriteTool, EditTool, GlobTool, GrepTool, BashTool
+from voice import (
+    AudioDecodeError,
+    AudioTooLarge,
+    SpeechPipeline,
+    TranscriptionPool,
+    TranscriptionQueueFull,
+    TTSCache,
+    TTSJobs,
+    decode_audio,
+    upload_chunks,
+)
+
+logger = logging.getLogger(__name__)
+
+# Voice processing imports. Whisper itself is only imported inside the
+# transcription worker processes, so the server process never loads torch.
+WHISPER_AVAILABLE = importlib.util.find_spec("whisper") is not None
+if not WHISPER_AVAILABLE:
+    print("Warning: whisper not available. Speech-to-text will be disabled.")
 
-# Voice processing imports
 try:
-    import whisper
-    WHISPER_AVAILABLE = True
+    from voice.streaming import StreamingTranscriber
+    STREAMING_STT_AVAILABLE = WHISPER_AVAILABLE
 except ImportError:
-    WHISPER_AVAILABLE = False
-    print("Warning: whisper not available. Speech-to-text will be disabled.")
+    STREAMING_STT_AVAILABLE = False
 
 try:
     import pyttsx3
@@ -49,8 +79,20 @@ if not PYTTSX3_AVAILABLE and not GTTS_AVAILABLE:
     print("Warning: No TTS library available. Text-to-speech will be disabled.")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open API connections on the server's event loop before the first request."""
+    pool = active_pool()
+    if pool is not None:
+        warmed = await pool.warm_async()
+        print(f"Warmed {warmed} API connection(s).")
+    yield
+    if pool is not None:
+        await pool.aclose()
+
+
 # FastAPI app
-app = FastAPI(title="Personal Assistant Agent", version="1.0.0")
+app = FastAPI(title="Personal Assistant Agent", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -61,13 +103,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Endpoints that accept audio uploads, limited to max_audio_upload_bytes
+AUDIO_UPLOAD_PATHS = frozenset({"/api/transcribe", "/api/chat/voice", "/api/chat/voice/stream"})
+
+
+class AudioUploadLimitMiddleware:
+    """Refuse oversized audio uploads with a 413 before they are read.
+
+    A declared Content-Length over the limit is rejected outright; a body
+    that streams past it is cut off as it arrives, before it is spooled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in AUDIO_UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_audio_upload_bytes
+        detail = f"Audio upload exceeds {limit} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(AudioUploadLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # Global instances
-llm_client: LLMClient = None
-whisper_model = None
+session_manager: SessionManager = None
+transcription_pool: TranscriptionPool = None
+tts_cache: TTSCache = None
+tts_jobs: TTSJobs = None
+# Seconds a request for audio still being synthesized waits for it; see Settings
+tts_wait_timeout = Settings.tts_wait_timeout
 tts_engine = None
+# pyttsx3 drives a single native engine that must not be entered concurrently
+tts_engine_lock = threading.Lock()
 
-# Temporary directory for audio files
-AUDIO_TEMP_DIR = tempfile.mkdtemp(prefix="assistant_audio_")
+# Upload limits for the voice endpoints; see Settings
+max_audio_upload_bytes = Settings.max_audio_upload_bytes
+max_audio_seconds = Settings.max_audio_seconds
+
+# Session id transport: an explicit header wins over the cookie
+SESSION_COOKIE = "session_id"
+SESSION_HEADER = "X-Session-ID"
 
 
 class ChatMessage(BaseModel):
@@ -87,24 +183,108 @@ class TranscriptionResponse(BaseModel):
     text: str
 
 
-def create_tool_registry() -> ToolRegistry:
+def create_tool_registry(max_workers: int = 8, persistent_shell: bool = False) -> ToolRegistry:
     """Create and populate the tool registry with available tools."""
-    registry = ToolRegistry()
+    registry = ToolRegistry(max_workers=max_workers)
     registry.register(ReadTool())
     registry.register(WriteTool())
     registry.register(EditTool())
-    registry.register(BashTool())
+    registry.register(GlobTool())
+    registry.register(GrepTool())
+    registry.register(BashTool(persistent=persistent_shell))
+    registry.freeze()
     return registry
 
 
-def init_whisper_model():
-    """Initialize the Whisper model for speech-to-text."""
-    global whisper_model
-    if WHISPER_AVAILABLE and whisper_model is None:
-        print("Loading Whisper model (small)...")
-        whisper_model = whisper.load_model("small")
+async def acquire_session(request: Request) -> Session:
+    """Resolve and lease the caller's session from the session header or cookie.
+
+    The caller must hand the session to ``session_manager.release``. Creating a
+    client starts a shell and reads the store, and evicting others may wait
+    for their shells to exit, so this runs on a worker thread.
+    """
+    if session_manager is None:
+        raise HTTPException(status_code=503, detail="LLM client not initialized")
+
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    leased = []
+    try:
+        await run_in_threadpool(lambda: leased.append(session_manager.get_or_create(session_id)))
+    except BaseException:
+        # Cancelled while the worker finished: do not leak its lease
+        for session in leased:
+            session_manager.release(session)
+        raise
+    return leased[0]
+
+
+@asynccontextmanager
+async def leased_session(request: Request):
+    """Hold the caller's session for the duration of an async with block."""
+    session = await acquire_session(request)
+    try:
+        yield session
+    finally:
+        session_manager.release(session)
+
+
+def attach_session(response: Response, session: Session) -> None:
+    """Tell the client which session it is talking to."""
+    response.headers[SESSION_HEADER] = session.session_id
+    response.set_cookie(SESSION_COOKIE, session.session_id, httponly=True, samesite="lax")
+
+
+async def send_in_session(session: Session, message: str, priority: Priority = Priority.TEXT) -> str:
+    """Run one agent turn while holding the session lock.
+
+    A full API call queue surfaces as a 503, so clients back off instead
+    of seeing a 500.
+    """
+    async with session.async_lock:
+        try:
+            with api_priority(priority):
+                return await session.client.send_message(message, SYSTEM_PROMPT)
+        except SchedulerBusy as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+def init_transcription_pool(settings: Settings) -> TranscriptionPool:
+    """Start the Whisper worker processes for speech-to-text."""
+    global transcription_pool
+    if WHISPER_AVAILABLE and transcription_pool is None:
+        print(
+            f"Loading Whisper model ({settings.whisper_model}) "
+            f"in {settings.transcription_workers} worker process(es)..."
+        )
+        transcription_pool = TranscriptionPool(
+            model_name=settings.whisper_model,
+            workers=settings.transcription_workers,
+            max_queue=settings.transcription_queue_size,
+        )
+        transcription_pool.start()
         print("Whisper model loaded.")
-    return whisper_model
+    return transcription_pool
+
+
+def init_tts_cache(settings: Settings) -> TTSCache:
+    """Open the on-disk cache of synthesized speech."""
+    global tts_cache
+    if tts_cache is None:
+        tts_cache = TTSCache(
+            directory=settings.tts_cache_dir,
+            max_bytes=settings.tts_cache_max_bytes,
+            max_age=settings.tts_cache_max_age,
+        )
+    return tts_cache
+
+
+def init_tts_jobs(settings: Settings) -> TTSJobs:
+    """Start the background speech synthesis workers."""
+    global tts_jobs, tts_wait_timeout
+    if tts_jobs is None:
+        tts_jobs = TTSJobs(init_tts_cache(settings), generate_tts_audio, workers=settings.tts_workers)
+    tts_wait_timeout = settings.tts_wait_timeout
+    return tts_jobs
 
 
 def init_tts_engine():
@@ -116,141 +296,398 @@ def init_tts_engine():
     return tts_engine
 
 
-def transcribe_audio(audio_path: str) -> str:
-    """Transcribe audio file using Whisper."""
-    if not WHISPER_AVAILABLE:
+async def read_upload_audio(audio: UploadFile):
+    """Decode an uploaded recording to 16 kHz samples in memory, without a temp file."""
+    try:
+        return await decode_audio(upload_chunks(audio), max_audio_upload_bytes, max_audio_seconds)
+    except AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode audio: {e}")
+
+
+async def transcribe_audio(audio) -> str:
+    """Transcribe decoded audio samples using the Whisper worker pool."""
+    if transcription_pool is None:
         raise HTTPException(status_code=503, detail="Whisper model not available")
     
-    model = init_whisper_model()
-    result = model.transcribe(audio_path)
-    return result["text"].strip()
+    try:
+        return await transcription_pool.transcribe(audio)
+    except TranscriptionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
 
 def generate_tts_audio(text: str, output_path: str) -> str:
     """Generate TTS audio from text."""
     if GTTS_AVAILABLE:
-        tts = gTTS(text=text, lang='en')
-        tts.save(output_path)
+        with TTS_SYNTHESIS_SECONDS.time(engine="gtts"):
+            tts = gTTS(text=text, lang='en')
+            tts.save(output_path)
         return output_path
     elif PYTTSX3_AVAILABLE:
-        engine = init_tts_engine()
-        engine.save_to_file(text, output_path)
-        engine.runAndWait()
+        with tts_engine_lock:
+            engine = init_tts_engine()
+            with TTS_SYNTHESIS_SECONDS.time(engine="pyttsx3"):
+                engine.save_to_file(text, output_path)
+                engine.runAndWait()
         return output_path
     else:
         raise HTTPException(status_code=503, detail="No TTS engine available")
 
 
+def tts_voice() -> tuple[str, str, int | None]:
+    """Return the (engine, voice, rate) speech is synthesized with."""
+    if GTTS_AVAILABLE:
+        return "gtts", "en", None
+    return "pyttsx3", "default", 150
+
+
+def synthesize_speech(text: str) -> str:
+    """Return the cached audio file name for text, synthesizing it on a miss."""
+    if tts_cache is None:
+        raise HTTPException(status_code=503, detail="TTS cache not initialized")
+    return tts_cache.get_or_create(text, *tts_voice(), generate_tts_audio)
+
+
+def queue_speech(text: str) -> str:
+    """Start synthesizing text in the background and return its audio URL right away."""
+    if tts_jobs is None:
+        raise HTTPException(status_code=503, detail="TTS not initialized")
+    return f"/api/audio/{tts_jobs.submit(text, *tts_voice())}"
+
+
+async def chat_events(
+    session: Session, message: str, speak: bool = False, priority: Priority = Priority.TEXT
+):
+    """Run one turn and yield its Server-Sent Events, with per-sentence audio if speak is set."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def synthesize(sentence: str) -> str:
+        filename = await run_in_threadpool(synthesize_speech, sentence)
+        return f"/api/audio/{filename}"
+
+    async def run_turn():
+        speech = SpeechPipeline(synthesize, queue.put) if speak else None
+        try:
+            done = None
+            # Closed under the lock, so a turn cut short by a disconnect is
+            # rolled back before the next turn can start
+            async with session.async_lock, aclosing(
+                session.client.send_message_stream(message, SYSTEM_PROMPT)
+            ) as events:
+                with api_priority(priority):
+                    async for event in events:
+                        if event["type"] == "done":
+                            done = event
+                            continue
+                        if speech is not None:
+                            if event["type"] == "text":
+                                speech.feed(event["text"])
+                            elif event["type"] == "tool_use":
+                                speech.flush()
+                        await queue.put(event)
+            # Audio for the last sentences is reported before the turn ends
+            if speech is not None:
+                await speech.finish()
+            await queue.put(done)
+        except Exception as e:
+            await queue.put({"type": "error", "error": str(e)})
+        finally:
+            if speech is not None:
+                speech.cancel()
+            await queue.put(None)
+
+    task = asyncio.create_task(run_turn())
+    try:
+        while (event := await queue.get()) is not None:
+            yield f"data: {json.dumps(event)}\n\n"
+    finally:
+        task.cancel()
+
+
+class SessionStreamingResponse(StreamingResponse):
+    """A streaming response that releases its session's lease once it is sent or abandoned."""
+
+    def __init__(self, content, session: Session, **kwargs):
+        super().__init__(content, **kwargs)
+        self.session = session
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            session_manager.release(self.session)
+
+
+def event_stream_response(events, session: Session) -> StreamingResponse:
+    """Wrap an SSE event generator in a streaming response that owns the session's lease."""
+    response = SessionStreamingResponse(
+        events,
+        session,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    attach_session(response, session)
+    return response
+
+
 @app.post("/api/transcribe", response_model=TranscriptionResponse)
 async def transcribe_endpoint(audio: UploadFile = File(...)):
     """Transcribe uploaded audio file to text."""
     if not WHISPER_AVAILABLE:
         raise HTTPException(status_code=503, detail="Speech-to-text not available")
     
-    # Save uploaded audio to temp file
-    suffix = Path(audio.filename).suffix if audio.filename else ".webm"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=AUDIO_TEMP_DIR) as tmp:
-        content = await audio.read()
-        tmp.write(content)
-        tmp_path = tmp.name
-    
+    samples = await read_upload_audio(audio)
+    text = await transcribe_audio(samples)
+    return TranscriptionResponse(text=text)
+
+
+@app.websocket("/api/transcribe/stream")
+async def transcribe_stream_endpoint(websocket: WebSocket):
+    """Transcribe live audio while the user is still speaking.
+
+    The client sends binary frames of 16 kHz mono 16-bit little-endian PCM,
+    then a ``{"type": "stop"}`` text frame. The server replies with
+    ``partial`` and ``segment`` events as utterances are recognised and a
+    ``final`` event with the full transcript.
+    """
+    await websocket.accept()
+    if not STREAMING_STT_AVAILABLE or transcription_pool is None:
+        await websocket.send_json({"type": "error", "error": "Speech-to-text not available"})
+        await websocket.close(code=1011)
+        return
+
+    transcriber = StreamingTranscriber(transcription_pool.transcribe, websocket.send_json)
     try:
-        text = transcribe_audio(tmp_path)
-        return TranscriptionResponse(text=text)
-    finally:
-        # Clean up temp file
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                transcriber.cancel()
+                return
+            if message.get("bytes"):
+                await transcriber.feed(message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                await transcriber.finish()
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        transcriber.cancel()
 
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatMessage):
+async def chat_endpoint(request: ChatMessage, http_request: Request, response: Response):
     """Send a text message and get a response."""
-    global llm_client
-    
-    if llm_client is None:
-        raise HTTPException(status_code=503, detail="LLM client not initialized")
-    
-    try:
-        response_text = llm_client.send_message(request.message, SYSTEM_PROMPT)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async with leased_session(http_request) as session:
+        attach_session(response, session)
+        try:
+            with CHAT_STAGE_SECONDS.time(endpoint="/api/chat", stage="llm"):
+                response_text = await send_in_session(session, request.message)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
     
+    # The audio is synthesized in the background; its URL waits for it
     audio_url = None
     if request.generate_audio and (GTTS_AVAILABLE or PYTTSX3_AVAILABLE):
-        # Generate audio response
-        audio_filename = f"response_{os.urandom(8).hex()}.mp3"
-        audio_path = os.path.join(AUDIO_TEMP_DIR, audio_filename)
         try:
-            generate_tts_audio(response_text, audio_path)
-            audio_url = f"/api/audio/{audio_filename}"
+            audio_url = queue_speech(response_text)
         except Exception as e:
-            print(f"TTS generation failed: {e}")
+            logger.warning("TTS generation failed: %s", e)
     
     return ChatResponse(text=response_text, audio_url=audio_url)
 
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatMessage, http_request: Request):
+    """Send a text message and stream the response as Server-Sent Events.
+
+    With ``generate_audio`` each sentence is synthesized as soon as it is
+    complete and reported with an ``audio`` event, in order.
+    """
+    session = await acquire_session(http_request)
+    speak = request.generate_audio and (GTTS_AVAILABLE or PYTTSX3_AVAILABLE)
+    return event_stream_response(chat_events(session, request.message, speak), session)
+
+
 @app.post("/api/chat/voice", response_model=ChatResponse)
 async def voice_chat_endpoint(
+    http_request: Request,
+    response: Response,
     audio: UploadFile = File(...),
     generate_audio: bool = True
 ):
     """Send voice message and get response with optional audio."""
-    global llm_client
-    
-    if llm_client is None:
-        raise HTTPException(status_code=503, detail="LLM client not initialized")
-    
     if not WHISPER_AVAILABLE:
         raise HTTPException(status_code=503, detail="Speech-to-text not available")
     
-    # Save and transcribe audio
-    suffix = Path(audio.filename).suffix if audio.filename else ".webm"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=AUDIO_TEMP_DIR) as tmp:
-        content = await audio.read()
-        tmp.write(content)
-        tmp_path = tmp.name
-    
-    try:
-        # Transcribe
-        user_text = transcribe_audio(tmp_path)
-        print(f"Transcribed: {user_text}")
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+    # Decode and transcribe audio
+    with CHAT_STAGE_SECONDS.time(endpoint="/api/chat/voice", stage="upload"):
+        samples = await read_upload_audio(audio)
+    with CHAT_STAGE_SECONDS.time(endpoint="/api/chat/voice", stage="transcribe"):
+        user_text = await transcribe_audio(samples)
+    logger.info("Transcribed: %s", user_text)
     
     # Get LLM response
-    try:
-        response_text = llm_client.send_message(user_text, SYSTEM_PROMPT)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async with leased_session(http_request) as session:
+        attach_session(response, session)
+        try:
+            with CHAT_STAGE_SECONDS.time(endpoint="/api/chat/voice", stage="llm"):
+                response_text = await send_in_session(session, user_text, Priority.VOICE)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
     
-    # Generate audio response if requested
+    # Generate audio response if requested; it is synthesized in the
+    # background and its URL waits for it
     audio_url = None
     if generate_audio and (GTTS_AVAILABLE or PYTTSX3_AVAILABLE):
-        audio_filename = f"response_{os.urandom(8).hex()}.mp3"
-        audio_path = os.path.join(AUDIO_TEMP_DIR, audio_filename)
         try:
-            generate_tts_audio(response_text, audio_path)
-            audio_url = f"/api/audio/{audio_filename}"
+            audio_url = queue_speech(response_text)
         except Exception as e:
-            print(f"TTS generation failed: {e}")
+            logger.warning("TTS generation failed: %s", e)
     
     return ChatResponse(text=response_text, audio_url=audio_url)
 
 
+@app.post("/api/chat/voice/stream")
+async def voice_chat_stream_endpoint(
+    http_request: Request,
+    audio: UploadFile = File(...),
+    generate_audio: bool = True
+):
+    """Send a voice message and stream the response, speaking it sentence by sentence.
+
+    The first event is a ``transcript`` of the user's audio; the rest match
+    ``/api/chat/stream``.
+    """
+    if not WHISPER_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Speech-to-text not available")
+    
+    samples = await read_upload_audio(audio)
+    user_text = await transcribe_audio(samples)
+    logger.info("Transcribed: %s", user_text)
+    
+    session = await acquire_session(http_request)
+    speak = generate_audio and (GTTS_AVAILABLE or PYTTSX3_AVAILABLE)
+
+    async def events():
+        yield f"data: {json.dumps({'type': 'transcript', 'text': user_text})}\n\n"
+        async for event in chat_events(session, user_text, speak, Priority.VOICE):
+            yield event
+
+    return event_stream_response(events(), session)
+
+
+def parse_byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=`` range into inclusive offsets within size.
+
+    Returns None for anything other than one byte range, which callers
+    answer with the whole file, and raises ValueError if the range lies
+    outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first.isdigit() or last.isdigit()):
+        return None
+    if not first.isdigit():
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last.isdigit() else size - 1
+    if last.isdigit() and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+def iter_file_range(path: str, start: int, end: int, chunk_size: int = 64 * 1024):
+    """Yield bytes start..end (inclusive) of a file in chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
 @app.get("/api/audio/{filename}")
-async def get_audio(filename: str):
-    """Serve generated audio files."""
-    audio_path = os.path.join(AUDIO_TEMP_DIR, filename)
-    if not os.path.exists(audio_path):
+async def get_audio(filename: str, request: Request):
+    """Serve synthesized audio, waiting for its background job if it is still running.
+
+    Files are named by a hash of what was synthesized and never change, so
+    the hash is a strong ETag, conditional requests get a 304 and clients
+    may cache the audio forever. A single byte range is answered with 206,
+    so players can seek, unless If-Range names another version.
+    """
+    if tts_cache is None:
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    try:
+        if tts_jobs is not None:
+            audio_path = await tts_jobs.wait(filename, tts_wait_timeout)
+        else:
+            audio_path = tts_cache.path_for(filename)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503, detail="Audio is still being synthesized", headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Speech synthesis failed: {e}")
+    if audio_path is None:
         raise HTTPException(status_code=404, detail="Audio file not found")
-    
-    return FileResponse(
-        audio_path,
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": f"inline; filename={filename}"}
-    )
+
+    etag = f'"{Path(filename).stem}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Content-Disposition": f"inline; filename={filename}",
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    elif "if-modified-since" in request.headers:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header is not None and (if_range is None or if_range.strip() == etag):
+        size = os.path.getsize(audio_path)
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                iter_file_range(audio_path, start, end),
+                status_code=206,
+                media_type="audio/mpeg",
+                headers=headers,
+            )
+
+    return FileResponse(audio_path, media_type="audio/mpeg", headers=headers)
+
+
+@app.get("/api/audio/{filename}/status")
+async def get_audio_status(filename: str):
+    """Report whether audio is queued, being synthesized, ready or failed."""
+    if tts_jobs is None:
+        raise HTTPException(status_code=503, detail="TTS not available")
+    return JSONResponse(tts_jobs.status(filename))
 
 
 @app.post("/api/tts")
@@ -259,35 +696,48 @@ async def tts_endpoint(text: str):
     if not (GTTS_AVAILABLE or PYTTSX3_AVAILABLE):
         raise HTTPException(status_code=503, detail="TTS not available")
     
-    audio_filename = f"tts_{os.urandom(8).hex()}.mp3"
-    audio_path = os.path.join(AUDIO_TEMP_DIR, audio_filename)
-    
     try:
-        generate_tts_audio(text, audio_path)
-        return JSONResponse({"audio_url": f"/api/audio/{audio_filename}"})
+        return JSONResponse({"audio_url": queue_speech(text)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/api/history")
-async def clear_history():
-    """Clear conversation history."""
-    global llm_client
-    if llm_client:
-        llm_client.clear_history()
-    return JSONResponse({"status": "cleared"})
+async def clear_history(http_request: Request):
+    """Clear conversation history for the caller's session."""
+    async with leased_session(http_request) as session:
+        async with session.async_lock:
+            session.client.clear_history()
+        response = JSONResponse({"status": "cleared"})
+        attach_session(response, session)
+        return response
+
+
+@app.get("/metrics")
+async def metrics():
+    """Export latency histograms and counters in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 
 @app.get("/api/status")
 async def status():
     """Get server status and available features."""
+    scheduler = active_scheduler()
+    pool = active_pool()
     return JSONResponse({
         "status": "running",
         "features": {
             "speech_to_text": WHISPER_AVAILABLE,
+            "streaming_speech_to_text": STREAMING_STT_AVAILABLE,
             "text_to_speech": GTTS_AVAILABLE or PYTTSX3_AVAILABLE,
             "tts_engine": "gtts" if GTTS_AVAILABLE else ("pyttsx3" if PYTTSX3_AVAILABLE else None)
-        }
+        },
+        "sessions": session_manager.stats() if session_manager else None,
+        "transcription": transcription_pool.stats() if transcription_pool else None,
+        "tts_cache": tts_cache.stats() if tts_cache else None,
+        "tts_jobs": tts_jobs.stats() if tts_jobs else None,
+        "api_scheduler": scheduler.stats() if scheduler else None,
+        "http_pool": pool.stats() if pool else None,
     })
 
 
@@ -297,7 +747,7 @@ def print_welcome():
     print("🤖 Personal Assistant Agent")
     print("=" * 60)
     print()
-    print("Available tools: Read, Write, Edit, Bash")
+    print("Available tools: Read, Write, Edit, Glob, Grep, Bash")
     print("Commands:")
     print("  - Type your message and press Enter to chat")
     print("  - Type 'clear' to clear conversation history")
@@ -332,40 +782,104 @@ def run_agent_loop(client: LLMClient):
         print("\n🤖 Assistant: ", end="", flush=True)
 
         try:
-            response = client.send_message(user_input, SYSTEM_PROMPT)
-            print(response)
+            after_tools = False
+            for event in client.send_message_stream(user_input, SYSTEM_PROMPT):
+                if event["type"] == "text":
+                    if after_tools:
+                        print("\n🤖 Assistant: ", end="", flush=True)
+                        after_tools = False
+                    print(event["text"], end="", flush=True)
+                elif event["type"] == "tool_use":
+                    print(f"\n🔧 Executing tool: {event['name']}")
+                    print(f"   Input: {json.dumps(event['input'], indent=2)}")
+                elif event["type"] == "tool_result":
+                    print("   ❌ Failed" if event["is_error"] else "   ✅ Done")
+                    after_tools = True
+            print()
         except Exception as e:
             print(f"\n❌ Error: {str(e)}")
 
 
-def run_web_server(host: str = "0.0.0.0", port: int = 8000):
+def run_batch(settings: Settings, input_path: str, out_path: str, parallelism: int, use_batch_api: bool) -> int:
+    """Answer every prompt in a JSONL file, appending results to out_path."""
+    try:
+        items = read_batch(input_path)
+        runner = BatchRunner(
+            settings,
+            lambda: LLMClient(
+                settings, create_tool_registry(settings.max_tool_workers, settings.persistent_shell)
+            ),
+            SYSTEM_PROMPT,
+            parallelism=parallelism,
+            use_batch_api=use_batch_api,
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ Batch Error: {e}")
+        return 1
+
+    counts = runner.run(items, out_path)
+    print(
+        f"Batch finished: {counts['succeeded']} succeeded, {counts['failed']} failed, "
+        f"{counts['skipped']} already done, of {counts['total']}"
+    )
+    return 1 if counts["failed"] else 0
+
+
+def run_web_server(settings: Settings, host: str = "0.0.0.0", port: int = 8000):
     """Run the FastAPI web server."""
-    global llm_client
-    
+    global max_audio_upload_bytes, max_audio_seconds
+
     # Mount static files for frontend
     src_dir = Path(__file__).parent / "src"
     if src_dir.exists():
         app.mount("/", StaticFiles(directory=str(src_dir), html=True), name="static")
     
-    # Pre-load Whisper model if available
+    # Pre-load Whisper model in its worker processes if available
     if WHISPER_AVAILABLE:
-        init_whisper_model()
+        init_transcription_pool(settings)
+    init_tts_cache(settings)
+    init_tts_jobs(settings)
+    max_audio_upload_bytes = settings.max_audio_upload_bytes
+    max_audio_seconds = settings.max_audio_seconds
+    # Share one connection pool across sessions; the lifespan hook warms it
+    if settings.llm_transport != "replay":
+        get_pool(settings)
     
     print(f"Starting web server at http://{host}:{port}")
     print(f"Features: STT={'✓' if WHISPER_AVAILABLE else '✗'}, TTS={'✓' if (GTTS_AVAILABLE or PYTTSX3_AVAILABLE) else '✗'}")
     
-    uvicorn.run(app, host=host, port=port)
+    try:
+        uvicorn.run(app, host=host, port=port)
+    finally:
+        if tts_jobs is not None:
+            tts_jobs.shutdown()
+        # Stop the Whisper worker processes
+        if transcription_pool is not None:
+            transcription_pool.shutdown()
+        # Stop the sessions' persistent shells
+        if session_manager is not None:
+            session_manager.close_all()
+            if session_manager.store is not None:
+                session_manager.store.close()
 
 
 def main():
     """Main entry point for the personal assistant agent."""
-    global llm_client
+    global session_manager
     
     parser = argparse.ArgumentParser(description="Personal Assistant Agent")
     parser.add_argument("--web", action="store_true", help="Run as web server")
     parser.add_argument("--host", default="0.0.0.0", help="Web server host")
     parser.add_argument("--port", type=int, default=8000, help="Web server port")
+    parser.add_argument("--batch", metavar="INPUT", help="Run the prompts in a JSONL file and exit")
+    parser.add_argument("--out", metavar="OUTPUT", help="JSONL file batch results are appended to")
+    parser.add_argument("--parallel", type=int, default=4, help="Batch conversations run at once")
+    parser.add_argument(
+        "--batch-api", action="store_true", help='Send batch prompts marked "tools": false via the Message Batches API'
+    )
     args = parser.parse_args()
+    if args.batch and not args.out:
+        parser.error("--batch requires --out")
     
     try:
         settings = Settings.from_env()
@@ -377,13 +891,29 @@ def main():
         print("  3. Run the agent again")
         sys.exit(1)
 
-    tool_registry = create_tool_registry()
-    llm_client = LLMClient(settings, tool_registry)
+    if args.batch:
+        sys.exit(run_batch(settings, args.batch, args.out, args.parallel, args.batch_api))
 
     if args.web:
-        run_web_server(args.host, args.port)
+        # Each session gets its own tools, and with them its own shell
+        session_manager = SessionManager(
+            lambda: AsyncLLMClient(
+                settings, create_tool_registry(settings.max_tool_workers, settings.persistent_shell)
+            ),
+            max_sessions=settings.max_sessions,
+            idle_ttl=settings.session_idle_ttl,
+            memory_limit_bytes=settings.session_memory_limit_bytes,
+            store=ConversationStore(settings.conversation_db) if settings.conversation_db else None,
+        )
+        run_web_server(settings, args.host, args.port)
     else:
-        run_agent_loop(llm_client)
+        client = LLMClient(
+            settings, create_tool_registry(settings.max_tool_workers, settings.persistent_shell)
+        )
+        try:
+            run_agent_loop(client)
+        finally:
+            client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+from .registry import CONTENT_TYPE, REGISTRY, Counter, Histogram, MetricsRegistry
+from .asgi import MetricsMiddleware
+from .instruments import (
+    API_HEDGES,
+    API_QUEUE_SECONDS,
+    API_RATE_LIMIT_WAIT_SECONDS,
+    API_REJECTED,
+    API_RETRIES,
+    CHAT_STAGE_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    LLM_REQUEST_ERRORS,
+    LLM_REQUEST_SECONDS,
+    LLM_TOKENS,
+    TOOL_SECONDS,
+    TRANSCRIPTION_REJECTED,
+    TRANSCRIPTION_SECONDS,
+    TTS_SYNTHESIS_SECONDS,
+    TURN_ITERATIONS,
+)
+
+__all__ = [
+    "CONTENT_TYPE",
+    "REGISTRY",
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "MetricsMiddleware",
+    "API_HEDGES",
+    "API_QUEUE_SECONDS",
+    "API_RATE_LIMIT_WAIT_SECONDS",
+    "API_REJECTED",
+    "API_RETRIES",
+    "CHAT_STAGE_SECONDS",
+    "HTTP_REQUEST_SECONDS",
+    "LLM_REQUEST_ERRORS",
+    "LLM_REQUEST_SECONDS",
+    "LLM_TOKENS",
+    "TOOL_SECONDS",
+    "TRANSCRIPTION_REJECTED",
+    "TRANSCRIPTION_SECONDS",
+    "TTS_SYNTHESIS_SECONDS",
+    "TURN_ITERATIONS",
+]
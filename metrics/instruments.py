@@ -0,0 +1,79 @@
+"""The metrics exported by the assistant, shared by every module that records them."""
+
+from .registry import REGISTRY
+
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50)
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "assistant_llm_request_seconds",
+    "Messages API call latency; for streamed calls, until the final message.",
+    ("mode",),
+)
+LLM_REQUEST_ERRORS = REGISTRY.counter(
+    "assistant_llm_request_errors_total",
+    "Messages API calls that raised.",
+    ("mode",),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "assistant_llm_tokens_total",
+    "Tokens reported in response.usage.",
+    ("model", "kind"),
+)
+API_QUEUE_SECONDS = REGISTRY.histogram(
+    "assistant_api_queue_seconds",
+    "Time API calls waited for an in-flight slot, by priority.",
+    ("priority",),
+)
+API_RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    "assistant_api_rate_limit_wait_seconds",
+    "Time API calls were held back by the rate limiter.",
+)
+API_REJECTED = REGISTRY.counter(
+    "assistant_api_rejected_total",
+    "API calls refused because the scheduler queue was full.",
+    ("priority",),
+)
+API_RETRIES = REGISTRY.counter(
+    "assistant_api_retries_total",
+    "API calls retried after a retryable error, by status code or error type.",
+    ("reason",),
+)
+API_HEDGES = REGISTRY.counter(
+    "assistant_api_hedges_total",
+    "Hedged API calls, by which request answered first.",
+    ("winner",),
+)
+TURN_ITERATIONS = REGISTRY.histogram(
+    "assistant_turn_iterations",
+    "API calls made by one agent turn, i.e. tool-loop iterations.",
+    buckets=ITERATION_BUCKETS,
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "assistant_tool_seconds",
+    "Execution time of each tool call.",
+    ("tool", "outcome"),
+)
+TRANSCRIPTION_SECONDS = REGISTRY.histogram(
+    "assistant_transcription_seconds",
+    "Whisper jobs: time queued for a worker and time spent transcribing.",
+    ("phase",),
+)
+TRANSCRIPTION_REJECTED = REGISTRY.counter(
+    "assistant_transcription_rejected_total",
+    "Transcriptions refused because the queue was full.",
+)
+TTS_SYNTHESIS_SECONDS = REGISTRY.histogram(
+    "assistant_tts_synthesis_seconds",
+    "Text-to-speech synthesis time on cache misses.",
+    ("engine",),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "assistant_http_request_seconds",
+    "HTTP request latency until the last byte of the response, by route template.",
+    ("method", "route", "status"),
+)
+CHAT_STAGE_SECONDS = REGISTRY.histogram(
+    "assistant_chat_stage_seconds",
+    "Time spent in each stage of the chat endpoints: upload, transcribe and llm.",
+    ("endpoint", "stage"),
+)
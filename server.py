@@ -6,39 +6,62 @@ Flask-based web server that exposes the LLMClient functionality as HTTP API endp
 """
 
 import sys
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 
 from config.settings import Settings
 from llm.client import LLMClient
+from llm.pool import active_pool, get_pool
+from llm.scheduler import SchedulerBusy
+from llm.session import SessionManager
+from llm.store import ConversationStore
+from metrics import CONTENT_TYPE, REGISTRY
 from prompts.system import SYSTEM_PROMPT
-from tools import ToolRegistry, ReadTool, WriteTool, EditTool, BashTool
+from tools import ToolRegistry, ReadTool, WriteTool, EditTool, GlobTool, GrepTool, BashTool
 
 
 app = Flask(__name__)
 CORS(app)
 
-# Global LLM client instance to maintain conversation history
-llm_client = None
+# One conversation per session id, supplied via header or cookie
+session_manager = None
 
+SESSION_COOKIE = "session_id"
+SESSION_HEADER = "X-Session-ID"
 
-def create_tool_registry() -> ToolRegistry:
+
+def create_tool_registry(max_workers: int = 8, persistent_shell: bool = False) -> ToolRegistry:
     """Create and populate the tool registry with available tools."""
-    registry = ToolRegistry()
+    registry = ToolRegistry(max_workers=max_workers)
     registry.register(ReadTool())
     registry.register(WriteTool())
     registry.register(EditTool())
-    registry.register(BashTool())
+    registry.register(GlobTool())
+    registry.register(GrepTool())
+    registry.register(BashTool(persistent=persistent_shell))
+    registry.freeze()
     return registry
 
 
 def initialize_llm_client():
-    """Initialize the LLM client with settings and tools."""
-    global llm_client
+    """Initialize the session manager with settings and tools."""
+    global session_manager
     try:
         settings = Settings.from_env()
-        tool_registry = create_tool_registry()
-        llm_client = LLMClient(settings, tool_registry)
+        # Each session gets its own tools, and with them its own shell
+        session_manager = SessionManager(
+            lambda: LLMClient(
+                settings, create_tool_registry(settings.max_tool_workers, settings.persistent_shell)
+            ),
+            max_sessions=settings.max_sessions,
+            idle_ttl=settings.session_idle_ttl,
+            memory_limit_bytes=settings.session_memory_limit_bytes,
+            store=ConversationStore(settings.conversation_db) if settings.conversation_db else None,
+        )
+        # Open API connections before the first request needs them
+        if settings.llm_transport != "replay":
+            warmed = get_pool(settings).warm()
+            print(f"Warmed {warmed} API connection(s).")
         return True
     except ValueError as e:
         print(f"❌ Configuration Error: {e}")
@@ -49,6 +72,34 @@ def initialize_llm_client():
         return False
 
 
+def get_session():
+    """Resolve the caller's session from the session header or cookie.
+
+    The session is leased until the request ends, so it cannot be evicted mid-turn.
+    """
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    g.session = session_manager.get_or_create(session_id)
+    return g.session
+
+
+@app.teardown_request
+def release_session(exc):
+    """Let the request's session be evicted again."""
+    session = g.pop("session", None)
+    if session is not None:
+        session_manager.release(session)
+
+
+@app.after_request
+def attach_session(response):
+    """Tell the client which session it is talking to."""
+    session = g.get("session")
+    if session is not None:
+        response.headers[SESSION_HEADER] = session.session_id
+        response.set_cookie(SESSION_COOKIE, session.session_id, httponly=True, samesite="Lax")
+    return response
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """
@@ -69,9 +120,7 @@ def chat():
         "error": "error message string"
     }
     """
-    global llm_client
-    
-    if llm_client is None:
+    if session_manager is None:
         return jsonify({
             "error": "LLM client not initialized. Please check server configuration."
         }), 500
@@ -91,12 +140,18 @@ def chat():
                 "error": "Message is required and cannot be empty"
             }), 400
         
-        response = llm_client.send_message(message, SYSTEM_PROMPT)
+        session = get_session()
+        with session.lock:
+            response = session.client.send_message(message, SYSTEM_PROMPT)
         
         return jsonify({
             "response": response
         })
         
+    except SchedulerBusy as e:
+        return jsonify({
+            "error": str(e)
+        }), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({
             "error": f"An error occurred: {str(e)}"
@@ -106,22 +161,22 @@ def chat():
 @app.route('/api/chat/clear', methods=['POST'])
 def clear_history():
     """
-    Clear the conversation history.
+    Clear the conversation history for the caller's session.
     
     Returns JSON:
     {
         "message": "Conversation history cleared"
     }
     """
-    global llm_client
-    
-    if llm_client is None:
+    if session_manager is None:
         return jsonify({
             "error": "LLM client not initialized. Please check server configuration."
         }), 500
     
     try:
-        llm_client.clear_history()
+        session = get_session()
+        with session.lock:
+            session.client.clear_history()
         return jsonify({
             "message": "Conversation history cleared"
         })
@@ -139,15 +194,26 @@ def health_check():
     Returns JSON:
     {
         "status": "healthy" or "unhealthy",
-        "llm_client_initialized": true or false
+        "llm_client_initialized": true or false,
+        "sessions": {...} or null,
+        "http_pool": {...} or null
     }
     """
+    pool = active_pool()
     return jsonify({
-        "status": "healthy" if llm_client is not None else "unhealthy",
-        "llm_client_initialized": llm_client is not None
+        "status": "healthy" if session_manager is not None else "unhealthy",
+        "llm_client_initialized": session_manager is not None,
+        "sessions": session_manager.stats() if session_manager else None,
+        "http_pool": pool.stats() if pool else None,
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Export API, tool-loop and tool latency metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
+
 def main():
     """Main entry point for the API server."""
     if not initialize_llm_client():
@@ -166,7 +232,14 @@ def main():
     print()
     print("-" * 60)
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    try:
+        app.run(host='0.0.0.0', port=5000, debug=True)
+    finally:
+        session_manager.close_all()
+        if session_manager.store is not None:
+            session_manager.store.close()
+        if active_pool() is not None:
+            active_pool().close()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,50 @@
  * Main JavaScript file handling chat functionality with voice support
  */
 
+/**
+ * AudioWorklet that downsamples microphone input to 16-bit PCM at a target rate
+ * (averaging each window as a cheap low-pass filter) and posts ~100 ms chunks
+ */
+const PCM_WORKLET_SOURCE = `
+class Pcm16Downsampler extends AudioWorkletProcessor {
+    constructor(options) {
+        super();
+        this.ratio = sampleRate / options.processorOptions.targetRate;
+        this.chunkSize = Math.round(options.processorOptions.targetRate / 10);
+        this.buffer = new Int16Array(this.chunkSize);
+        this.length = 0;
+        this.sum = 0;
+        this.count = 0;
+        this.position = 0;
+    }
+
+    process(inputs) {
+        const input = inputs[0] && inputs[0][0];
+        if (!input) return true;
+
+        for (let i = 0; i < input.length; i++) {
+            this.sum += input[i];
+            this.count++;
+            this.position++;
+            if (this.position >= this.ratio) {
+                this.position -= this.ratio;
+                const sample = Math.max(-1, Math.min(1, this.sum / this.count));
+                this.buffer[this.length++] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+                this.sum = 0;
+                this.count = 0;
+                if (this.length === this.chunkSize) {
+                    this.port.postMessage(this.buffer.buffer, [this.buffer.buffer]);
+                    this.buffer = new Int16Array(this.chunkSize);
+                    this.length = 0;
+                }
+            }
+        }
+        return true;
+    }
+}
+registerProcessor('pcm16-downsampler', Pcm16Downsampler);
+`;
+
 class ChatApp {
     constructor() {
         this.chatMessages = document.getElementById('chatMessages');
@@ -22,6 +66,9 @@ class ChatApp {
         this.audioChunks = [];
         this.recordingTimer = null;
         this.recordingSeconds = 0;
+        this.liveTranscription = null;
+        this.speechQueue = [];
+        this.speechAudio = null;
         this.voiceResponseEnabled = true;
         this.apiBaseUrl = '';
         this.features = { speech_to_text: false, text_to_speech: false };
@@ -149,6 +196,15 @@ class ChatApp {
 
     async startRecording() {
         if (this.isRecording || !this.features.speech_to_text) return;
+
+        if (this.features.streaming_speech_to_text && window.AudioWorkletNode && window.WebSocket) {
+            try {
+                await this.startStreamingRecording();
+                return;
+            } catch (error) {
+                console.warn('Live transcription unavailable, recording a clip instead:', error);
+            }
+        }
         
         try {
             const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
@@ -172,7 +228,12 @@ class ChatApp {
     }
 
     stopRecording() {
-        if (!this.isRecording || !this.mediaRecorder) return;
+        if (!this.isRecording) return;
+        if (this.liveTranscription) {
+            this.stopStreamingRecording();
+            return;
+        }
+        if (!this.mediaRecorder) return;
         
         this.mediaRecorder.stop();
         this.mediaRecorder.stream.getTracks().forEach(track => track.stop());
@@ -181,10 +242,99 @@ class ChatApp {
         this.stopRecordingTimer();
     }
 
+    /**
+     * Stream microphone audio to the server as 16 kHz PCM so it is transcribed while the user speaks
+     */
+    async startStreamingRecording() {
+        const stream = await navigator.mediaDevices.getUserMedia({
+            audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+        });
+
+        const wsBase = this.apiBaseUrl
+            ? this.apiBaseUrl.replace(/^http/, 'ws')
+            : `${location.protocol === 'https:' ? 'wss:' : 'ws:'}//${location.host}`;
+        const socket = new WebSocket(`${wsBase}/api/transcribe/stream`);
+        socket.binaryType = 'arraybuffer';
+        const pending = [];
+        const send = (data) => {
+            if (socket.readyState === WebSocket.OPEN) socket.send(data);
+            else if (socket.readyState === WebSocket.CONNECTING) pending.push(data);
+        };
+        socket.onopen = () => pending.splice(0).forEach(data => socket.send(data));
+
+        const finalText = new Promise((resolve, reject) => {
+            socket.onmessage = (e) => {
+                const event = JSON.parse(e.data);
+                if (event.type === 'partial' || event.type === 'segment') {
+                    this.showLiveTranscript(event.text);
+                } else if (event.type === 'final') {
+                    resolve(event.text);
+                } else if (event.type === 'error') {
+                    reject(new Error(event.error));
+                }
+            };
+            socket.onerror = () => reject(new Error('Live transcription connection failed'));
+            socket.onclose = () => reject(new Error('Live transcription connection closed'));
+        });
+
+        const audioContext = new AudioContext();
+        const workletUrl = URL.createObjectURL(new Blob([PCM_WORKLET_SOURCE], { type: 'application/javascript' }));
+        await audioContext.audioWorklet.addModule(workletUrl);
+        URL.revokeObjectURL(workletUrl);
+
+        const source = audioContext.createMediaStreamSource(stream);
+        const worklet = new AudioWorkletNode(audioContext, 'pcm16-downsampler', {
+            processorOptions: { targetRate: 16000 }
+        });
+        worklet.port.onmessage = (e) => send(e.data);
+        source.connect(worklet);
+
+        this.liveTranscription = { stream, socket, audioContext, source, worklet, send, finalText };
+        this.isRecording = true;
+        this.updateRecordingUI(true);
+        this.startRecordingTimer();
+    }
+
+    async stopStreamingRecording() {
+        const live = this.liveTranscription;
+        this.liveTranscription = null;
+
+        live.source.disconnect();
+        live.worklet.disconnect();
+        live.stream.getTracks().forEach(track => track.stop());
+        live.audioContext.close();
+        live.send(JSON.stringify({ type: 'stop' }));
+
+        this.isRecording = false;
+        this.updateRecordingUI(false);
+        this.stopRecordingTimer();
+
+        try {
+            const text = await live.finalText;
+            if (text) {
+                this.messageInput.value = text;
+                this.toggleSendButton();
+                await this.sendMessage();
+            } else {
+                this.removeWelcomeMessage();
+                this.addMessage("Sorry, I didn't catch that. Please try again.", 'assistant');
+            }
+        } catch (error) {
+            this.removeWelcomeMessage();
+            this.addMessage('Sorry, I could not process your voice message.', 'assistant');
+        }
+    }
+
+    showLiveTranscript(text) {
+        const label = this.recordingIndicator && this.recordingIndicator.querySelector('.recording-text');
+        if (label) label.textContent = text || 'Recording...';
+    }
+
     updateRecordingUI(isRecording) {
         if (this.recordingIndicator) {
             this.recordingIndicator.style.display = isRecording ? 'flex' : 'none';
         }
+        this.showLiveTranscript('');
         if (this.micButton) {
             this.micButton.classList.toggle('recording', isRecording);
             const micIcon = this.micButton.querySelector('.mic-icon');
@@ -224,8 +374,22 @@ class ChatApp {
         
         const audioBlob = new Blob(this.audioChunks, { type: 'audio/webm' });
         this.removeWelcomeMessage();
-        this.addMessage('🎤 Voice message', 'user');
+        const userBubble = this.addMessage('🎤 Voice message', 'user').querySelector('.message-bubble');
         this.showTypingIndicator();
+        this.stopSpeech();
+
+        try {
+            const text = await this.streamVoiceResponse(audioBlob, userBubble);
+            this.messageHistory.push({ role: 'assistant', content: text });
+            return;
+        } catch (error) {
+            if (error.partial) {
+                this.hideTypingIndicator();
+                this.addMessage(error.message || 'Sorry, I could not process your voice message.', 'assistant');
+                return;
+            }
+            console.log('Voice streaming not available, falling back to /api/chat/voice');
+        }
         
         try {
             const response = await this.sendVoiceMessage(audioBlob);
@@ -265,6 +429,21 @@ class ChatApp {
         this.toggleSendButton();
         this.showTypingIndicator();
 
+        const wantsAudio = this.voiceResponseEnabled && this.features.text_to_speech;
+        this.stopSpeech();
+        try {
+            const text = await this.streamAssistantResponse(message, wantsAudio);
+            this.messageHistory.push({ role: 'assistant', content: text });
+            return;
+        } catch (error) {
+            if (error.partial) {
+                this.hideTypingIndicator();
+                this.addMessage(error.message || 'Sorry, I encountered an error. Please try again.', 'assistant');
+                return;
+            }
+            console.log('Streaming not available, falling back to /api/chat');
+        }
+
         try {
             const response = await this.getAssistantResponse(message);
             this.hideTypingIndicator();
@@ -323,6 +502,8 @@ class ChatApp {
             const audio = messageElement.querySelector('audio');
             if (audio) audio.play().catch(() => {});
         }
+
+        return messageElement;
     }
 
     showTypingIndicator() {
@@ -401,6 +582,140 @@ class ChatApp {
         return this.getMockResponse(userMessage);
     }
 
+    /**
+     * Stream the assistant response over Server-Sent Events, rendering text as it arrives
+     * and, when speak is set, playing each sentence's audio as soon as it is ready
+     */
+    async streamAssistantResponse(userMessage, speak = false) {
+        const response = await fetch(`${this.apiBaseUrl}/api/chat/stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ message: userMessage, generate_audio: speak })
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('Streaming request failed');
+        }
+        return this.renderEventStream(response);
+    }
+
+    /**
+     * Send a voice message and stream the spoken response sentence by sentence
+     */
+    async streamVoiceResponse(audioBlob, userBubble) {
+        const formData = new FormData();
+        formData.append('audio', audioBlob, 'recording.webm');
+
+        const speak = this.voiceResponseEnabled && this.features.text_to_speech;
+        const response = await fetch(`${this.apiBaseUrl}/api/chat/voice/stream?generate_audio=${speak}`, {
+            method: 'POST',
+            body: formData
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('Voice streaming request failed');
+        }
+        return this.renderEventStream(response, (text) => {
+            userBubble.textContent = `🎤 ${text}`;
+            this.messageHistory.push({ role: 'user', content: text });
+        });
+    }
+
+    /**
+     * Render a chat event stream into a new assistant message and return its text
+     */
+    async renderEventStream(response, onTranscript = null) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let bubble = null;
+        let text = '';
+
+        const appendText = (delta) => {
+            if (!bubble) {
+                this.hideTypingIndicator();
+                this.isTyping = true;
+                bubble = this.addMessage('', 'assistant').querySelector('.message-bubble');
+            }
+            text += delta;
+            bubble.textContent = text;
+            this.scrollToBottom();
+        };
+
+        try {
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const frame = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    if (!frame.startsWith('data: ')) continue;
+
+                    const event = JSON.parse(frame.slice(6));
+                    if (event.type === 'text') {
+                        appendText(event.text);
+                    } else if (event.type === 'audio') {
+                        this.queueSpeech(event.audio_url);
+                    } else if (event.type === 'transcript' && onTranscript) {
+                        onTranscript(event.text);
+                    } else if (event.type === 'tool_result' && text && !text.endsWith('\n\n')) {
+                        appendText('\n\n');
+                    } else if (event.type === 'error') {
+                        throw new Error(event.error);
+                    }
+                }
+            }
+        } catch (error) {
+            // The server already has the message; retrying would send it twice
+            error.partial = true;
+            throw error;
+        } finally {
+            this.isTyping = false;
+        }
+
+        if (!bubble) {
+            appendText('(No response)');
+            this.isTyping = false;
+        }
+        return text;
+    }
+
+    /**
+     * Play sentence audio clips back to back in the order they arrive
+     */
+    queueSpeech(audioUrl) {
+        if (!this.voiceResponseEnabled) return;
+        this.speechQueue.push(audioUrl);
+        if (!this.speechAudio) this.playNextSpeech();
+    }
+
+    playNextSpeech() {
+        const audioUrl = this.speechQueue.shift();
+        if (!audioUrl) {
+            this.speechAudio = null;
+            return;
+        }
+        const audio = new Audio(`${this.apiBaseUrl}${audioUrl}`);
+        this.speechAudio = audio;
+        const next = () => {
+            if (this.speechAudio === audio) this.playNextSpeech();
+        };
+        audio.onended = next;
+        audio.onerror = next;
+        audio.play().catch(next);
+    }
+
+    stopSpeech() {
+        this.speechQueue = [];
+        if (this.speechAudio) {
+            this.speechAudio.pause();
+            this.speechAudio = null;
+        }
+    }
+
     getMockResponse(userMessage) {
         const delay = Math.random() * 2000 + 1000;
         return new Promise(resolve => {
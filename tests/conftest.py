@@ -0,0 +1,64 @@
+import json
+from typing import Any
+
+import pytest
+
+from config.settings import Settings
+from llm.transport import Cassette, ReplayTransport
+
+
+def make_settings(**overrides: Any) -> Settings:
+    """Settings for a client that never touches the network."""
+    values = {
+        "anthropic_api_key": "test",
+        "model_name": "claude-test",
+        "max_tokens": 1024,
+        "temperature": 0.0,
+        "llm_transport": "replay",
+        "api_scheduler": False,
+        "persistent_shell": False,
+    }
+    values.update(overrides)
+    return Settings(**values)
+
+
+def message(content: list[dict[str, Any]], stop_reason: str) -> dict[str, Any]:
+    """A Messages API response as stored in a cassette."""
+    return {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-test",
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    }
+
+
+def text_reply(text: str) -> dict[str, Any]:
+    return message([{"type": "text", "text": text}], "end_turn")
+
+
+def tool_call(name: str, tool_input: dict[str, Any], tool_use_id: str = "toolu_1") -> dict[str, Any]:
+    return message([{"type": "tool_use", "id": tool_use_id, "name": name, "input": tool_input}], "tool_use")
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return make_settings()
+
+
+@pytest.fixture
+def replay(tmp_path):
+    """Build a transport that answers each call with the next of ``responses``."""
+
+    def build(responses: list[dict[str, Any]], asynchronous: bool = False) -> ReplayTransport:
+        path = tmp_path / "cassette.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            for n, response in enumerate(responses):
+                entry = {"hash": f"unmatched-{n}", "request": {}, "response": response, "latency": 0, "chunks": None}
+                f.write(json.dumps(entry) + "\n")
+        return ReplayTransport(Cassette(str(path), strict=False), asynchronous=asynchronous)
+
+    return build
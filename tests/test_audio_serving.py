@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import parse_byte_range
+from voice import TTSCache, TTSJobs
+
+AUDIO = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=1000-", (1000, 1023)),
+        ("bytes=-24", (1000, 1023)),
+        ("bytes=-5000", (0, 1023)),
+        ("bytes=1000-5000", (1000, 1023)),
+        # Not a single byte range: served whole
+        ("bytes=0-1,5-6", None),
+        ("items=0-9", None),
+        ("bytes=9-2", None),
+        ("bytes=x-y", None),
+    ],
+)
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, len(AUDIO)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=-0", "bytes=5000-6000"])
+def test_parse_byte_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, len(AUDIO))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    synthesized = []
+    release = threading.Event()
+
+    def synthesize(text, path):
+        synthesized.append(text)
+        release.wait(5)
+        if text == "broken":
+            raise RuntimeError("engine down")
+        with open(path, "wb") as f:
+            f.write(AUDIO)
+
+    cache = TTSCache(str(tmp_path / "tts"))
+    jobs = TTSJobs(cache, synthesize)
+    monkeypatch.setattr(main, "GTTS_AVAILABLE", True)
+    monkeypatch.setattr(main, "tts_cache", cache)
+    monkeypatch.setattr(main, "tts_jobs", jobs)
+    monkeypatch.setattr(main, "tts_wait_timeout", 5.0)
+    test_client = TestClient(main.app)
+    test_client.synthesized = synthesized
+    test_client.release = release
+    yield test_client
+    release.set()
+    jobs.shutdown()
+
+
+def test_audio_url_is_returned_before_synthesis_finishes(client):
+    url = client.post("/api/tts", params={"text": "hello"}).json()["audio_url"]
+    assert client.get(url + "/status").json()["status"] in ("queued", "running")
+
+    # The same phrase is only synthesized once
+    assert client.post("/api/tts", params={"text": "hello"}).json()["audio_url"] == url
+
+    client.release.set()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == AUDIO
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+    assert client.synthesized == ["hello"]
+    assert client.get(url + "/status").json()["status"] == "ready"
+
+
+def test_conditional_and_range_requests(client):
+    client.release.set()
+    url = client.post("/api/tts", params={"text": "hello"}).json()["audio_url"]
+    etag = client.get(url).headers["etag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    partial = client.get(url, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(AUDIO)}"
+    assert partial.content == AUDIO[10:20]
+
+    suffix = client.get(url, headers={"Range": "bytes=-4", "If-Range": etag})
+    assert suffix.status_code == 206 and suffix.content == AUDIO[-4:]
+
+    stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert stale.status_code == 200 and stale.content == AUDIO
+
+    outside = client.get(url, headers={"Range": f"bytes={len(AUDIO)}-"})
+    assert outside.status_code == 416
+    assert outside.headers["content-range"] == f"bytes */{len(AUDIO)}"
+
+
+def test_failed_and_unknown_audio(client):
+    client.release.set()
+    url = client.post("/api/tts", params={"text": "broken"}).json()["audio_url"]
+    assert client.get(url).status_code == 500
+    assert client.get(url + "/status").json() == {"status": "failed", "error": "engine down"}
+    assert client.get("/api/audio/" + "0" * 64 + ".mp3").status_code == 404
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from tools import BashTool
+
+
+@pytest.fixture(params=[False, True], ids=["one-shot", "persistent"])
+def bash(request):
+    tool = BashTool(persistent=request.param)
+    yield tool
+    tool.close()
+
+
+def test_runs_bash_and_reports_exit_status(bash):
+    result = bash.execute(command="[[ 1 == 1 ]] && echo {a,b}")
+    assert result.success and result.output == "a b"
+
+    failed = bash.execute(command="echo out; echo err >&2; (exit 3)")
+    assert not failed.success
+    assert failed.output == "out"
+    assert failed.error == "Command exited with code 3: err"
+
+
+def test_huge_output_is_truncated_to_head_and_tail(bash):
+    result = bash.execute(command="seq 1 2000000")
+    assert result.success
+    assert result.output.startswith("1\n2\n")
+    assert result.output.rstrip().endswith("2000000")
+    assert len(result.output) < 2 * bash.max_output_bytes
+
+
+def test_timeout_kills_the_command(bash):
+    started = time.monotonic()
+    result = bash.execute(command="echo started; sleep 30", timeout=1)
+    assert time.monotonic() - started < 10
+    assert not result.success
+    assert "timed out after 1 seconds" in result.error
+    assert bash.execute(command="echo alive").output == "alive"
+
+
+def test_progress_receives_lines_as_they_are_printed():
+    lines = []
+    tool = BashTool(progress=lambda stream, line: lines.append((stream, line)))
+    tool.execute(command="echo one; echo two >&2; printf three")
+    assert sorted(lines) == [("stderr", "two"), ("stdout", "one"), ("stdout", "three")]
+
+
+def test_persistent_shell_keeps_directory_and_environment(tmp_path):
+    tool = BashTool(persistent=True)
+    try:
+        tool.execute(command=f"cd {tmp_path} && export GREETING=hi")
+        assert tool.execute(command="pwd").output == str(tmp_path)
+        assert tool.execute(command="echo $GREETING").output == "hi"
+
+        exited = tool.execute(command="exit 0")
+        assert "a new one will be started" in exited.output
+        assert tool.execute(command="echo ${GREETING:-unset}").output == "unset"
+    finally:
+        tool.close()
@@ -0,0 +1,164 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from llm.batch import BatchItem, BatchRunner, load_checkpoint, read_batch
+
+from .conftest import make_settings
+
+USAGE = {"input_tokens": 3, "output_tokens": 2}
+
+
+class FakeClient:
+    """Answers a prompt with its upper-cased text, or fails on 'boom'."""
+
+    def __init__(self):
+        self.turn_usage = dict(USAGE)
+        self.turn_api_calls = 1
+
+    def send_message(self, prompt, system):
+        if prompt == "boom":
+            raise RuntimeError("exploded")
+        return prompt.upper()
+
+    def close(self):
+        pass
+
+
+class FakeBatches:
+    """Enough of ``client.messages.batches`` for one submitted batch."""
+
+    def __init__(self):
+        self.created = []
+        self.polls = 0
+
+    def create(self, requests):
+        self.created.append(requests)
+        return SimpleNamespace(id=f"batch-{len(self.created)}")
+
+    def retrieve(self, batch_id):
+        self.polls += 1
+        return SimpleNamespace(processing_status="ended" if self.polls > 1 else "in_progress")
+
+    def results(self, batch_id):
+        for request in self.created[-1]:
+            prompt = request["params"]["messages"][0]["content"]
+            if prompt == "boom":
+                result = SimpleNamespace(
+                    type="errored", error=SimpleNamespace(error=SimpleNamespace(message="overloaded"))
+                )
+            else:
+                message = SimpleNamespace(
+                    content=[SimpleNamespace(type="text", text=prompt[::-1])],
+                    usage=SimpleNamespace(input_tokens=7, output_tokens=4),
+                )
+                result = SimpleNamespace(type="succeeded", message=message)
+            yield SimpleNamespace(custom_id=request["custom_id"], result=result)
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return {record["id"]: record for record in map(json.loads, f)}
+
+
+def make_runner(**kwargs):
+    return BatchRunner(make_settings(), FakeClient, "system", parallelism=2, **kwargs)
+
+
+def test_read_batch_defaults_and_errors(tmp_path):
+    path = tmp_path / "in.jsonl"
+    path.write_text('{"prompt": "a"}\n\n{"id": "x", "prompt": "b", "system": "s", "tools": false}\n')
+    assert read_batch(str(path)) == [BatchItem("1", "a"), BatchItem("x", "b", system="s", tools=False)]
+
+    path.write_text('{"id": "x", "prompt": "a"}\n{"id": "x", "prompt": "b"}\n')
+    with pytest.raises(ValueError, match="duplicate id 'x'"):
+        read_batch(str(path))
+
+    path.write_text('{"text": "a"}\n')
+    with pytest.raises(ValueError, match=":1: expected an object"):
+        read_batch(str(path))
+
+
+def test_load_checkpoint_drops_failures_duplicates_and_torn_lines(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(
+        '{"id": "a", "response": "A"}\n'
+        '{"id": "b", "error": "failed"}\n'
+        '{"id": "a", "response": "again"}\n'
+        '{"id": "c", "resp'
+    )
+    assert load_checkpoint(str(path)) == {"a"}
+    assert path.read_text() == '{"id": "a", "response": "A"}\n'
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_run_records_successes_and_failures(tmp_path):
+    out = tmp_path / "out.jsonl"
+    items = [BatchItem("a", "hello"), BatchItem("b", "boom"), BatchItem("c", "world")]
+    counts = make_runner().run(items, str(out))
+
+    assert counts == {"skipped": 0, "succeeded": 2, "failed": 1, "total": 3}
+    results = read_results(out)
+    assert results["a"] == {"id": "a", "response": "HELLO", "usage": USAGE, "api_calls": 1}
+    assert results["b"] == {"id": "b", "error": "exploded"}
+
+
+def test_rerun_skips_answered_items_and_retries_failures(tmp_path):
+    out = tmp_path / "out.jsonl"
+    items = [BatchItem("a", "hello"), BatchItem("b", "boom")]
+    make_runner().run(items, str(out))
+
+    items[1].prompt = "fixed"
+    counts = make_runner().run(items, str(out))
+    assert counts == {"skipped": 1, "succeeded": 1, "failed": 0, "total": 2}
+    assert read_results(out) == {
+        "a": {"id": "a", "response": "HELLO", "usage": USAGE, "api_calls": 1},
+        "b": {"id": "b", "response": "FIXED", "usage": USAGE, "api_calls": 1},
+    }
+
+
+def test_batch_api_takes_only_items_without_tools(tmp_path):
+    out = tmp_path / "out.jsonl"
+    batches = FakeBatches()
+    runner = make_runner(
+        use_batch_api=True, poll_interval=0, batch_client=SimpleNamespace(messages=SimpleNamespace(batches=batches))
+    )
+    items = [
+        BatchItem("live", "hello"),
+        BatchItem("offline", "abc", tools=False),
+        BatchItem("bad", "boom", tools=False),
+    ]
+    counts = runner.run(items, str(out))
+
+    assert counts == {"skipped": 0, "succeeded": 2, "failed": 1, "total": 3}
+    assert [request["custom_id"] for request in batches.created[0]] == ["item-0", "item-1"]
+    results = read_results(out)
+    assert results["live"]["response"] == "HELLO"
+    assert results["offline"]["response"] == "cba"
+    assert results["offline"]["api_calls"] == 1
+    assert results["bad"] == {"id": "bad", "error": "overloaded"}
+    assert not (tmp_path / "out.jsonl.batches.json").exists()
+
+
+def test_resumed_run_collects_submitted_batch_instead_of_resubmitting(tmp_path):
+    out = tmp_path / "out.jsonl"
+    batches = FakeBatches()
+    batches.created.append([
+        {"custom_id": "item-0", "params": {"messages": [{"role": "user", "content": "abc"}]}},
+    ])
+    state = [{"batch_id": "batch-1", "items": {"item-0": "offline"}}]
+    (tmp_path / "out.jsonl.batches.json").write_text(json.dumps(state))
+    runner = make_runner(
+        use_batch_api=True, poll_interval=0, batch_client=SimpleNamespace(messages=SimpleNamespace(batches=batches))
+    )
+    counts = runner.run([BatchItem("offline", "abc", tools=False)], str(out))
+
+    assert counts["succeeded"] == 1
+    assert len(batches.created) == 1
+    assert read_results(out)["offline"]["response"] == "cba"
+
+
+def test_batch_api_requires_live_transport():
+    with pytest.raises(ValueError, match="LLM_TRANSPORT=live"):
+        BatchRunner(make_settings(), FakeClient, "system", use_batch_api=True)
@@ -0,0 +1,87 @@
+from llm.context import SUMMARY_HEADER, ContextManager, message_chars
+
+
+def turn(text: str, tool_output: str | None = None) -> list[dict]:
+    """One user turn, optionally with a tool call, ending in a text reply."""
+    messages = [{"role": "user", "content": text}]
+    if tool_output is not None:
+        messages += [
+            {"role": "assistant", "content": [{"type": "tool_use", "id": f"t-{text}", "name": "Read", "input": {}}]},
+            {"role": "user", "content": [{"type": "tool_result", "tool_use_id": f"t-{text}", "content": tool_output}]},
+        ]
+    messages.append({"role": "assistant", "content": [{"type": "text", "text": f"reply to {text}"}]})
+    return messages
+
+
+def tracked(history: list[dict], **options) -> ContextManager:
+    context = ContextManager(**options)
+    for message in history:
+        context.track(message)
+    return context
+
+
+def test_under_budget_is_untouched():
+    history = turn("a") + turn("b")
+    context = tracked(history, token_budget=10_000)
+    assert context.enforce(history) is None
+    assert context.compactions == 0
+
+
+def test_stale_tool_output_is_stubbed_first():
+    history = turn("old", tool_output="x" * 8000) + turn("new")
+    context = tracked(history, token_budget=1500, keep_recent_turns=1, stub_threshold_chars=1000)
+
+    compacted = context.enforce(history)
+
+    assert compacted is not None and len(compacted) == len(history)
+    assert compacted[2]["content"][0]["content"].startswith("[Earlier tool output elided: 8000 characters.")
+    assert context.total_chars == sum(message_chars(m) for m in compacted)
+    assert context.compactions == 1
+
+
+def test_oldest_turns_are_replaced_by_a_summary():
+    history = turn("first", tool_output="y" * 500) + turn("second") + turn("third")
+    context = tracked(history, token_budget=100, keep_recent_turns=1, stub_threshold_chars=10_000)
+
+    compacted = context.enforce(history)
+
+    assert compacted[0]["role"] == "user"
+    assert compacted[0]["content"][0]["text"].startswith(SUMMARY_HEADER)
+    assert "- User: first" in compacted[0]["content"][0]["text"]
+    # Whole turns are dropped, so no tool_use is left without its result
+    assert not any(
+        isinstance(m["content"], list) and any(b.get("type") in ("tool_use", "tool_result") for b in m["content"])
+        for m in compacted
+    )
+    assert compacted[-1] == history[-1]
+
+
+def test_oversized_current_turn_is_left_alone():
+    history = [{"role": "user", "content": "z" * 10_000}]
+    context = tracked(history, token_budget=100)
+
+    assert context.enforce(history) is None
+    assert context.enforce(history) is None
+    assert context.compactions == 0
+
+
+def test_client_does_not_rewrite_store_when_nothing_was_cut(settings):
+    from llm.client import LLMClient
+    from tools import ToolRegistry
+
+    class Store:
+        replaced = 0
+
+        def append(self, session_id, message):
+            pass
+
+        def replace(self, session_id, messages):
+            self.replaced += 1
+
+    client = LLMClient(settings, ToolRegistry(), transport=object())
+    client.context.token_budget = 10
+    client.store, client.session_id = Store(), "s1"
+    client._begin_turn("z" * 1000)
+    for _ in range(3):
+        client._enforce_context_budget()
+    assert client.store.replaced == 0
@@ -0,0 +1,57 @@
+import pytest
+
+from tools import EditTool
+from tools import edit as edit_module
+
+
+@pytest.fixture(params=["memory", "mmap"])
+def tool(request, monkeypatch):
+    if request.param == "mmap":
+        monkeypatch.setattr(edit_module, "MMAP_THRESHOLD_BYTES", 0)
+    return EditTool()
+
+
+def test_replaces_unique_string(tool, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"one\ntwo\nthree\n")
+    result = tool.execute(path=str(path), old_str="two\nthree", new_str="2\n3")
+    assert result.success, result.error
+    assert path.read_bytes() == b"one\n2\n3\n"
+
+
+def test_multiline_edit_in_crlf_file_keeps_crlf(tool, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"a\r\nb\r\nc\r\n")
+    result = tool.execute(path=str(path), old_str="a\nb", new_str="X\nY\nZ")
+    assert result.success, result.error
+    assert path.read_bytes() == b"X\r\nY\r\nZ\r\nc\r\n"
+
+
+def test_crlf_in_edit_strings_is_accepted(tool, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"a\r\nb\r\n")
+    assert tool.execute(path=str(path), old_str="a\r\nb", new_str="c\r\nd").success
+    assert path.read_bytes() == b"c\r\nd\r\n"
+
+
+def test_ambiguous_or_missing_string_leaves_file_alone(tool, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"x\nx\n")
+    assert "2 times" in tool.execute(path=str(path), old_str="x", new_str="y").error
+    assert "not found" in tool.execute(path=str(path), old_str="z", new_str="y").error
+    assert path.read_bytes() == b"x\nx\n"
+
+
+def test_edits_apply_together_or_not_at_all(tool, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"alpha beta gamma\n")
+
+    failed = tool.execute(path=str(path), edits=[{"old_str": "alpha", "new_str": "A"}, {"old_str": "delta", "new_str": "D"}])
+    assert failed.error.startswith("Edit 2:")
+    assert path.read_bytes() == b"alpha beta gamma\n"
+
+    overlapping = tool.execute(path=str(path), edits=[{"old_str": "alpha beta", "new_str": "A"}, {"old_str": "beta", "new_str": "B"}])
+    assert "overlap" in overlapping.error
+
+    assert tool.execute(path=str(path), edits=[{"old_str": "gamma", "new_str": "G"}, {"old_str": "alpha", "new_str": "A"}]).success
+    assert path.read_bytes() == b"A beta G\n"
@@ -0,0 +1,73 @@
+import os
+import time
+
+import pytest
+
+from tools import GlobTool
+from tools.snapshot import DirectorySnapshot
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "top.py").write_text("x")
+    (tmp_path / "src" / "a.py").write_text("x" * 30)
+    (tmp_path / "src" / "pkg" / "b.py").write_text("x" * 20)
+    (tmp_path / "src" / "notes.txt").write_text("x")
+    (tmp_path / "dist").mkdir()
+    (tmp_path / "dist" / "c.py").write_text("x")
+    (tmp_path / ".gitignore").write_text("dist/\n")
+    return tmp_path
+
+
+def listed(result, root) -> list[str]:
+    return [line.split("  (")[0][len(str(root)) + 1:] for line in result.output.splitlines() if line.startswith(str(root))]
+
+
+def test_star_stays_in_one_directory_and_double_star_recurses(tree):
+    tool = GlobTool()
+    assert listed(tool.execute(pattern="*.py", path=str(tree)), tree) == ["top.py"]
+    assert listed(tool.execute(pattern="**/*.py", path=str(tree)), tree) == ["src/a.py", "src/pkg/b.py", "top.py"]
+    assert listed(tool.execute(pattern="*.py", path=str(tree / "src")), tree) == ["src/a.py"]
+    assert listed(tool.execute(pattern="**/pkg", path=str(tree), include_dirs=True), tree) == ["src/pkg/"]
+
+
+def test_sorting_by_size_and_mtime(tree):
+    tool = GlobTool()
+    assert listed(tool.execute(pattern="src/**/*.py", path=str(tree), sort_by="size"), tree) == ["src/a.py", "src/pkg/b.py"]
+
+    now = time.time()
+    os.utime(tree / "src" / "a.py", (now - 100, now - 100))
+    os.utime(tree / "src" / "pkg" / "b.py", (now, now))
+    assert listed(tool.execute(pattern="src/**/*.py", path=str(tree), sort_by="mtime"), tree) == ["src/pkg/b.py", "src/a.py"]
+
+    assert "Unknown sort_by" in tool.execute(pattern="*", path=str(tree), sort_by="color").error
+
+
+def test_new_and_rewritten_files_are_seen(tree):
+    tool = GlobTool()
+    tool.execute(pattern="**/*.py", path=str(tree))
+    (tree / "src" / "pkg" / "new.py").write_text("x")
+    (tree / "top.py").write_text("x" * 100)
+
+    assert "src/pkg/new.py" in listed(tool.execute(pattern="**/*.py", path=str(tree)), tree)
+    assert listed(tool.execute(pattern="**/*.py", path=str(tree), sort_by="size"), tree)[0] == "top.py"
+
+
+def test_polling_snapshot_only_restats_files_when_asked(tree):
+    snapshot = DirectorySnapshot(str(tree), use_inotify=False)
+    snapshot.refresh()
+
+    def sizes():
+        return {path: size for path, _, size in snapshot.files()}
+
+    assert sizes()["top.py"] == 1
+    assert "dist/c.py" not in sizes()
+
+    # Make the directory scan look settled, then rewrite a file in place
+    time.sleep(0.05)
+    snapshot.refresh()
+    (tree / "top.py").write_text("x" * 100)
+    snapshot.refresh(verify_files=True)
+    assert sizes()["top.py"] == 100
+    snapshot.close()
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from tools import GrepTool
+from tools.grep import TrigramIndex, required_literals
+from tools.snapshot import DirectorySnapshot
+
+
+@pytest.mark.parametrize(
+    "pattern, literals",
+    [
+        ("def main", ["def main"]),
+        (r"foo\.bar\(", ["foo.bar("]),
+        (r"class \w+Tool", ["class ", "Tool"]),
+        ("colou?r", ["colo"]),
+        ("cat|dog", []),
+        (r"(?i)abc", []),
+        (".*", []),
+    ],
+)
+def test_required_literals(pattern, literals):
+    assert required_literals(pattern) == literals
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("def main():\n    return helper()\n")
+    (tmp_path / "src" / "util.py").write_text("def helper():\n    return 42\n")
+    (tmp_path / "notes.md").write_text("Remember to call main.\n")
+    (tmp_path / "blob.bin").write_bytes(b"def main\0\1\2")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "app.py").write_text("def main(): pass\n")
+    (tmp_path / ".gitignore").write_text("build/\n")
+    return tmp_path
+
+
+def test_search_skips_binary_and_ignored_files(tree):
+    result = GrepTool().execute(pattern=r"def main", path=str(tree))
+    assert result.success
+    assert f"{tree}/src/app.py:1: def main():" in result.output
+    assert "build" not in result.output
+    assert "blob.bin" not in result.output
+    assert "[1 matches in 1 files.]" in result.output
+
+
+def test_glob_and_case_options(tree):
+    tool = GrepTool()
+    assert "notes.md" not in tool.execute(pattern="main", path=str(tree), glob="*.py").output
+    assert "notes.md:1:" in tool.execute(pattern="REMEMBER", path=str(tree), ignore_case=True).output
+    assert tool.execute(pattern="cat|main", path=str(tree)).output.count("main") >= 2
+
+
+def test_search_sees_changes_between_calls(tree):
+    tool = GrepTool()
+    assert tool.execute(pattern="unique_marker", path=str(tree)).output == "No matches found."
+
+    (tree / "src" / "util.py").write_text("def helper():\n    return unique_marker\n")
+    (tree / "src" / "new.py").write_text("unique_marker = 1\n")
+    output = tool.execute(pattern="unique_marker", path=str(tree)).output
+    assert "util.py:2:" in output and "new.py:1:" in output
+
+    os.remove(tree / "src" / "new.py")
+    output = tool.execute(pattern="unique_marker", path=str(tree / "src")).output
+    assert "util.py:2:" in output and "new.py" not in output
+
+
+def test_polling_index_narrows_candidates_and_tracks_rewrites(tree):
+    snapshot = DirectorySnapshot(str(tree), use_inotify=False)
+    index = TrigramIndex(snapshot)
+    index.refresh()
+    assert index.candidates(["def helper"]) == ["src/util.py"]
+    assert index.candidates([]) == [".gitignore", "notes.md", "src/app.py", "src/util.py"]
+
+    # Rewritten in place: the directory's mtime does not move
+    (tree / "notes.md").write_text("def helper is documented here\n")
+    index.refresh()
+    assert index.candidates(["def helper"]) == ["notes.md", "src/util.py"]
+    assert index.candidates(["helper"], "src") == ["src/app.py", "src/util.py"]
+    snapshot.close()
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, MetricsMiddleware, MetricsRegistry
+
+
+def test_counter_renders_each_label_set():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    requests.inc(route="/a")
+    requests.inc(2, route='/b"x')
+
+    assert requests.value(route="/a") == 1.0
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/a"} 1.0\n'
+        'requests_total{route="/b\\"x"} 2.0\n'
+    )
+    with pytest.raises(ValueError):
+        requests.inc(-1, route="/a")
+    with pytest.raises(ValueError):
+        requests.inc(path="/a")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_histogram_time_observes_even_when_the_block_raises():
+    latency = MetricsRegistry().histogram("work_seconds", "Work.", ("outcome",))
+    with pytest.raises(RuntimeError):
+        with latency.time(outcome="error"):
+            raise RuntimeError
+    assert latency.count(outcome="error") == 1
+
+
+def test_duplicate_names_and_reserved_labels_are_rejected():
+    registry = MetricsRegistry()
+    registry.counter("x_total", "X.")
+    with pytest.raises(ValueError, match="already registered"):
+        registry.counter("x_total", "X again.")
+    with pytest.raises(ValueError, match="reserved"):
+        registry.histogram("y_seconds", "Y.", ("le",))
+
+
+def test_middleware_times_streams_to_the_last_chunk():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"a", "more_body": True})
+        assert HTTP_REQUEST_SECONDS.count(**labels) == before
+        await send({"type": "http.response.body", "body": b"b"})
+
+    async def send(message):
+        pass
+
+    labels = {"method": "GET", "route": "<unmatched>", "status": "200"}
+    before = HTTP_REQUEST_SECONDS.count(**labels)
+    asyncio.run(MetricsMiddleware(app)({"type": "http", "method": "GET"}, None, send))
+    assert HTTP_REQUEST_SECONDS.count(**labels) == before + 1
+
+
+def test_metrics_endpoint_labels_requests_by_route_template():
+    client = TestClient(main.app)
+    client.get("/api/audio/missing.mp3")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    assert 'route="/api/audio/{filename}"' in response.text
+    assert "missing.mp3" not in response.text
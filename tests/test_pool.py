@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm.pool import ConnectionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_clients_are_shared_and_recreated_after_close():
+    pool = ConnectionPool()
+    client = pool.client()
+    assert pool.client() is client
+    assert pool.client(asynchronous=True) is not client
+    pool.close()
+    assert pool.client() is not client
+    pool.close()
+
+
+def test_warm_leaves_idle_connections_in_the_pool(server):
+    pool = ConnectionPool(base_url=server, max_keepalive=8)
+    try:
+        # An error status still counts: the handshake is what is being warmed
+        assert pool.warm(3) == 3
+        stats = pool.stats()
+        assert stats["requests"] == 3
+        assert stats["async"] is None
+        if stats["sync"] is not None:
+            assert stats["sync"]["connections"] == 3
+            assert stats["sync"]["idle"] == 3
+    finally:
+        pool.close()
+
+
+def test_warm_reports_failed_handshakes():
+    pool = ConnectionPool(base_url="http://127.0.0.1:9")
+    try:
+        assert pool.warm(2) == 0
+        assert pool.warm(0) == 0
+    finally:
+        pool.close()
+
+
+def test_warm_async(server):
+    async def main():
+        pool = ConnectionPool(base_url=server)
+        try:
+            return await pool.warm_async(2), pool.stats()
+        finally:
+            await pool.aclose()
+
+    warmed, stats = asyncio.run(main())
+    assert warmed == 2
+    assert stats["requests"] == 2
+    assert stats["sync"] is None
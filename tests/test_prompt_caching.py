@@ -0,0 +1,82 @@
+import copy
+
+from benchmarks.stub import StubAnthropic
+from llm.client import CACHE_CONTROL, LLMClient
+from tools import ReadTool, ToolRegistry
+
+from .conftest import make_settings, message
+
+
+class RecordingStub(StubAnthropic):
+    """Keeps a copy of the parameters of every request."""
+
+    def __init__(self, script):
+        super().__init__(script)
+        self.requests = []
+        create = self.messages.create
+
+        def record(**params):
+            self.requests.append(copy.deepcopy(params))
+            return create(**params)
+
+        self.messages.create = record
+
+
+def run_turn(tmp_path, **settings):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello")
+    tools = ToolRegistry()
+    tools.register(ReadTool())
+    transport = RecordingStub([("tool_use", [("Read", {"path": str(path)})]), ("text", "Done.")])
+    client = LLMClient(make_settings(**settings), tools, transport=transport)
+    client.send_message("Read my notes", "You are helpful.")
+    return client, transport.requests
+
+
+def test_breakpoints_on_tools_system_and_newest_message(tmp_path):
+    _, requests = run_turn(tmp_path)
+    assert len(requests) == 2
+
+    for params in requests:
+        assert params["system"] == [{"type": "text", "text": "You are helpful.", "cache_control": CACHE_CONTROL}]
+        assert params["tools"][-1]["cache_control"] == CACHE_CONTROL
+        assert all("cache_control" not in tool for tool in params["tools"][:-1])
+
+    first, second = (params["messages"] for params in requests)
+    assert first == [
+        {"role": "user", "content": [{"type": "text", "text": "Read my notes", "cache_control": CACHE_CONTROL}]}
+    ]
+    # The breakpoint moves to the tool result; earlier messages go out as stored
+    assert second[0] == {"role": "user", "content": "Read my notes"}
+    assert second[-1]["content"][-1]["type"] == "tool_result"
+    assert second[-1]["content"][-1]["cache_control"] == CACHE_CONTROL
+
+
+def test_stored_history_has_no_breakpoints(tmp_path):
+    client, _ = run_turn(tmp_path)
+    assert "cache_control" not in repr(client.conversation_history)
+
+
+def test_disabled_caching_sends_plain_params(tmp_path):
+    _, requests = run_turn(tmp_path, prompt_caching=False)
+    assert requests[0]["system"] == "You are helpful."
+    assert "cache_control" not in repr(requests)
+
+
+def test_tool_list_copy_is_reused_between_calls(tmp_path):
+    client = LLMClient(make_settings(), ToolRegistry(), transport=object())
+    client.tool_registry.register(ReadTool())
+    client._begin_turn("hi")
+    first = client._request_params("system")["tools"]
+    assert client._request_params("system")["tools"] is first
+
+
+def test_cache_reads_and_writes_are_counted(settings, replay):
+    response = message([{"type": "text", "text": "hi"}], "end_turn")
+    response["usage"].update(cache_creation_input_tokens=300, cache_read_input_tokens=1200)
+    client = LLMClient(settings, ToolRegistry(), transport=replay([response]))
+    client.send_message("hello", "system")
+
+    assert client.turn_usage["cache_creation_input_tokens"] == 300
+    assert client.turn_usage["cache_read_input_tokens"] == 1200
+    assert client.turn_usage["input_tokens"] == 10
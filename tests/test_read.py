@@ -0,0 +1,101 @@
+import pytest
+
+from tools import read as read_module
+from tools.read import ReadTool
+
+
+@pytest.fixture
+def lines_file(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_text("".join(f"line {n}\n" for n in range(1, 101)))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def small_index_chunks(monkeypatch):
+    # Several checkpoints even in small files, so line_start crosses them
+    monkeypatch.setattr(read_module, "INDEX_CHUNK_BYTES", 64)
+    read_module._index_cache.clear()
+
+
+def test_small_file_is_returned_whole(lines_file):
+    result = ReadTool().execute(path=str(lines_file))
+    assert result.success
+    assert result.output == lines_file.read_text()
+
+
+def test_offset_and_limit_page_through_lines(lines_file):
+    result = ReadTool().execute(path=str(lines_file), offset=40, limit=3)
+    assert result.output.startswith("line 40\nline 41\nline 42\n\n")
+    assert "[Showing lines 40-42 of 100. Use offset=43 to read more.]" in result.output
+
+
+def test_every_line_is_reachable_across_checkpoints(lines_file):
+    tool = ReadTool()
+    for n in range(1, 101):
+        assert tool.execute(path=str(lines_file), offset=n, limit=1).output.startswith(f"line {n}\n")
+
+
+def test_index_is_rebuilt_when_file_changes(lines_file):
+    tool = ReadTool()
+    assert tool.execute(path=str(lines_file), offset=100, limit=1).output.startswith("line 100\n")
+    lines_file.write_text("".join(f"row {n}\n" for n in range(1, 201)))
+    assert tool.execute(path=str(lines_file), offset=150, limit=1).output.startswith("row 150\n")
+
+
+def test_offset_past_end_is_an_error(lines_file):
+    result = ReadTool().execute(path=str(lines_file), offset=101)
+    assert not result.success
+    assert "past the end of the file (100 lines)" in result.error
+
+
+def test_head_and_tail(lines_file):
+    tool = ReadTool()
+    assert tool.execute(path=str(lines_file), mode="head", limit=2).output.startswith("line 1\nline 2\n\n")
+    tail = tool.execute(path=str(lines_file), mode="tail", limit=2).output
+    assert tail.startswith("line 99\nline 100\n\n[Showing lines 99-100 of 100.]")
+
+
+def test_sample_returns_spaced_windows(lines_file):
+    output = ReadTool().execute(path=str(lines_file), mode="sample", limit=10).output
+    headers = [line for line in output.splitlines() if line.startswith("---")]
+    assert headers == [f"--- lines {first}-{first + 1} of 100 ---" for first in (1, 21, 41, 61, 81)]
+
+
+def test_byte_cap_truncates_output(lines_file):
+    result = ReadTool(max_output_bytes=20).execute(path=str(lines_file))
+    assert result.output.startswith("line 1\nline 2\n\n")
+    assert "output truncated at 20 bytes. Use offset=3" in result.output
+
+
+def test_overlong_line_is_cut(tmp_path):
+    path = tmp_path / "long.txt"
+    path.write_text("x" * 100 + "\nnext\n")
+    result = ReadTool(max_output_bytes=10).execute(path=str(path))
+    assert result.output.startswith("x" * 10 + " [line truncated]")
+
+
+def test_last_line_without_newline(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("a\nb")
+    assert ReadTool().execute(path=str(path)).output == "a\nb"
+    assert ReadTool().execute(path=str(path), offset=2).output.startswith("b\n\n[Showing lines 2-2 of 2.]")
+
+
+def test_binary_file_is_rejected_in_lines_mode_and_dumped_otherwise(tmp_path):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(b"\x00\x01ABC" * 10)
+    tool = ReadTool()
+    assert "binary file?" in tool.execute(path=str(path)).error
+    dump = tool.execute(path=str(path), mode="head").output
+    assert dump.startswith("[Binary file, 50 bytes]\n--- bytes 0-49 ---\n00000000  00 01 41 42 43")
+
+
+def test_empty_file_and_bad_arguments(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    tool = ReadTool()
+    assert tool.execute(path=str(path)).output == ""
+    assert "must be absolute" in tool.execute(path="empty.txt").error
+    assert "Unknown mode" in tool.execute(path=str(path), mode="middle").error
+    assert "positive integers" in tool.execute(path=str(path), offset=0).error
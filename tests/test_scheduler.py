@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import anthropic
+import pytest
+
+from llm.pool import _http_module
+from llm.scheduler import AdmissionQueue, APIScheduler, Priority, RateLimiter, SchedulerBusy
+
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def api_error(status: int, retry_after: str | None = None) -> anthropic.APIStatusError:
+    http = _http_module()
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = http.Response(status, headers=headers, request=http.Request("POST", "https://api.test/v1/messages"))
+    error_class = anthropic.RateLimitError if status == 429 else anthropic.APIStatusError
+    return error_class(f"status {status}", response=response, body=None)
+
+
+class ScriptedMessages:
+    """Raises or returns each scripted outcome in turn, taking ``delays`` seconds each."""
+
+    def __init__(self, outcomes: list, delays: list[float] | None = None):
+        self.outcomes = list(outcomes)
+        self.delays = list(delays or [])
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, **params):
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+        time.sleep(self.delays[index] if index < len(self.delays) else 0)
+        outcome = self.outcomes[min(index, len(self.outcomes) - 1)]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class AsyncScriptedMessages(ScriptedMessages):
+    async def create(self, **params):
+        index = self.calls
+        self.calls += 1
+        await asyncio.sleep(self.delays[index] if index < len(self.delays) else 0)
+        return self.outcomes[min(index, len(self.outcomes) - 1)]
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    queue = AdmissionQueue(max_in_flight=1, max_queue=10)
+    queue.acquire(Priority.TEXT)
+    admitted = []
+
+    def call(name: str, priority: Priority) -> None:
+        queue.acquire(priority)
+        admitted.append(name)
+        queue.release()
+
+    threads = []
+    for name, priority in [
+        ("background", Priority.BACKGROUND),
+        ("text-1", Priority.TEXT),
+        ("voice", Priority.VOICE),
+        ("text-2", Priority.TEXT),
+    ]:
+        thread = threading.Thread(target=call, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: queue.waiting == len(threads))
+
+    queue.release()
+    for thread in threads:
+        thread.join()
+    assert admitted == ["voice", "text-1", "text-2", "background"]
+    assert queue.in_flight == 0
+
+
+def test_full_queue_refuses_instead_of_waiting():
+    queue = AdmissionQueue(max_in_flight=1, max_queue=0)
+    queue.acquire(Priority.TEXT)
+    with pytest.raises(SchedulerBusy):
+        queue.acquire(Priority.VOICE)
+    assert not queue.try_acquire()
+    queue.release()
+    assert queue.try_acquire()
+    queue.release()
+
+
+def test_cancelled_async_waiter_does_not_leak_a_slot():
+    queue = AdmissionQueue(max_in_flight=1)
+
+    async def scenario():
+        await queue.acquire_async(Priority.TEXT)
+        waiter = asyncio.create_task(queue.acquire_async(Priority.TEXT))
+        await asyncio.sleep(0.01)
+        assert queue.waiting == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        queue.release()
+
+    asyncio.run(scenario())
+    assert (queue.in_flight, queue.waiting) == (0, 0)
+
+
+def test_rate_limiter_follows_response_headers():
+    limiter = RateLimiter()
+    assert limiter.reserve() == 0.0
+    limiter.update({
+        "anthropic-ratelimit-requests-limit": "60",
+        "anthropic-ratelimit-requests-remaining": "1",
+    })
+    assert limiter.try_reserve()
+    assert 0 < limiter.reserve() <= 1.0
+
+
+def test_retryable_errors_are_retried_and_others_raised():
+    scheduler = APIScheduler(max_retries=3, retry_base=0.001, retry_max=0.01)
+    messages = ScriptedMessages([api_error(429, retry_after="0"), api_error(529), "ok"])
+    assert scheduler.create(messages, {}) == "ok"
+    assert messages.calls == 3
+
+    messages = ScriptedMessages([api_error(400), "ok"])
+    with pytest.raises(anthropic.APIStatusError):
+        scheduler.create(messages, {})
+    assert messages.calls == 1
+    assert scheduler.admission.in_flight == 0
+
+
+def test_hedge_holds_its_slot_until_the_loser_finishes():
+    scheduler = APIScheduler(max_in_flight=2, hedge_after=0.05)
+    messages = ScriptedMessages(["slow", "fast"], delays=[0.5, 0.01])
+
+    assert scheduler.create(messages, {}) == "fast"
+    assert scheduler.admission.in_flight == 1
+    wait_until(lambda: scheduler.admission.in_flight == 0)
+
+
+def test_no_hedge_without_a_free_slot():
+    scheduler = APIScheduler(max_in_flight=1, hedge_after=0.05)
+    messages = ScriptedMessages(["slow", "fast"], delays=[0.2, 0.01])
+    assert scheduler.create(messages, {}) == "slow"
+    assert messages.calls == 1
+    assert scheduler.admission.in_flight == 0
+
+
+def test_async_hedge_cancels_the_loser_and_frees_its_slot():
+    scheduler = APIScheduler(max_in_flight=2, hedge_after=0.05)
+    messages = AsyncScriptedMessages(["slow", "fast"], delays=[1.0, 0.01])
+
+    async def scenario():
+        result = await scheduler.create_async(messages, {})
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(scenario()) == "fast"
+    assert scheduler.admission.in_flight == 0
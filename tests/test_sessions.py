@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from llm.client import LLMClient
+from llm.session import SessionManager
+from tools import ToolRegistry
+
+
+@pytest.fixture
+def manager(settings):
+    sessions = SessionManager(lambda: LLMClient(settings, ToolRegistry(), transport=object()), max_sessions=1)
+    yield sessions
+    sessions.close_all()
+
+
+def test_malformed_ids_get_a_fresh_session(manager):
+    session = manager.get_or_create("../etc/passwd")
+    assert session.session_id != "../etc/passwd"
+    manager.release(session)
+    assert manager.get_or_create(session.session_id) is session
+
+
+def test_leased_session_is_not_evicted(manager):
+    a = manager.get_or_create("session-a")
+    b = manager.get_or_create("session-b")
+
+    # Over max_sessions, but a is still leased
+    assert manager.stats()["active_sessions"] == 2
+    a.client.conversation_history.append({"role": "user", "content": "kept"})
+    manager.release(b)
+
+    assert manager.get_or_create("session-a") is a
+    assert a.client.conversation_history == [{"role": "user", "content": "kept"}]
+    manager.release(a)
+    manager.release(a)
+
+    # Once released, the least recently used session goes first
+    c = manager.get_or_create("session-c")
+    assert manager.stats()["active_sessions"] == 1
+    assert manager.stats()["evictions"] == 2
+    manager.release(c)
+
+
+def test_idle_sessions_expire_unless_leased(manager):
+    manager.max_sessions = 10
+    manager.idle_ttl = 60
+    idle = manager.get_or_create("session-idle")
+    manager.release(idle)
+    busy = manager.get_or_create("session-busy")
+    idle.last_access = busy.last_access = time.monotonic() - 120
+
+    fresh = manager.get_or_create("session-new")
+
+    assert manager.get_or_create("session-busy") is busy
+    recreated = manager.get_or_create("session-idle")
+    assert recreated is not idle
+    for session in (busy, busy, fresh, recreated):
+        manager.release(session)
+    assert not any(session.leases for session in (busy, fresh, recreated))
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from voice.speech import SentenceSplitter, SpeechPipeline, speakable
+
+
+def split(chunks: list[str], **options) -> list[str]:
+    splitter = SentenceSplitter(**options)
+    sentences = []
+    for chunk in chunks:
+        sentences += splitter.feed(chunk)
+    return sentences + splitter.flush()
+
+
+def test_sentences_are_emitted_as_soon_as_they_end():
+    splitter = SentenceSplitter(min_chars=5)
+    assert splitter.feed("Hello there, how are") == []
+    assert splitter.feed(" you? I am fine") == ["Hello there, how are you?"]
+    assert splitter.flush() == ["I am fine"]
+
+
+def test_streamed_and_whole_text_split_the_same():
+    text = "The first sentence is here. Then a second one! And a third?"
+    whole = split([text], min_chars=5)
+    streamed = split([text[i:i + 3] for i in range(0, len(text), 3)], min_chars=5)
+    assert whole == streamed == ["The first sentence is here.", "Then a second one!", "And a third?"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Ask Dr. Smith about it tomorrow.",
+        "Use a tool, e.g. grep for searching.",
+        "It costs 3.50 dollars per unit.",
+    ],
+)
+def test_abbreviations_and_numbers_do_not_end_sentences(text):
+    assert split([text], min_chars=5) == [text]
+
+
+def test_line_breaks_end_list_items_and_markdown_is_stripped():
+    assert split(["# Plan\n1. **Read** the file\n2. Fix the `bug`\n"], min_chars=1) == [
+        "Plan",
+        "Read the file",
+        "Fix the bug",
+    ]
+
+
+def test_short_sentences_are_joined_with_the_next():
+    assert split(["Yes. Sure. That works for me."], min_chars=12) == ["Yes. Sure. That works for me."]
+    assert split(["Yes. Sure. That works for me."], min_chars=10) == ["Yes. Sure.", "That works for me."]
+
+
+def test_code_blocks_are_not_spoken():
+    assert split(["Run this:\n```py\nprint('x. y. z.')\n```\nThen check the output."], min_chars=1) == [
+        "Run this:",
+        "Then check the output.",
+    ]
+
+
+def test_overlong_text_is_cut_at_a_comma():
+    sentences = split(["word " * 10 + ", " + "more " * 10], min_chars=1, max_chars=60)
+    assert all(len(sentence) <= 60 for sentence in sentences)
+    assert " ".join(sentences).split() == ("word " * 10 + ", " + "more " * 10).split()
+
+
+def test_speakable_keeps_link_text():
+    assert speakable("See [the docs](https://example.com) > here") == "See the docs here"
+
+
+def test_pipeline_reports_audio_in_sentence_order():
+    events = []
+
+    async def synthesize(sentence: str) -> str:
+        # Later sentences finish first
+        await asyncio.sleep(0.05 if sentence.startswith("First") else 0)
+        if "fail" in sentence:
+            raise RuntimeError("engine down")
+        return f"/audio/{len(events)}"
+
+    async def send(event):
+        events.append(event)
+
+    async def scenario():
+        pipeline = SpeechPipeline(synthesize, send, SentenceSplitter(min_chars=1))
+        pipeline.feed("First sentence here. Second one")
+        pipeline.feed(" will fail. Third")
+        await pipeline.finish()
+
+    asyncio.run(scenario())
+    assert [(event["type"], event["index"], event["text"]) for event in events] == [
+        ("audio", 0, "First sentence here."),
+        ("audio_error", 1, "Second one will fail."),
+        ("audio", 2, "Third"),
+    ]
@@ -0,0 +1,69 @@
+import pytest
+
+from llm.client import LLMClient
+from llm.session import SessionManager
+from llm.store import ConversationStore
+from tools import ToolRegistry
+
+USER = {"role": "user", "content": "hi"}
+REPLY = {"role": "assistant", "content": [{"type": "text", "text": "hello"}]}
+CALL = {"role": "assistant", "content": [{"type": "tool_use", "id": "t", "name": "Read", "input": {}}]}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "data" / "conversations.db")
+
+
+def test_history_survives_reopening(db_path):
+    store = ConversationStore(db_path)
+    store.append("s1", USER)
+    store.append("s1", REPLY)
+    store.append("s2", USER)
+    store.close()
+
+    reopened = ConversationStore(db_path)
+    assert reopened.load("s1") == [USER, REPLY]
+    reopened.append("s1", USER)
+    assert reopened.load("s1") == [USER, REPLY, USER]
+    assert reopened.stats()["stored_sessions"] == 2
+    reopened.close()
+
+
+def test_replace_and_clear(db_path):
+    store = ConversationStore(db_path)
+    for message in (USER, REPLY, USER, REPLY):
+        store.append("s1", message)
+    store.replace("s1", [USER, REPLY])
+    store.append("s1", USER)
+    assert store.load("s1") == [USER, REPLY, USER]
+
+    store.clear("s1")
+    assert not store.exists("s1")
+    store.append("s1", REPLY)
+    assert store.load("s1") == [REPLY]
+    store.close()
+
+
+def test_evicted_session_is_restored_without_its_unfinished_turn(settings, db_path):
+    store = ConversationStore(db_path)
+    for message in (USER, REPLY, USER, CALL):
+        store.append("session-1", message)
+    manager = SessionManager(
+        lambda: LLMClient(settings, ToolRegistry(), transport=object()), max_sessions=1, store=store
+    )
+
+    session = manager.get_or_create("session-1")
+    assert session.client.conversation_history == [USER, REPLY]
+    assert store.load("session-1") == [USER, REPLY]
+    manager.release(session)
+
+    # Evicting frees memory but keeps the stored history
+    manager.release(manager.get_or_create("session-2"))
+    restored = manager.get_or_create("session-1")
+    assert restored is not session
+    assert restored.client.conversation_history == [USER, REPLY]
+    assert manager.stats()["restored"] == 2
+    manager.release(restored)
+    manager.close_all()
+    store.close()
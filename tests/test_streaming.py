@@ -0,0 +1,26 @@
+from llm.client import LLMClient
+from tools import ReadTool, ToolRegistry
+
+from .conftest import text_reply, tool_call
+
+
+def test_stream_reports_tools_then_reply_without_printing(settings, replay, tmp_path, capsys):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello\n")
+    tools = ToolRegistry()
+    tools.register(ReadTool())
+    client = LLMClient(
+        settings,
+        tools,
+        transport=replay([tool_call("Read", {"path": str(path)}), text_reply("It says hello.")]),
+    )
+
+    events = list(client.send_message_stream("What is in notes.txt?", "system"))
+
+    assert [event["type"] for event in events] == ["tool_use", "tool_result", "text", "done"]
+    assert events[0] == {"type": "tool_use", "name": "Read", "input": {"path": str(path)}}
+    assert events[1]["is_error"] is False
+    assert events[-1]["text"] == "It says hello."
+    assert [m["role"] for m in client.conversation_history] == ["user", "assistant", "user", "assistant"]
+    # Server sessions share stdout, so tool calls are only logged
+    assert capsys.readouterr().out == ""
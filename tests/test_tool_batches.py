@@ -0,0 +1,71 @@
+import pytest
+
+from tools import BashTool, EditTool, GlobTool, GrepTool, ReadTool, ToolRegistry, WriteTool
+
+
+@pytest.fixture
+def registry(tmp_path):
+    tools = ToolRegistry()
+    for tool in (ReadTool(), WriteTool(), EditTool(), BashTool(), GlobTool(root=str(tmp_path)), GrepTool(root=str(tmp_path))):
+        tools.register(tool)
+    yield tools
+    tools.close()
+
+
+def test_independent_reads_and_writes_share_a_batch(registry, tmp_path):
+    calls = [
+        ("Read", {"path": str(tmp_path / "a.py")}),
+        ("Read", {"path": str(tmp_path / "b.py")}),
+        ("Write", {"path": str(tmp_path / "c.py"), "content": ""}),
+        ("Edit", {"path": str(tmp_path / "d.py")}),
+    ]
+    assert registry.plan_batches(calls) == [[0, 1, 2, 3]]
+
+
+def test_read_after_write_of_same_file_waits(registry, tmp_path):
+    path = str(tmp_path / "a.py")
+    calls = [("Write", {"path": path, "content": ""}), ("Read", {"path": path}), ("Edit", {"path": path})]
+    assert registry.plan_batches(calls) == [[0], [1], [2]]
+
+
+def test_directory_search_waits_for_write_inside_it(registry, tmp_path):
+    calls = [
+        ("Write", {"path": str(tmp_path / "x" / "a.py"), "content": ""}),
+        ("Grep", {"pattern": "a", "path": str(tmp_path / "x")}),
+        ("Glob", {"pattern": "*", "path": str(tmp_path / "x")}),
+        ("Read", {"path": str(tmp_path / "x" / "a.py")}),
+    ]
+    assert registry.plan_batches(calls) == [[0], [1, 2, 3]]
+
+
+def test_write_waits_for_search_of_its_directory(registry, tmp_path):
+    calls = [
+        ("Grep", {"pattern": "a", "path": str(tmp_path)}),
+        ("Edit", {"path": str(tmp_path / "sub" / "a.py")}),
+    ]
+    assert registry.plan_batches(calls) == [[0], [1]]
+
+
+def test_search_without_path_covers_the_working_directory(registry, tmp_path):
+    calls = [("Write", {"path": str(tmp_path / "a.py"), "content": ""}), ("Glob", {"pattern": "*.py"})]
+    assert registry.plan_batches(calls) == [[0], [1]]
+
+
+def test_sibling_with_common_name_prefix_does_not_conflict(registry, tmp_path):
+    calls = [
+        ("Write", {"path": str(tmp_path / "ab.py"), "content": ""}),
+        ("Grep", {"pattern": "a", "path": str(tmp_path / "a")}),
+    ]
+    assert registry.plan_batches(calls) == [[0, 1]]
+
+
+def test_bash_and_unknown_tools_run_alone(registry, tmp_path):
+    path = str(tmp_path / "a.py")
+    calls = [
+        ("Read", {"path": path}),
+        ("Bash", {"command": "true"}),
+        ("Read", {"path": path}),
+        ("Nope", {}),
+        ("Read", {"path": path}),
+    ]
+    assert registry.plan_batches(calls) == [[0], [1], [2], [3], [4]]
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from anthropic.types import Message
+
+from benchmarks.stub import StubAnthropic
+from llm.transport import Cassette, CassetteMiss, RecordingTransport, ReplayTransport, request_hash
+
+from .conftest import text_reply
+
+PARAMS = {"model": "claude-test", "max_tokens": 10, "messages": [{"role": "user", "content": "hi"}]}
+
+
+class FakeStream:
+    """Enough of an SDK message stream for recording."""
+
+    def __init__(self, chunks: list[str]):
+        self.chunks = chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+    @property
+    def text_stream(self):
+        yield from self.chunks
+
+    def get_final_message(self) -> Message:
+        return Message.model_validate(text_reply("".join(self.chunks)))
+
+
+class StreamingStub(StubAnthropic):
+    def __init__(self, script, chunks):
+        super().__init__(script)
+        self.messages.stream = lambda **params: FakeStream(chunks)
+
+
+def test_request_hash_ignores_key_order():
+    assert request_hash({"a": 1, "b": [1, 2]}) == request_hash({"b": [1, 2], "a": 1})
+    assert request_hash({"a": 1}) != request_hash({"a": 2})
+
+
+def test_recorded_calls_replay_without_the_network(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    live = StreamingStub([("text", "first"), ("text", "second")], ["Hel", "lo"])
+    recorder = RecordingTransport(live, Cassette(path))
+    recorder.messages.create(**PARAMS)
+    recorder.messages.create(**PARAMS)
+    with recorder.messages.stream(**{**PARAMS, "stream_test": True}) as stream:
+        assert list(stream.text_stream) == ["Hel", "lo"]
+        stream.get_final_message()
+
+    replay = ReplayTransport(Cassette(path))
+    # One request recorded twice replays in order, then repeats the last answer
+    assert [replay.messages.create(**PARAMS).content[0].text for _ in range(3)] == ["first", "second", "second"]
+    with replay.messages.stream(**{**PARAMS, "stream_test": True}) as stream:
+        assert list(stream.text_stream) == ["Hel", "lo"]
+        assert stream.get_final_message().content[0].text == "Hello"
+
+
+def test_unrecorded_request_is_a_miss_unless_lenient(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = RecordingTransport(StubAnthropic([("text", "only")]), Cassette(path))
+    recorder.messages.create(**PARAMS)
+    other = {**PARAMS, "max_tokens": 99}
+
+    with pytest.raises(CassetteMiss):
+        ReplayTransport(Cassette(path)).messages.create(**other)
+
+    lenient = ReplayTransport(Cassette(path, strict=False))
+    assert lenient.messages.create(**other).content[0].text == "only"
+    with pytest.raises(CassetteMiss):
+        lenient.messages.create(**{**PARAMS, "max_tokens": 100})
+
+
+def test_missing_cassette_is_a_miss(tmp_path):
+    with pytest.raises(CassetteMiss):
+        ReplayTransport(Cassette(str(tmp_path / "absent.jsonl"))).messages.create(**PARAMS)
+
+
+def test_async_replay(replay):
+    transport = replay([text_reply("streamed reply"), text_reply("created")], asynchronous=True)
+
+    async def scenario():
+        async with transport.messages.stream(**PARAMS) as stream:
+            chunks = [text async for text in stream.text_stream]
+            final = await stream.get_final_message()
+        created = await transport.messages.create(**PARAMS)
+        return chunks, final.content[0].text, created.content[0].text
+
+    assert asyncio.run(scenario()) == (["streamed reply"], "streamed reply", "created")
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+from voice import TTSCache
+from voice import tts_cache as tts_cache_module
+
+
+def writer(size: int, calls: list | None = None):
+    def synthesize(text: str, path: str) -> None:
+        if calls is not None:
+            calls.append(text)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+
+    return synthesize
+
+
+def cached_names(cache: TTSCache) -> set[str]:
+    return set(os.listdir(cache.directory))
+
+
+def test_repeated_phrase_is_synthesized_once(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    calls = []
+    first = cache.get_or_create("hello", "gtts", "en", None, writer(10, calls))
+    second = cache.get_or_create("hello", "gtts", "en", None, writer(10, calls))
+    other_voice = cache.get_or_create("hello", "gtts", "fr", None, writer(10, calls))
+
+    assert first == second != other_voice
+    assert calls == ["hello", "hello"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert cache.path_for(first) == os.path.join(str(tmp_path), first)
+
+
+def test_concurrent_requests_share_one_synthesis(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    calls = []
+    started = threading.Event()
+
+    def slow(text, path):
+        started.set()
+        time.sleep(0.2)
+        writer(10, calls)(text, path)
+
+    threads = [threading.Thread(target=cache.get_or_create, args=("hi", "gtts", "en", None, slow)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["hi"]
+
+
+def test_least_recently_used_file_is_evicted(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=250)
+    a = cache.get_or_create("a", "gtts", "en", None, writer(100))
+    b = cache.get_or_create("b", "gtts", "en", None, writer(100))
+    # Using a makes b the least recently used
+    cache.get_or_create("a", "gtts", "en", None, writer(100))
+    c = cache.get_or_create("c", "gtts", "en", None, writer(100))
+
+    assert cached_names(cache) == {a, c}
+    assert cache.path_for(b) is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+
+
+def test_lru_order_survives_a_restart(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=1000)
+    a = cache.get_or_create("a", "gtts", "en", None, writer(100))
+    b = cache.get_or_create("b", "gtts", "en", None, writer(100))
+    now = time.time()
+    os.utime(os.path.join(str(tmp_path), a), (now, now))
+    os.utime(os.path.join(str(tmp_path), b), (now - 60, now - 60))
+
+    reopened = TTSCache(str(tmp_path), max_bytes=250)
+    c = reopened.get_or_create("c", "gtts", "en", None, writer(100))
+    assert cached_names(reopened) == {a, c}
+
+
+def test_files_unused_past_max_age_are_dropped_at_startup(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    old = cache.get_or_create("old", "gtts", "en", None, writer(10))
+    fresh = cache.get_or_create("fresh", "gtts", "en", None, writer(10))
+    past = time.time() - 7200
+    os.utime(os.path.join(str(tmp_path), old), (past, past))
+
+    reopened = TTSCache(str(tmp_path), max_age=3600)
+    assert reopened.path_for(old) is None
+    assert reopened.path_for(fresh) is not None
+
+
+def test_failed_synthesis_leaves_no_partial_file(tmp_path):
+    cache = TTSCache(str(tmp_path))
+
+    def broken(text, path):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("engine down")
+
+    try:
+        cache.get_or_create("a", "gtts", "en", None, broken)
+    except RuntimeError:
+        pass
+    assert cached_names(cache) == set()
+
+
+def test_startup_only_removes_its_own_abandoned_temp_files(tmp_path):
+    key = "a" * 64
+    fresh_temp = tmp_path / f"{key}.1.2.tmp.mp3"
+    old_temp = tmp_path / f"{'b' * 64}.1.2.tmp.mp3"
+    for path in (fresh_temp, old_temp):
+        path.write_bytes(b"x")
+    past = time.time() - tts_cache_module.TEMP_GRACE_SECONDS - 60
+    os.utime(old_temp, (past, past))
+    (tmp_path / "notes.tmp.txt").write_text("not ours")
+    (tmp_path / "dir.tmp").mkdir()
+    (tmp_path / f"{'c' * 64}.mp3").mkdir()
+
+    cache = TTSCache(str(tmp_path))
+
+    assert fresh_temp.exists()
+    assert not old_temp.exists()
+    assert (tmp_path / "notes.tmp.txt").exists()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+from llm.async_client import AsyncLLMClient
+from llm.client import LLMClient
+from llm.session import Session
+from llm.store import ConversationStore, complete_turns
+from tools import BaseTool, ToolRegistry, ToolResult
+
+from .conftest import text_reply, tool_call
+
+
+class BlockingTool(BaseTool):
+    """A tool that runs until the test lets it finish."""
+
+    name = "Block"
+    description = "Waits."
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def get_schema(self):
+        return {"name": self.name, "description": self.description, "input_schema": {"type": "object"}}
+
+    def execute(self, **kwargs) -> ToolResult:
+        self.started.set()
+        self.release.wait(5)
+        return ToolResult(success=True, output="done")
+
+
+def registry(tool: BaseTool) -> ToolRegistry:
+    tools = ToolRegistry()
+    tools.register(tool)
+    return tools
+
+
+def test_complete_turns_drops_unfinished_tail():
+    user = {"role": "user", "content": "hi"}
+    reply = {"role": "assistant", "content": [{"type": "text", "text": "hello"}]}
+    call = {"role": "assistant", "content": [{"type": "tool_use", "id": "t", "name": "Block", "input": {}}]}
+    result = {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t", "content": "ok"}]}
+
+    assert complete_turns([user, reply]) == [user, reply]
+    assert complete_turns([user, reply, user]) == [user, reply]
+    assert complete_turns([user, reply, user, call]) == [user, reply]
+    assert complete_turns([user, reply, user, call, result]) == [user, reply]
+    assert complete_turns([user]) == []
+
+
+def test_cancelled_stream_rolls_back_tool_turn(settings, replay, tmp_path):
+    tool = BlockingTool()
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    client = AsyncLLMClient(
+        settings,
+        registry(tool),
+        transport=replay([tool_call("Block", {}), text_reply("after")], asynchronous=True),
+    )
+    client.attach_store(store, "s1")
+
+    async def scenario():
+        async def consume():
+            async for _ in client.send_message_stream("hi", "system"):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.to_thread(tool.started.wait, 5)
+        assert [m["role"] for m in client.conversation_history] == ["user", "assistant"]
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        tool.release.set()
+
+    asyncio.run(scenario())
+
+    assert client.conversation_history == []
+    assert store.load("s1") == []
+
+    # The session stays usable
+    assert asyncio.run(client.send_message("again", "system")) == "after"
+    assert [m["role"] for m in store.load("s1")] == ["user", "assistant"]
+    store.close()
+
+
+def test_closed_sync_stream_rolls_back_tool_turn(settings, replay):
+    tool = BlockingTool()
+    tool.release.set()
+    client = LLMClient(settings, registry(tool), transport=replay([tool_call("Block", {}), text_reply("after")]))
+
+    events = client.send_message_stream("hi", "system")
+    for event in events:
+        if event["type"] == "tool_result":
+            break
+    events.close()
+
+    assert client.conversation_history == []
+
+
+def test_disconnect_from_chat_events_rolls_back_under_lock(settings, replay):
+    import main
+
+    tool = BlockingTool()
+    client = AsyncLLMClient(
+        settings,
+        registry(tool),
+        transport=replay([tool_call("Block", {}), text_reply("after")], asynchronous=True),
+    )
+
+    async def scenario():
+        session = Session(session_id="s1", client=client)
+        events = main.chat_events(session, "hi")
+        assert '"tool_use"' in await events.__anext__()
+        # The client goes away while the tool is still running
+        await events.aclose()
+        tool.release.set()
+        async with session.async_lock:
+            return list(client.conversation_history)
+
+    assert asyncio.run(scenario()) == []
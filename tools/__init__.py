@@ -3,6 +3,10 @@ from .read import ReadTool
 from .write import WriteTool
 from .edit import EditTool
 from .bash import BashTool
+from .glob import GlobTool
+from .grep import GrepTool, TrigramIndex
+from .ignore import IgnoreRules
+from .snapshot import DirectorySnapshot
 
 __all__ = [
     "BaseTool",
@@ -12,4 +16,9 @@ __all__ = [
     "WriteTool",
     "EditTool",
     "BashTool",
+    "GlobTool",
+    "GrepTool",
+    "TrigramIndex",
+    "IgnoreRules",
+    "DirectorySnapshot",
 ]
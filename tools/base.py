@@ -1,7 +1,28 @@
+import asyncio
+import os
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 
+from metrics import TOOL_SECONDS
+
+
+def _overlaps(key: str | None, keys: set[str | None]) -> bool:
+    """Whether a path key is, contains or lies inside any of keys."""
+    if key is None:
+        return False
+    for other in keys:
+        if other is None:
+            continue
+        if key == other:
+            return True
+        shorter, longer = (key, other) if len(key) < len(other) else (other, key)
+        if longer.startswith(shorter.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
 
 @dataclass
 class ToolResult:
@@ -20,10 +41,17 @@ class ToolResult:
 
 
 class BaseTool(ABC):
-    """Base class for all tools."""
+    """Base class for all tools.
+
+    ``parallel_safe`` marks tools without side effects, which may run
+    concurrently with each other. Calls to other tools only overlap when
+    ``resource_key`` shows they touch different resources; a call with no
+    resource key runs on its own.
+    """
 
     name: str
     description: str
+    parallel_safe: bool = False
 
     @abstractmethod
     def get_schema(self) -> dict[str, Any]:
@@ -35,16 +63,55 @@ class BaseTool(ABC):
         """Execute the tool with the given parameters."""
         pass
 
+    async def execute_async(self, **kwargs) -> ToolResult:
+        """Execute the tool without blocking the event loop."""
+        return await asyncio.to_thread(self.execute, **kwargs)
+
+    def close(self) -> None:
+        """Release any resources held by the tool."""
+        pass
+
+    def resource_key(self, **kwargs) -> str | None:
+        """Return the resource a call touches, used to order conflicting calls."""
+        path = kwargs.get("path")
+        if isinstance(path, str) and path:
+            return os.path.realpath(path)
+        return None
+
 
 class ToolRegistry:
     """Registry for managing and dispatching tool calls."""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         self._tools: dict[str, BaseTool] = {}
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._schemas: list[dict[str, Any]] | None = None
+        self._frozen = False
 
     def register(self, tool: BaseTool) -> None:
         """Register a tool in the registry."""
+        if self._frozen:
+            raise RuntimeError(f"Cannot register {tool.name}: tool registry is frozen.")
         self._tools[tool.name] = tool
+        self._schemas = None
+
+    def freeze(self) -> None:
+        """Precompute the tool schemas and reject further registrations.
+
+        A frozen registry hands out the same schema list on every call, which
+        keeps the tools prefix of each request byte-identical for prompt caching.
+        """
+        self._schemas = [tool.get_schema() for tool in self._tools.values()]
+        self._frozen = True
+
+    def close(self) -> None:
+        """Close every tool and stop the worker threads."""
+        for tool in self._tools.values():
+            tool.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     def get_tool(self, name: str) -> BaseTool | None:
         """Get a tool by name."""
@@ -55,8 +122,13 @@ class ToolRegistry:
         return list(self._tools.keys())
 
     def get_all_schemas(self) -> list[dict[str, Any]]:
-        """Get schemas for all registered tools (Anthropic format)."""
-        return [tool.get_schema() for tool in self._tools.values()]
+        """Get schemas for all registered tools (Anthropic format).
+
+        The list is built once and shared between calls; do not mutate it.
+        """
+        if self._schemas is None:
+            self._schemas = [tool.get_schema() for tool in self._tools.values()]
+        return self._schemas
 
     def execute(self, tool_name: str, **kwargs) -> ToolResult:
         """Execute a tool by name with the given parameters."""
@@ -67,11 +139,127 @@ class ToolRegistry:
                 output="",
                 error=f"Unknown tool: {tool_name}. Available tools: {self.list_tools()}",
             )
+        started = time.perf_counter()
         try:
-            return tool.execute(**kwargs)
+            result = tool.execute(**kwargs)
         except Exception as e:
-            return ToolResult(
+            result = ToolResult(
                 success=False,
                 output="",
                 error=f"Tool execution failed: {str(e)}",
             )
+        self._observe(tool_name, started, result)
+        return result
+
+    async def execute_async(self, tool_name: str, **kwargs) -> ToolResult:
+        """Execute a tool by name without blocking the event loop."""
+        tool = self.get_tool(tool_name)
+        if tool is None:
+            return self.execute(tool_name, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = await tool.execute_async(**kwargs)
+        except Exception as e:
+            result = ToolResult(
+                success=False,
+                output="",
+                error=f"Tool execution failed: {str(e)}",
+            )
+        self._observe(tool_name, started, result)
+        return result
+
+    @staticmethod
+    def _observe(tool_name: str, started: float, result: ToolResult) -> None:
+        """Export the execution time of a call to a registered tool."""
+        TOOL_SECONDS.observe(
+            time.perf_counter() - started,
+            tool=tool_name,
+            outcome="success" if result.success else "error",
+        )
+
+    def execute_many(self, calls: list[tuple[str, dict[str, Any]]]) -> list[ToolResult]:
+        """Execute several tool calls, overlapping the ones that do not conflict.
+
+        Results are returned in the same order as ``calls``.
+        """
+        results: list[ToolResult | None] = [None] * len(calls)
+        for batch in self.plan_batches(calls):
+            if len(batch) == 1:
+                index = batch[0]
+                name, kwargs = calls[index]
+                results[index] = self.execute(name, **kwargs)
+                continue
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="tool"
+                )
+            futures = {
+                index: self._executor.submit(self.execute, calls[index][0], **calls[index][1])
+                for index in batch
+            }
+            for index, future in futures.items():
+                results[index] = future.result()
+        return results
+
+    async def execute_many_async(
+        self, calls: list[tuple[str, dict[str, Any]]]
+    ) -> list[ToolResult]:
+        """Async counterpart of ``execute_many``, bounded to ``max_workers`` at once."""
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run(index: int) -> ToolResult:
+            async with semaphore:
+                name, kwargs = calls[index]
+                return await self.execute_async(name, **kwargs)
+
+        results: list[ToolResult | None] = [None] * len(calls)
+        for batch in self.plan_batches(calls):
+            batch_results = await asyncio.gather(*(run(index) for index in batch))
+            for index, result in zip(batch, batch_results):
+                results[index] = result
+        return results
+
+    def plan_batches(self, calls: list[tuple[str, dict[str, Any]]]) -> list[list[int]]:
+        """Group call indices into consecutive batches that are safe to run together.
+
+        A call joins the current batch unless it would write a resource the
+        batch already touches, read a resource the batch writes, or it has
+        side effects without a resource key (e.g. Bash), which always runs alone.
+        Keys are paths, so a search of a directory conflicts with a write to
+        any file inside it. Calls to unknown tools also run alone.
+        """
+        batches: list[list[int]] = []
+        current: list[int] = []
+        read_keys: set[str | None] = set()
+        write_keys: set[str | None] = set()
+
+        for index, (name, kwargs) in enumerate(calls):
+            tool = self.get_tool(name)
+            parallel_safe = tool is not None and tool.parallel_safe
+            key = tool.resource_key(**kwargs) if tool is not None else None
+            exclusive = not parallel_safe and key is None
+
+            if parallel_safe:
+                conflict = _overlaps(key, write_keys)
+            else:
+                conflict = exclusive or _overlaps(key, read_keys) or _overlaps(key, write_keys)
+
+            if conflict and current:
+                batches.append(current)
+                current = []
+                read_keys = set()
+                write_keys = set()
+
+            current.append(index)
+            (read_keys if parallel_safe else write_keys).add(key)
+
+            if exclusive:
+                batches.append(current)
+                current = []
+                read_keys = set()
+                write_keys = set()
+
+        if current:
+            batches.append(current)
+        return batches
@@ -1,15 +1,152 @@
+import os
+import signal
 import subprocess
-from typing import Any
+import threading
+from typing import Any, Callable
 
 from .base import BaseTool, ToolResult
+from .shell import ShellSession
+
+MAX_OUTPUT_BYTES = 30_000
+READ_CHUNK_BYTES = 64 * 1024
+# A partial line longer than this is passed to the progress callback as is
+MAX_PROGRESS_LINE_BYTES = 4096
+KILL_GRACE_SECONDS = 2
+
+
+class OutputBuffer:
+    """Keeps the first and last bytes of a stream, dropping the middle.
+
+    Memory is bounded by ``head_bytes + tail_bytes`` however much the
+    process writes; ``dropped`` counts the bytes that were discarded.
+    """
+
+    def __init__(self, head_bytes: int, tail_bytes: int):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    @property
+    def dropped(self) -> int:
+        """Number of bytes discarded between the head and the tail."""
+        return self.total - len(self.head) - len(self.tail)
+
+    def write(self, data: bytes) -> None:
+        """Append a chunk of output."""
+        self.total += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data or self.tail_bytes <= 0:
+            return
+        if len(data) >= self.tail_bytes:
+            self.tail[:] = data[-self.tail_bytes:]
+        else:
+            self.tail += data
+            excess = len(self.tail) - self.tail_bytes
+            if excess > 0:
+                del self.tail[:excess]
+
+    def getvalue(self) -> str:
+        """Return the captured text, marking where output was dropped."""
+        head = self.head.decode("utf-8", errors="replace")
+        tail = self.tail.decode("utf-8", errors="replace")
+        if self.dropped:
+            return f"{head}\n\n... [{self.dropped} bytes of output omitted] ...\n\n{tail}"
+        return head + tail
+
+
+class CommandOutput:
+    """Bounded stdout/stderr capture for one command.
+
+    stdout gets most of the byte budget; stderr is usually short
+    diagnostics. Each line is also passed to ``progress``, if given, as
+    soon as it is complete.
+    """
+
+    def __init__(self, max_output_bytes: int, progress: Callable[[str, str], None] | None = None):
+        self.buffers = {
+            "stdout": OutputBuffer(max_output_bytes * 2 // 5, max_output_bytes * 2 // 5),
+            "stderr": OutputBuffer(max_output_bytes // 10, max_output_bytes // 10),
+        }
+        self.progress = progress
+        self._partial = {"stdout": b"", "stderr": b""}
+
+    @property
+    def stdout(self) -> str:
+        """Captured stdout, stripped."""
+        return self.buffers["stdout"].getvalue().strip()
+
+    @property
+    def stderr(self) -> str:
+        """Captured stderr, stripped."""
+        return self.buffers["stderr"].getvalue().strip()
+
+    def feed(self, name: str, data: bytes) -> None:
+        """Record a chunk of output from the named stream."""
+        self.buffers[name].write(data)
+        if self.progress is None:
+            return
+        *lines, partial = (self._partial[name] + data).split(b"\n")
+        for line in lines:
+            self._report(name, line)
+        if len(partial) > MAX_PROGRESS_LINE_BYTES:
+            self._report(name, partial)
+            partial = b""
+        self._partial[name] = partial
+
+    def finish(self) -> None:
+        """Report any unterminated last lines."""
+        if self.progress is None:
+            return
+        for name, partial in self._partial.items():
+            if partial:
+                self._report(name, partial)
+        self._partial = {"stdout": b"", "stderr": b""}
+
+    def _report(self, name: str, line: bytes) -> None:
+        """Call the progress callback, ignoring its failures."""
+        try:
+            self.progress(name, line.decode("utf-8", errors="replace"))
+        except Exception:
+            pass
 
 
 class BashTool(BaseTool):
-    """Tool for executing bash commands."""
+    """Tool for executing bash commands.
+
+    Output is read incrementally into head/tail buffers, so a command that
+    prints gigabytes uses a bounded amount of memory and produces a bounded
+    tool result. ``progress`` receives each line as it is produced, tagged
+    with the stream name.
+
+    With ``persistent=True`` commands run in one long-lived shell, so the
+    working directory and environment carry over between calls; otherwise
+    every command gets a fresh ``bash -c``.
+    """
 
     name = "Bash"
     description = "Execute a bash command and return its output."
 
+    def __init__(
+        self,
+        max_output_bytes: int = MAX_OUTPUT_BYTES,
+        progress: Callable[[str, str], None] | None = None,
+        persistent: bool = False,
+    ):
+        self.max_output_bytes = max_output_bytes
+        self.progress = progress
+        self.shell = ShellSession() if persistent else None
+        if persistent:
+            self.description = (
+                "Execute a bash command and return its output. Commands run in a persistent "
+                "shell: the working directory, exported variables and activated virtualenvs "
+                "carry over between calls."
+            )
+
     def get_schema(self) -> dict[str, Any]:
         """Return the JSON schema for the Bash tool."""
         return {
@@ -48,45 +185,130 @@ class BashTool(BaseTool):
         if timeout > max_timeout:
             timeout = max_timeout
 
+        capture = CommandOutput(self.max_output_bytes, self.progress)
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
+            if self.shell is not None:
+                returncode = self.shell.run(command, timeout, capture.feed)
+            else:
+                returncode = self._run_process(command, timeout, capture)
+        except TimeoutError:
+            returncode = None
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Failed to execute command: {str(e)}",
             )
+        finally:
+            capture.finish()
 
-            stdout = result.stdout.strip() if result.stdout else ""
-            stderr = result.stderr.strip() if result.stderr else ""
-
-            if result.returncode == 0:
-                output = stdout
-                if stderr:
-                    output += f"\n[stderr]: {stderr}"
-                return ToolResult(
-                    success=True,
-                    output=output if output else "(no output)",
-                )
-            else:
-                error_msg = f"Command exited with code {result.returncode}"
-                if stderr:
-                    error_msg += f": {stderr}"
-                return ToolResult(
-                    success=False,
-                    output=stdout,
-                    error=error_msg,
-                )
+        stdout = capture.stdout
+        stderr = capture.stderr
 
-        except subprocess.TimeoutExpired:
+        if returncode is None:
+            error_msg = f"Command timed out after {timeout} seconds."
+            if self.shell is not None:
+                error_msg += " The shell was restarted, so exported variables were reset."
+            if stderr:
+                error_msg += f"\n[stderr]: {stderr}"
             return ToolResult(
                 success=False,
-                output="",
-                error=f"Command timed out after {timeout} seconds.",
+                output=stdout,
+                error=error_msg,
             )
-        except Exception as e:
+
+        if self.shell is not None and not self.shell.alive:
+            stdout += "\n[The shell exited; a new one will be started for the next command.]"
+            stdout = stdout.strip()
+
+        if returncode == 0:
+            output = stdout
+            if stderr:
+                output += f"\n[stderr]: {stderr}"
+            return ToolResult(
+                success=True,
+                output=output if output else "(no output)",
+            )
+        else:
+            error_msg = f"Command exited with code {returncode}"
+            if stderr:
+                error_msg += f": {stderr}"
             return ToolResult(
                 success=False,
-                output="",
-                error=f"Failed to execute command: {str(e)}",
+                output=stdout,
+                error=error_msg,
             )
+
+    def close(self) -> None:
+        """Stop the persistent shell, if any."""
+        if self.shell is not None:
+            self.shell.close()
+
+    def _run_process(self, command: str, timeout: int, capture: CommandOutput) -> int:
+        """Run a command in a fresh shell and return its exit code.
+
+        Raises TimeoutError after killing the command's process group.
+        """
+        process = subprocess.Popen(
+            # bash, like the persistent shell, rather than shell=True's /bin/sh
+            ["bash", "-c", command],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Own process group, so a timeout can kill everything it started
+            start_new_session=True,
+        )
+
+        readers = [
+            threading.Thread(target=self._pump, args=(process.stdout, capture, "stdout"), daemon=True),
+            threading.Thread(target=self._pump, args=(process.stderr, capture, "stderr"), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill_group(process)
+            raise TimeoutError(f"Command timed out after {timeout} seconds.")
+        except BaseException:
+            self._kill_group(process)
+            raise
+        finally:
+            for reader in readers:
+                # Background jobs may keep the pipes open; the readers close them at EOF
+                reader.join(timeout=KILL_GRACE_SECONDS)
+        return process.returncode
+
+    @staticmethod
+    def _pump(stream: Any, capture: CommandOutput, name: str) -> None:
+        """Copy a pipe into the capture until EOF."""
+        fd = stream.fileno()
+        try:
+            while True:
+                try:
+                    chunk = os.read(fd, READ_CHUNK_BYTES)
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                capture.feed(name, chunk)
+        finally:
+            stream.close()
+
+    @staticmethod
+    def _kill_group(process: subprocess.Popen) -> None:
+        """Terminate the command's process group, then SIGKILL whatever is left."""
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            process.wait(timeout=KILL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        process.wait()
@@ -1,14 +1,44 @@
+import mmap
 import os
+import tempfile
 from typing import Any
 
 from .base import BaseTool, ToolResult
 
+# Files larger than this are searched through mmap instead of being read into memory
+MMAP_THRESHOLD_BYTES = 8 * 1024 * 1024
+BINARY_PROBE_BYTES = 8192
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def _line_ending(data: bytes | mmap.mmap) -> bytes:
+    """The file's line ending, judged by its first line."""
+    newline = data.find(b"\n")
+    if newline > 0 and data[newline - 1:newline] == b"\r":
+        return b"\r\n"
+    return b"\n"
+
+
+def _encode(text: str, line_ending: bytes) -> bytes:
+    """Encode an edit string, writing its newlines as the file does."""
+    if line_ending == b"\r\n":
+        text = text.replace("\r\n", "\n").replace("\n", "\r\n")
+    return text.encode("utf-8")
+
+
+def _preview(text: str) -> str:
+    """Shorten a search string for an error message."""
+    return f"'{text[:100]}{'...' if len(text) > 100 else ''}'"
+
 
 class EditTool(BaseTool):
     """Tool for editing existing files."""
 
     name = "Edit"
-    description = "Edit an existing file by replacing a specific string with new content."
+    description = (
+        "Edit an existing file by replacing a specific string with new content. "
+        "Pass `edits` to make several replacements in one call; they are applied together or not at all."
+    )
 
     def get_schema(self) -> dict[str, Any]:
         """Return the JSON schema for the Edit tool."""
@@ -30,13 +60,34 @@ class EditTool(BaseTool):
                         "type": "string",
                         "description": "The replacement string.",
                     },
+                    "edits": {
+                        "type": "array",
+                        "description": (
+                            "Several replacements to apply at once, instead of old_str/new_str. "
+                            "Each old_str must be unique in the original file and the edits must not overlap."
+                        ),
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "old_str": {"type": "string"},
+                                "new_str": {"type": "string"},
+                            },
+                            "required": ["old_str", "new_str"],
+                        },
+                    },
                 },
-                "required": ["path", "old_str", "new_str"],
+                "required": ["path"],
             },
         }
 
-    def execute(self, path: str, old_str: str, new_str: str) -> ToolResult:
-        """Edit a file by replacing old_str with new_str."""
+    def execute(
+        self,
+        path: str,
+        old_str: str | None = None,
+        new_str: str | None = None,
+        edits: list[dict[str, str]] | None = None,
+    ) -> ToolResult:
+        """Edit a file by replacing each old_str with its new_str in a single pass."""
         if not path:
             return ToolResult(
                 success=False,
@@ -65,49 +116,202 @@ class EditTool(BaseTool):
                 error=f"Path is not a file: {path}",
             )
 
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-        except PermissionError:
-            return ToolResult(
-                success=False,
-                output="",
-                error=f"Permission denied reading: {path}",
-            )
-        except UnicodeDecodeError:
+        if edits is None:
+            if old_str is None or new_str is None:
+                return ToolResult(
+                    success=False,
+                    output="",
+                    error="Provide either old_str and new_str, or a list of edits.",
+                )
+            edits = [{"old_str": old_str, "new_str": new_str}]
+        elif old_str is not None or new_str is not None:
             return ToolResult(
                 success=False,
                 output="",
-                error=f"Cannot read file as text (binary file?): {path}",
+                error="Provide either old_str and new_str, or a list of edits, not both.",
             )
 
-        occurrences = content.count(old_str)
-        if occurrences == 0:
+        if not edits:
             return ToolResult(
                 success=False,
                 output="",
-                error=f"String not found in file: '{old_str[:100]}{'...' if len(old_str) > 100 else ''}'",
+                error="The list of edits is empty.",
             )
 
-        if occurrences > 1:
+        for number, edit in enumerate(edits, 1):
+            if (
+                not isinstance(edit, dict)
+                or not isinstance(edit.get("old_str"), str)
+                or not isinstance(edit.get("new_str"), str)
+            ):
+                return ToolResult(
+                    success=False,
+                    output="",
+                    error=f"Edit {number}: old_str and new_str must both be strings.",
+                )
+            if not edit["old_str"]:
+                return ToolResult(
+                    success=False,
+                    output="",
+                    error=f"Edit {number}: old_str must not be empty.",
+                )
+
+        target = os.path.realpath(path)
+        try:
+            with open(target, "rb") as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size > MMAP_THRESHOLD_BYTES:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return self._apply(path, target, mm, stat, edits, validate_utf8=False)
+                data = f.read()
+            return self._apply(path, target, data, stat, edits, validate_utf8=True)
+        except PermissionError:
             return ToolResult(
                 success=False,
                 output="",
-                error=f"String found {occurrences} times in file. It must be unique. Add more context to make it unique.",
+                error=f"Permission denied reading: {path}",
             )
 
-        new_content = content.replace(old_str, new_str)
+    def _apply(
+        self,
+        path: str,
+        target: str,
+        data: bytes | mmap.mmap,
+        stat: os.stat_result,
+        edits: list[dict[str, str]],
+        validate_utf8: bool,
+    ) -> ToolResult:
+        """Locate every edit in the original content, then write the result atomically.
+
+        Edits are given with plain newlines; in a CRLF file they are matched
+        and written with CRLF, so the file keeps its line endings.
+        """
+        binary_error = ToolResult(
+            success=False,
+            output="",
+            error=f"Cannot read file as text (binary file?): {path}",
+        )
+        if validate_utf8:
+            try:
+                data.decode("utf-8")
+            except UnicodeDecodeError:
+                return binary_error
+        elif b"\0" in data[:BINARY_PROBE_BYTES]:
+            return binary_error
+
+        line_ending = _line_ending(data)
+        replacements = []
+        for number, edit in enumerate(edits, 1):
+            old = _encode(edit["old_str"], line_ending)
+            start = data.find(old)
+            if start == -1:
+                return ToolResult(
+                    success=False,
+                    output="",
+                    error=self._numbered(number, len(edits), f"String not found in file: {_preview(edit['old_str'])}"),
+                )
+
+            occurrences = 1
+            position = data.find(old, start + len(old))
+            while position != -1 and occurrences < 10:
+                occurrences += 1
+                position = data.find(old, position + len(old))
+            if occurrences > 1:
+                count = f"{occurrences}{'+' if position != -1 else ''}"
+                return ToolResult(
+                    success=False,
+                    output="",
+                    error=self._numbered(
+                        number,
+                        len(edits),
+                        f"String found {count} times in file. It must be unique. Add more context to make it unique.",
+                    ),
+                )
+            replacements.append((start, start + len(old), _encode(edit["new_str"], line_ending), number))
+
+        replacements.sort()
+        for previous, current in zip(replacements, replacements[1:]):
+            if current[0] < previous[1]:
+                return ToolResult(
+                    success=False,
+                    output="",
+                    error=f"Edits {previous[3]} and {current[3]} overlap. Combine them into a single edit.",
+                )
 
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(new_content)
-            return ToolResult(
-                success=True,
-                output=f"Successfully edited file: {path}",
-            )
+            self._write_atomic(target, data, stat, replacements)
         except PermissionError:
             return ToolResult(
                 success=False,
                 output="",
                 error=f"Permission denied writing: {path}",
             )
+        except FileExistsError:
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"File changed while it was being edited: {path}. Read it again and retry.",
+            )
+
+        if len(edits) == 1:
+            return ToolResult(
+                success=True,
+                output=f"Successfully edited file: {path}",
+            )
+        return ToolResult(
+            success=True,
+            output=f"Successfully applied {len(edits)} edits to file: {path}",
+        )
+
+    @staticmethod
+    def _numbered(number: int, total: int, message: str) -> str:
+        """Prefix an error with the edit it refers to when there are several."""
+        return f"Edit {number}: {message}" if total > 1 else message
+
+    @staticmethod
+    def _write_atomic(
+        target: str,
+        data: bytes | mmap.mmap,
+        stat: os.stat_result,
+        replacements: list[tuple[int, int, bytes, int]],
+    ) -> None:
+        """Stream the edited content to a temp file, fsync it and rename it over target.
+
+        Raises FileExistsError if target was modified since it was read.
+        """
+        directory = os.path.dirname(target)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                position = 0
+                for start, end, new, _ in replacements:
+                    for chunk_start in range(position, start, COPY_CHUNK_BYTES):
+                        tmp.write(data[chunk_start:min(start, chunk_start + COPY_CHUNK_BYTES)])
+                    tmp.write(new)
+                    position = end
+                for chunk_start in range(position, len(data), COPY_CHUNK_BYTES):
+                    tmp.write(data[chunk_start:chunk_start + COPY_CHUNK_BYTES])
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.chmod(tmp_path, stat.st_mode & 0o7777)
+
+            current = os.stat(target)
+            if (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, stat.st_size):
+                raise FileExistsError(target)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        # Persist the rename itself
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
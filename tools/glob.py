@@ -0,0 +1,187 @@
+import os
+import re
+import time
+from typing import Any
+
+from .base import BaseTool, ToolResult
+from .ignore import translate_glob
+from .snapshot import get_snapshot
+
+DEFAULT_MAX_RESULTS = 200
+MAX_RESULTS_LIMIT = 2000
+
+SORT_KEYS = ("name", "mtime", "size")
+
+
+def _format_size(size: int) -> str:
+    """Format a byte count for display."""
+    if size < 1024:
+        return f"{size} B"
+    value = size / 1024
+    for unit in ("KB", "MB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+class GlobTool(BaseTool):
+    """Tool for finding files by name pattern.
+
+    Listings come from a shared ``DirectorySnapshot`` of the directory, so
+    repeated searches of a large tree only rescan directories that changed
+    since the last call. Files ignored by .gitignore are left out.
+    """
+
+    name = "Glob"
+    description = (
+        "Find files whose path matches a glob pattern, such as '**/*.py' or 'src/*.ts'. "
+        "Results can be sorted by name, modification time or size. Skips files ignored "
+        "by .gitignore. Use this instead of find or ls through Bash."
+    )
+    parallel_safe = True
+
+    def __init__(self, root: str | None = None, max_results: int = DEFAULT_MAX_RESULTS):
+        self.root = root or os.getcwd()
+        self.max_results = max_results
+
+    def resource_key(self, **kwargs) -> str | None:
+        """The directory or file searched, which defaults to the working directory."""
+        return os.path.realpath(kwargs.get("path") or self.root)
+
+    def get_schema(self) -> dict[str, Any]:
+        """Return the JSON schema for the Glob tool."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": (
+                            "Glob matched against paths relative to `path`. '*' does not cross "
+                            "directories; use '**/' to match at any depth, e.g. '**/*.py'."
+                        ),
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "Absolute path of the directory to search. Defaults to the working directory.",
+                    },
+                    "sort_by": {
+                        "type": "string",
+                        "enum": list(SORT_KEYS),
+                        "description": "'name' (default), 'mtime' (newest first) or 'size' (largest first).",
+                    },
+                    "include_dirs": {
+                        "type": "boolean",
+                        "description": "Also return matching directories, marked with a trailing '/' (default: false).",
+                        "default": False,
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": f"Maximum number of paths to return (default: {self.max_results}).",
+                    },
+                },
+                "required": ["pattern"],
+            },
+        }
+
+    def execute(
+        self,
+        pattern: str,
+        path: str | None = None,
+        sort_by: str = "name",
+        include_dirs: bool = False,
+        max_results: int | None = None,
+    ) -> ToolResult:
+        """List the files under path that match pattern."""
+        if not pattern:
+            return ToolResult(
+                success=False,
+                output="",
+                error="Pattern parameter is required.",
+            )
+
+        path = path or self.root
+        if not os.path.isabs(path):
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Path must be absolute. Received: {path}",
+            )
+
+        if not os.path.isdir(path):
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Directory not found: {path}",
+            )
+
+        if sort_by not in SORT_KEYS:
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Unknown sort_by: {sort_by}. Expected one of: {', '.join(SORT_KEYS)}",
+            )
+
+        if not isinstance(max_results, int) or max_results < 1:
+            max_results = self.max_results
+        max_results = min(max_results, MAX_RESULTS_LIMIT)
+
+        try:
+            matcher = re.compile(translate_glob(pattern.lstrip("/")) + "$", re.DOTALL)
+        except re.error as e:
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Invalid glob pattern: {e}",
+            )
+
+        snapshot, rel_dir = get_snapshot(os.path.realpath(path))
+        prefix_length = len(rel_dir) + 1 if rel_dir else 0
+        # Without inotify, files rewritten in place only show their new mtime
+        # and size by re-statting them; name order does not need them
+        snapshot.refresh(rel_dir, verify_files=sort_by != "name" and not snapshot.watching)
+
+        # (path relative to the search directory, mtime_ns, size)
+        matches = []
+        with snapshot.lock:
+            nodes = list(snapshot.directories(rel_dir))
+        for current, node in nodes:
+            base = current[prefix_length:] if current != rel_dir else ""
+            if include_dirs and base and matcher.match(base):
+                matches.append((base + "/", node.mtime_ns, 0))
+            for name, (mtime_ns, size) in node.files.items():
+                relative = f"{base}/{name}" if base else name
+                if matcher.match(relative):
+                    matches.append((relative, mtime_ns, size))
+
+        if not matches:
+            return ToolResult(success=True, output="No files found.")
+
+        if sort_by == "mtime":
+            matches.sort(key=lambda m: (-m[1], m[0]))
+        elif sort_by == "size":
+            matches.sort(key=lambda m: (-m[2], m[0]))
+        else:
+            matches.sort()
+
+        lines = []
+        for relative, mtime_ns, size in matches[:max_results]:
+            full_path = os.path.join(path, relative)
+            if sort_by == "mtime":
+                modified = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime_ns / 1e9))
+                lines.append(f"{full_path}  ({modified})")
+            elif sort_by == "size" and not relative.endswith("/"):
+                lines.append(f"{full_path}  ({_format_size(size)})")
+            else:
+                lines.append(full_path)
+
+        output = "\n".join(lines)
+        if len(matches) > max_results:
+            output += (
+                f"\n\n[Showing {max_results} of {len(matches)} matches. "
+                "Narrow the pattern or path to see the rest.]"
+            )
+        return ToolResult(success=True, output=output)
@@ -0,0 +1,548 @@
+import fnmatch
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Iterator
+
+from .base import BaseTool, ToolResult
+from .snapshot import DirectorySnapshot, get_snapshot
+
+DEFAULT_MAX_RESULTS = 100
+MAX_RESULTS_LIMIT = 1000
+MAX_SNIPPET_CHARS = 200
+BINARY_PROBE_BYTES = 8192
+
+# Larger files are not indexed; they are scanned on every search instead
+MAX_INDEXED_FILE_BYTES = 2 * 1024 * 1024
+MAX_INDEXED_FILES = 100_000
+# Postings are rebuilt once there are more stale entries than live files
+COMPACT_MIN_STALE = 1000
+INDEX_CACHE_SIZE = 4
+
+# Pseudo file ids for files that are tracked but not in the postings
+UNINDEXED = -1
+BINARY = -2
+
+_QUANTIFIER = re.compile(r"\{(\d*)(,?)(\d*)\}")
+
+
+def _trigrams(data: bytes) -> set[int]:
+    """Distinct byte trigrams of lowercased data, packed into ints."""
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def required_literals(pattern: str) -> list[str]:
+    """Return literal substrings that every match of a regex must contain.
+
+    This is a conservative reading of the pattern: anything it does not
+    understand (alternation, optional groups, lookarounds, inline flags)
+    contributes no literals rather than wrong ones. An empty list means the
+    pattern cannot be narrowed down and every file is a candidate.
+    """
+    # Each frame is [literals, current run, discard]; one per open group
+    frames: list[list[Any]] = [[[], [], False]]
+    i = 0
+    n = len(pattern)
+
+    def flush(frame: list[Any]) -> None:
+        if frame[1]:
+            frame[0].append("".join(frame[1]))
+            frame[1] = []
+
+    while i < n:
+        frame = frames[-1]
+        c = pattern[i]
+        atom = "other"
+
+        if c == "\\" and i + 1 < n:
+            escaped = pattern[i + 1]
+            i += 2
+            if escaped.isalnum():
+                # \d, \w, \b, \1, \x41 ... are not literal text
+                flush(frame)
+            else:
+                frame[1].append(escaped)
+                atom = "char"
+        elif c == "[":
+            flush(frame)
+            j = i + 1
+            if j < n and pattern[j] == "^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            i = j + 1
+        elif c == "(":
+            flush(frame)
+            i += 1
+            special = False
+            if pattern.startswith("?", i):
+                if pattern.startswith("?:", i):
+                    i += 2
+                elif pattern.startswith("?P<", i):
+                    i = pattern.find(">", i) + 1
+                elif pattern.startswith("?=", i):
+                    i += 2
+                elif pattern.startswith("?<=", i):
+                    i += 3
+                else:
+                    # Negative lookarounds, comments, conditionals, inline flags
+                    if re.match(r"\?[aiLmsux-]+[:)]", pattern[i:]):
+                        return []
+                    special = True
+            frames.append([[], [], special])
+            continue
+        elif c == ")" and len(frames) > 1:
+            flush(frame)
+            frames.pop()
+            i += 1
+            group_literals = [] if frame[2] else frame[0]
+            optional, i = _optional_quantifier(pattern, i)
+            if not optional:
+                frames[-1][0].extend(group_literals)
+            continue
+        elif c == "|":
+            if len(frames) == 1:
+                return []
+            flush(frame)
+            frame[2] = True
+            i += 1
+        elif c in ".^$":
+            flush(frame)
+            i += 1
+        elif c in "*+?" or (c == "{" and _optional_quantifier(pattern, i)[1] != i):
+            # Repeats a class, group or escape; those already ended the run
+            flush(frame)
+            _, i = _optional_quantifier(pattern, i)
+        else:
+            frame[1].append(c)
+            atom = "char"
+            i += 1
+
+        if atom == "char":
+            optional, after = _optional_quantifier(pattern, i)
+            if after != i:
+                # A repeated character ends the run; an optional one is dropped from it
+                if optional:
+                    frame[1].pop()
+                flush(frame)
+                i = after
+
+    flush(frames[0])
+    return [literal for literal in frames[0][0] if len(literal.encode("utf-8")) >= 3]
+
+
+def _optional_quantifier(pattern: str, i: int) -> tuple[bool, int]:
+    """Parse a quantifier at i; return whether it allows zero repeats and where it ends."""
+    if i >= len(pattern):
+        return False, i
+    c = pattern[i]
+    if c in "*?+":
+        optional = c != "+"
+        end = i + 1
+    else:
+        match = _QUANTIFIER.match(pattern, i)
+        if match is None or not (match.group(1) or match.group(3)):
+            return False, i
+        optional = not match.group(1) or int(match.group(1)) == 0
+        end = match.end()
+    # Lazy and possessive modifiers
+    if end < len(pattern) and pattern[end] in "?+":
+        end += 1
+    return optional, end
+
+
+class TrigramIndex:
+    """In-memory trigram index of the text files in a ``DirectorySnapshot``.
+
+    Each file's distinct lowercased byte trigrams are recorded in posting
+    lists, so the files that may contain a literal are found by
+    intersecting a few lists instead of reading the tree. The index is
+    built on first use. A refresh brings the snapshot up to date and
+    re-reads only files whose mtime or size changed, skipping directories
+    whose snapshot version has not moved. A changed file gets a new id and
+    its old postings are left stale until enough pile up to rebuild them.
+    """
+
+    def __init__(self, snapshot: DirectorySnapshot):
+        self.snapshot = snapshot
+        self.root = snapshot.root
+        # directory -> (snapshot version, {name: (file id, mtime_ns, size)})
+        self._dirs: dict[str, tuple[int, dict[str, tuple[int, int, int]]]] = {}
+        self._paths: list[str | None] = []
+        self._postings: dict[int, array] = {}
+        self._unindexed: set[str] = set()
+        self._stale = 0
+        self._indexed = 0
+        self.lock = threading.Lock()
+
+    def refresh(self, rel_dir: str = "") -> None:
+        """Bring the index up to date with the files under ``rel_dir``."""
+        if self._stale > COMPACT_MIN_STALE and self._stale > self._indexed:
+            self._dirs = {}
+            self._paths = []
+            self._postings = {}
+            self._unindexed = set()
+            self._stale = 0
+            self._indexed = 0
+
+        # Without inotify, files rewritten in place only show up by re-statting them
+        self.snapshot.refresh(rel_dir, verify_files=not self.snapshot.watching)
+        with self.snapshot.lock:
+            nodes = dict(self.snapshot.directories(rel_dir))
+
+        for current, node in nodes.items():
+            synced = self._dirs.get(current)
+            if synced is not None and synced[0] == node.version:
+                continue
+            old_files = synced[1] if synced is not None else {}
+            files = {}
+            for name, (mtime_ns, size) in node.files.items():
+                entry = old_files.get(name)
+                if entry is not None and entry[1:] == (mtime_ns, size):
+                    files[name] = entry
+                    continue
+                rel = f"{current}/{name}" if current else name
+                if entry is not None:
+                    self._forget(rel, entry)
+                files[name] = (self._add(rel, size), mtime_ns, size)
+            for name, entry in old_files.items():
+                if name not in node.files:
+                    self._forget(f"{current}/{name}" if current else name, entry)
+            self._dirs[current] = (node.version, files)
+
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        removed = [d for d in self._dirs if (d == rel_dir or d.startswith(prefix)) and d not in nodes]
+        for current in removed:
+            for name, entry in self._dirs.pop(current)[1].items():
+                self._forget(f"{current}/{name}" if current else name, entry)
+
+    def candidates(self, literals: list[str], rel_dir: str = "") -> list[str]:
+        """Return the files under ``rel_dir`` that may contain all the literals, sorted."""
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        keys: set[int] = set()
+        for literal in literals:
+            keys |= _trigrams(literal.encode("utf-8").lower())
+
+        paths: list[str | None] = []
+        if keys:
+            postings = []
+            for key in keys:
+                posting = self._postings.get(key)
+                if posting is None:
+                    postings = []
+                    break
+                postings.append(posting)
+            if postings:
+                postings.sort(key=len)
+                ids = set(postings[0])
+                for posting in postings[1:]:
+                    ids.intersection_update(posting)
+                    if not ids:
+                        break
+                paths = [self._paths[i] for i in ids]
+        else:
+            # Without literals every text file is a candidate
+            for current, (_, files) in self._dirs.items():
+                if current != rel_dir and not current.startswith(prefix):
+                    continue
+                for name, entry in files.items():
+                    if entry[0] >= 0:
+                        paths.append(f"{current}/{name}" if current else name)
+
+        # Files too large to index are always candidates
+        paths += self._unindexed
+
+        return sorted(path for path in paths if path is not None and path.startswith(prefix))
+
+    def stats(self) -> dict[str, int]:
+        """Return index size figures."""
+        return {
+            "files": sum(len(files) for _, files in self._dirs.values()),
+            "indexed_files": self._indexed,
+            "trigrams": len(self._postings),
+            "stale_entries": self._stale,
+        }
+
+    def _add(self, rel: str, size: int) -> int:
+        """Read a file into the postings and return its id, or a pseudo id."""
+        if size > MAX_INDEXED_FILE_BYTES or self._indexed >= MAX_INDEXED_FILES:
+            self._unindexed.add(rel)
+            return UNINDEXED
+        try:
+            with open(os.path.join(self.root, rel), "rb") as f:
+                data = f.read(MAX_INDEXED_FILE_BYTES + 1)
+        except OSError:
+            return BINARY
+        if b"\0" in data[:BINARY_PROBE_BYTES]:
+            return BINARY
+        if len(data) > MAX_INDEXED_FILE_BYTES:
+            self._unindexed.add(rel)
+            return UNINDEXED
+
+        file_id = len(self._paths)
+        self._paths.append(rel)
+        self._indexed += 1
+        postings = self._postings
+        for key in _trigrams(data.lower()):
+            posting = postings.get(key)
+            if posting is None:
+                postings[key] = array("I", (file_id,))
+            else:
+                posting.append(file_id)
+        return file_id
+
+    def _forget(self, rel: str, entry: tuple[int, int, int]) -> None:
+        """Drop a file; its postings become stale."""
+        file_id = entry[0]
+        if file_id == UNINDEXED:
+            self._unindexed.discard(rel)
+        elif file_id >= 0:
+            self._paths[file_id] = None
+            self._indexed -= 1
+            self._stale += 1
+
+
+_indexes: OrderedDict[str, TrigramIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(directory: str) -> tuple[TrigramIndex, str]:
+    """Return the index covering a directory and the directory's path within it.
+
+    There is one index per cached ``DirectorySnapshot``, so Grep and Glob
+    share the same listing of a tree.
+    """
+    snapshot, rel_dir = get_snapshot(directory)
+    with _indexes_lock:
+        index = _indexes.get(snapshot.root)
+        if index is None or index.snapshot is not snapshot:
+            index = TrigramIndex(snapshot)
+            _indexes[snapshot.root] = index
+        _indexes.move_to_end(snapshot.root)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index, rel_dir
+
+
+def _snippet(line: str, match: re.Match) -> str:
+    """Shorten a matching line around the match."""
+    line = line.rstrip("\r")
+    if len(line) <= MAX_SNIPPET_CHARS:
+        return line
+    start = max(0, min(match.start() - MAX_SNIPPET_CHARS // 4, len(line) - MAX_SNIPPET_CHARS))
+    text = line[start:start + MAX_SNIPPET_CHARS]
+    return f"{'...' if start else ''}{text}{'...' if start + MAX_SNIPPET_CHARS < len(line) else ''}"
+
+
+class GrepTool(BaseTool):
+    """Tool for searching file contents with a regular expression.
+
+    Directory searches go through a shared ``TrigramIndex`` of the
+    directory (or of an indexed ancestor), so only files that can contain
+    the pattern's literal text are read. Files ignored by .gitignore are
+    skipped, as are binary files.
+    """
+
+    name = "Grep"
+    description = (
+        "Search file contents with a regular expression. Returns matching lines as "
+        "path:line: text, skipping binary files and files ignored by .gitignore. "
+        "Faster than running grep through Bash, especially for repeated searches."
+    )
+    parallel_safe = True
+
+    def __init__(self, root: str | None = None, max_results: int = DEFAULT_MAX_RESULTS):
+        self.root = root or os.getcwd()
+        self.max_results = max_results
+
+    def resource_key(self, **kwargs) -> str | None:
+        """The directory or file searched, which defaults to the working directory."""
+        return os.path.realpath(kwargs.get("path") or self.root)
+
+    def get_schema(self) -> dict[str, Any]:
+        """Return the JSON schema for the Grep tool."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": "The regular expression to search for (Python syntax).",
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": (
+                            "Absolute path of the directory or file to search. "
+                            "Defaults to the working directory."
+                        ),
+                    },
+                    "glob": {
+                        "type": "string",
+                        "description": "Only search files matching this glob, e.g. '*.py' or 'src/**/*.ts'.",
+                    },
+                    "ignore_case": {
+                        "type": "boolean",
+                        "description": "Match case-insensitively (default: false).",
+                        "default": False,
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": f"Maximum number of matching lines to return (default: {self.max_results}).",
+                    },
+                },
+                "required": ["pattern"],
+            },
+        }
+
+    def execute(
+        self,
+        pattern: str,
+        path: str | None = None,
+        glob: str | None = None,
+        ignore_case: bool = False,
+        max_results: int | None = None,
+    ) -> ToolResult:
+        """Search the given directory or file for lines matching pattern."""
+        if not pattern:
+            return ToolResult(
+                success=False,
+                output="",
+                error="Pattern parameter is required.",
+            )
+
+        try:
+            regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Invalid regular expression: {e}",
+            )
+
+        path = path or self.root
+        if not os.path.isabs(path):
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Path must be absolute. Received: {path}",
+            )
+
+        if not os.path.exists(path):
+            return ToolResult(
+                success=False,
+                output="",
+                error=f"Path not found: {path}",
+            )
+
+        if not isinstance(max_results, int) or max_results < 1:
+            max_results = self.max_results
+        max_results = min(max_results, MAX_RESULTS_LIMIT)
+
+        literals = required_literals(pattern)
+        if ignore_case:
+            # The index folds ASCII case only
+            literals = [literal for literal in literals if literal.isascii()]
+        anchor = None
+        if literals:
+            anchor = re.compile(re.escape(max(literals, key=len)), regex.flags)
+
+        if os.path.isfile(path):
+            files = [path]
+        else:
+            index, rel_dir = get_index(os.path.realpath(path))
+            with index.lock:
+                index.refresh(rel_dir)
+                candidates = index.candidates(literals, rel_dir)
+            # Candidate paths relative to the searched directory
+            prefix_length = len(rel_dir) + 1 if rel_dir else 0
+            relative = [rel[prefix_length:] for rel in candidates]
+            if glob:
+                # Globs containing a slash match the whole relative path, others the file name
+                matcher = re.compile(fnmatch.translate(glob))
+                relative = [
+                    rel for rel in relative
+                    if matcher.match(rel if "/" in glob else rel.rsplit("/", 1)[-1])
+                ]
+            files = [os.path.join(path, rel) for rel in relative]
+
+        matches = []
+        matched_files = 0
+        truncated = False
+        for file_path in files:
+            found = self._search_file(file_path, regex, anchor, max_results - len(matches) + 1)
+            if found:
+                matched_files += 1
+                matches.extend(found)
+            if len(matches) > max_results:
+                truncated = True
+                matches = matches[:max_results]
+                break
+
+        if not matches:
+            return ToolResult(success=True, output="No matches found.")
+
+        output = "\n".join(matches)
+        if truncated:
+            output += (
+                f"\n\n[Showing the first {max_results} matches. "
+                "Narrow the search with a more specific pattern, path or glob.]"
+            )
+        else:
+            output += f"\n\n[{len(matches)} matches in {matched_files} files.]"
+        return ToolResult(success=True, output=output)
+
+    @staticmethod
+    def _search_file(file_path: str, regex: re.Pattern, anchor: re.Pattern | None, limit: int) -> list[str]:
+        """Return up to limit matching lines of a text file as ``path:line: snippet``.
+
+        With an ``anchor`` (a literal every match contains), only the lines
+        containing it are tested against the full pattern.
+        """
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return []
+        if b"\0" in data[:BINARY_PROBE_BYTES]:
+            return []
+
+        text = data.decode("utf-8", errors="replace")
+        if anchor is None:
+            lines = enumerate(text.split("\n"), 1)
+        else:
+            lines = GrepTool._anchored_lines(text, anchor)
+
+        found = []
+        for number, line in lines:
+            match = regex.search(line)
+            if match is None:
+                continue
+            found.append(f"{file_path}:{number}: {_snippet(line, match)}")
+            if len(found) >= limit:
+                break
+        return found
+
+    @staticmethod
+    def _anchored_lines(text: str, anchor: re.Pattern) -> Iterator[tuple[int, str]]:
+        """Yield ``(line number, line)`` for each line containing the anchor."""
+        number = 1
+        counted_to = 0
+        position = 0
+        while True:
+            match = anchor.search(text, position)
+            if match is None:
+                return
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.end())
+            if end == -1:
+                end = len(text)
+            number += text.count("\n", counted_to, start)
+            counted_to = start
+            yield number, text[start:end]
+            position = end + 1
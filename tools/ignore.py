@@ -0,0 +1,188 @@
+import os
+import re
+import threading
+
+# Always skipped, whether or not a .gitignore mentions them
+DEFAULT_IGNORE_PATTERNS = (".git/",)
+
+
+class IgnoreRule:
+    """One pattern from a .gitignore file."""
+
+    def __init__(self, pattern: str, regex: re.Pattern, negate: bool, dir_only: bool):
+        self.pattern = pattern
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        """Whether the rule applies to a path relative to the rule's directory."""
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(rel_path) is not None
+
+
+def translate_glob(pattern: str) -> str:
+    """Translate a glob into a regular expression body.
+
+    ``*`` and ``?`` do not match ``/``; ``**`` as a whole path segment
+    matches any number of directories.
+    """
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+                if pattern[i + 2:i + 3] == "/":
+                    # "**/" matches zero or more directories
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+                if i + 2 == n:
+                    # A trailing "**" matches everything inside
+                    out.append(".*")
+                    i += 2
+                    continue
+            while i < n and pattern[i] == "*":
+                i += 1
+            out.append("[^/]*")
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_gitignore(text: str) -> list[IgnoreRule]:
+    """Parse the contents of a .gitignore file into rules, in file order."""
+    rules = []
+    for line in text.splitlines():
+        # Trailing spaces are dropped unless escaped
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        if not line or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith(("\\!", "\\#")):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+
+        # A slash anywhere but the end anchors the pattern to the file's directory
+        anchored = "/" in line
+        body = translate_glob(line.lstrip("/"))
+        prefix = "" if anchored else "(?:.*/)?"
+        try:
+            regex = re.compile(f"{prefix}{body}$", re.DOTALL)
+        except re.error:
+            continue
+        rules.append(IgnoreRule(line, regex, negate, dir_only))
+    return rules
+
+
+_file_cache: dict[str, tuple[int, int, list[IgnoreRule]]] = {}
+_file_cache_lock = threading.Lock()
+
+
+def load_gitignore(path: str, stat: os.stat_result | None = None) -> list[IgnoreRule]:
+    """Parse an ignore file, reusing the previous parse while it is unchanged."""
+    try:
+        if stat is None:
+            stat = os.stat(path)
+        with _file_cache_lock:
+            cached = _file_cache.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        with open(path, encoding="utf-8", errors="replace") as f:
+            rules = parse_gitignore(f.read())
+    except OSError:
+        return []
+    with _file_cache_lock:
+        _file_cache[path] = (stat.st_mtime_ns, stat.st_size, rules)
+    return rules
+
+
+class IgnoreRules:
+    """The ignore rules in effect inside one directory of a tree.
+
+    Each directory's rules extend its parent's, as git does: a pattern in
+    ``a/.gitignore`` is matched against paths relative to ``a``, and the
+    last matching pattern, starting from the deepest file, decides. Paths
+    are relative to the tree root and use ``/`` separators. Callers walking
+    the tree should skip ignored directories, since git never looks inside
+    them.
+    """
+
+    def __init__(self, rules: list[IgnoreRule], base: str = "", parent: "IgnoreRules | None" = None):
+        self.rules = rules
+        self.base = base
+        self.parent = parent
+
+    @classmethod
+    def for_root(cls, root: str) -> "IgnoreRules":
+        """Rules for the top of a tree: the defaults plus .git/info/exclude."""
+        rules = parse_gitignore("\n".join(DEFAULT_IGNORE_PATTERNS))
+        rules += load_gitignore(os.path.join(root, ".git", "info", "exclude"))
+        return cls(rules)
+
+    @classmethod
+    def for_directory(cls, root: str, rel_dir: str) -> "IgnoreRules":
+        """Rules in effect inside ``rel_dir``, reading each ancestor's .gitignore."""
+        rules = cls.for_root(root).child("", os.path.join(root, ".gitignore"))
+        current = ""
+        for part in rel_dir.split("/") if rel_dir else []:
+            current = f"{current}/{part}" if current else part
+            rules = rules.child(current, os.path.join(root, current, ".gitignore"))
+        return rules
+
+    def child(self, rel_dir: str, gitignore_path: str, stat: os.stat_result | None = None) -> "IgnoreRules":
+        """Rules for a subdirectory, adding its .gitignore if there is one."""
+        rules = load_gitignore(gitignore_path, stat)
+        if not rules:
+            return self
+        return IgnoreRules(rules, rel_dir, self)
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Whether a path is ignored, assuming its parent directories are not."""
+        level: IgnoreRules | None = self
+        while level is not None:
+            if level.base:
+                local = rel_path[len(level.base) + 1:]
+            else:
+                local = rel_path
+            for rule in reversed(level.rules):
+                if rule.matches(local, is_dir):
+                    return not rule.negate
+            level = level.parent
+        return False
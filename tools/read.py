@@ -1,14 +1,122 @@
+import mmap
 import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
 from typing import Any
 
 from .base import BaseTool, ToolResult
 
+DEFAULT_LINE_LIMIT = 2000
+MAX_OUTPUT_BYTES = 100_000
+SAMPLE_WINDOWS = 5
+HEX_DUMP_BYTES = 2048
+BINARY_PROBE_BYTES = 8192
+
+# Bytes between line-index checkpoints; bounds the scan needed to reach any line
+INDEX_CHUNK_BYTES = 256 * 1024
+INDEX_CACHE_SIZE = 16
+
+READ_MODES = ("lines", "head", "tail", "sample")
+
+
+class LineIndex:
+    """Sparse map from line numbers to byte offsets for one version of a file.
+
+    One checkpoint is kept per ``INDEX_CHUNK_BYTES`` of the file, recording
+    the number of the line that contains it. Reaching any line means a
+    bisect over the checkpoints plus a scan of at most one chunk, so a deep
+    page costs the same as the first one.
+    """
+
+    def __init__(self, mm: mmap.mmap, mtime_ns: int, size: int):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self._offsets = [0]
+        self._lines = [1]
+
+        newlines = 0
+        for start in range(0, size, INDEX_CHUNK_BYTES):
+            newlines += mm[start:start + INDEX_CHUNK_BYTES].count(b"\n")
+            if start + INDEX_CHUNK_BYTES < size:
+                self._offsets.append(start + INDEX_CHUNK_BYTES)
+                self._lines.append(newlines + 1)
+
+        ends_with_newline = size > 0 and mm[size - 1:size] == b"\n"
+        self.line_count = newlines if ends_with_newline or size == 0 else newlines + 1
+
+    def line_start(self, mm: mmap.mmap, line: int) -> int | None:
+        """Return the byte offset where a 1-based line starts, or None past the end."""
+        if line < 1 or line > self.line_count:
+            return None
+        if line == 1:
+            return 0
+
+        # Last checkpoint inside an earlier line, so at least one newline is ahead
+        i = bisect_left(self._lines, line) - 1
+        position = self._offsets[i]
+        for _ in range(line - self._lines[i]):
+            position = mm.find(b"\n", position) + 1
+        return position
+
+
+_index_cache: OrderedDict[str, LineIndex] = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def get_line_index(path: str, mm: mmap.mmap, stat: os.stat_result) -> LineIndex:
+    """Return the cached line index for a file, rebuilding it if the file changed."""
+    key = os.path.realpath(path)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None and (index.mtime_ns, index.size) == (stat.st_mtime_ns, stat.st_size):
+            _index_cache.move_to_end(key)
+            return index
+
+    index = LineIndex(mm, stat.st_mtime_ns, stat.st_size)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def hex_dump(data: bytes, base_offset: int = 0) -> str:
+    """Format bytes like ``hexdump -C``."""
+    lines = []
+    for start in range(0, len(data), 16):
+        row = data[start:start + 16]
+        hex_part = " ".join(f"{b:02x}" for b in row)
+        text_part = "".join(chr(b) if 32 <= b < 127 else "." for b in row)
+        lines.append(f"{base_offset + start:08x}  {hex_part:<47}  |{text_part}|")
+    return "\n".join(lines)
+
+
+def _decode(data: bytes) -> str | None:
+    """Decode UTF-8, tolerating a character cut off at the end; None if not text."""
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start >= len(data) - 3 and e.reason == "unexpected end of data":
+            return data[:e.start].decode("utf-8", errors="replace")
+        return None
+
 
 class ReadTool(BaseTool):
     """Tool for reading file contents."""
 
     name = "Read"
-    description = "Read the contents of a file at the given path."
+    description = (
+        "Read the contents of a file at the given path. Large files are returned a page "
+        "at a time: use offset and limit to read a range of lines. Use mode 'head', 'tail' "
+        "or 'sample' to inspect binary or very large files."
+    )
+    parallel_safe = True
+
+    def __init__(self, max_output_bytes: int = MAX_OUTPUT_BYTES, default_limit: int = DEFAULT_LINE_LIMIT):
+        self.max_output_bytes = max_output_bytes
+        self.default_limit = default_limit
 
     def get_schema(self) -> dict[str, Any]:
         """Return the JSON schema for the Read tool."""
@@ -21,14 +129,37 @@ class ReadTool(BaseTool):
                     "path": {
                         "type": "string",
                         "description": "The absolute path to the file to read.",
-                    }
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "The 1-based line number to start reading from. Defaults to 1.",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": f"The maximum number of lines to read. Defaults to {self.default_limit}.",
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": list(READ_MODES),
+                        "description": (
+                            "'lines' (default) reads the offset/limit range. 'head' and 'tail' read "
+                            "the start or end of the file, and 'sample' reads a few evenly spaced "
+                            "excerpts. Binary files are shown as a hex dump in these modes."
+                        ),
+                    },
                 },
                 "required": ["path"],
             },
         }
 
-    def execute(self, path: str) -> ToolResult:
-        """Read and return the contents of the specified file."""
+    def execute(
+        self,
+        path: str,
+        offset: int | None = None,
+        limit: int | None = None,
+        mode: str = "lines",
+    ) -> ToolResult:
+        """Read the requested part of the specified file."""
         if not path:
             return ToolResult(
                 success=False,
@@ -57,22 +188,170 @@ class ReadTool(BaseTool):
                 error=f"Path is not a file: {path}",
             )
 
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
+        if mode not in READ_MODES:
             return ToolResult(
-                success=True,
-                output=content,
+                success=False,
+                output="",
+                error=f"Unknown mode: {mode}. Expected one of: {', '.join(READ_MODES)}",
+            )
+
+        if (offset is not None and offset < 1) or (limit is not None and limit < 1):
+            return ToolResult(
+                success=False,
+                output="",
+                error="offset and limit must be positive integers.",
             )
+
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size == 0:
+                    return ToolResult(success=True, output="")
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self._read(path, mm, stat, offset, limit or self.default_limit, mode)
         except PermissionError:
             return ToolResult(
                 success=False,
                 output="",
                 error=f"Permission denied: {path}",
             )
-        except UnicodeDecodeError:
+
+    def _read(
+        self,
+        path: str,
+        mm: mmap.mmap,
+        stat: os.stat_result,
+        offset: int | None,
+        limit: int,
+        mode: str,
+    ) -> ToolResult:
+        """Dispatch a read of a mapped, non-empty file."""
+        binary = b"\0" in mm[:BINARY_PROBE_BYTES]
+        if binary:
+            if mode == "lines":
+                return self._binary_error(path)
+            return ToolResult(success=True, output=self._hex_excerpts(mm, mode))
+
+        index = get_line_index(path, mm, stat)
+        if mode == "sample":
+            return self._sample_lines(mm, index, limit)
+        if mode == "tail":
+            offset = max(1, index.line_count - limit + 1)
+        elif mode == "head":
+            offset = 1
+
+        first = offset or 1
+        start = index.line_start(mm, first)
+        if start is None:
             return ToolResult(
                 success=False,
                 output="",
-                error=f"Cannot read file as text (binary file?): {path}",
+                error=f"offset {first} is past the end of the file ({index.line_count} lines).",
             )
+
+        text, last, truncated = self._read_lines(mm, start, first, limit, self.max_output_bytes)
+        if text is None:
+            if mode == "lines":
+                return self._binary_error(path)
+            return ToolResult(success=True, output=self._hex_excerpts(mm, mode))
+
+        if first == 1 and last == index.line_count and not truncated:
+            return ToolResult(success=True, output=text)
+
+        note = f"[Showing lines {first}-{last} of {index.line_count}"
+        if truncated:
+            note += f"; output truncated at {self.max_output_bytes} bytes"
+        if last < index.line_count:
+            note += f". Use offset={last + 1} to read more"
+        return ToolResult(success=True, output=text.rstrip("\n") + f"\n\n{note}.]")
+
+    def _read_lines(
+        self, mm: mmap.mmap, start: int, first: int, limit: int, max_bytes: int
+    ) -> tuple[str | None, int, bool]:
+        """Read up to limit lines from a byte offset within max_bytes.
+
+        Returns the text (None if it is not UTF-8), the number of the last
+        line included, and whether the byte cap cut the read short.
+        """
+        chunk = mm[start:start + max_bytes]
+        end = 0
+        lines = 0
+        while lines < limit:
+            newline = chunk.find(b"\n", end)
+            if newline == -1:
+                break
+            end = newline + 1
+            lines += 1
+
+        reached_eof = start + len(chunk) >= len(mm)
+        truncated = False
+        if lines < limit:
+            if reached_eof and end < len(chunk):
+                # Final line without a trailing newline
+                end = len(chunk)
+                lines += 1
+            elif lines == 0:
+                # A single line longer than the cap
+                end = len(chunk)
+                lines = 1
+                truncated = True
+            else:
+                truncated = not reached_eof
+
+        text = _decode(chunk[:end])
+        if text is None:
+            return None, first, truncated
+        if truncated and lines == 1 and not text.endswith("\n"):
+            text += " [line truncated]"
+        return text, first + lines - 1, truncated
+
+    def _sample_lines(self, mm: mmap.mmap, index: LineIndex, limit: int) -> ToolResult:
+        """Return evenly spaced excerpts of a text file."""
+        windows = min(SAMPLE_WINDOWS, index.line_count)
+        per_window = max(1, limit // windows)
+        per_window_bytes = max(1, self.max_output_bytes // windows)
+        step = index.line_count / windows
+
+        parts = []
+        next_free = 1
+        for i in range(windows):
+            first = max(next_free, int(i * step) + 1)
+            if first > index.line_count:
+                break
+            start = index.line_start(mm, first)
+            text, last, _ = self._read_lines(mm, start, first, per_window, per_window_bytes)
+            if text is None:
+                return ToolResult(success=True, output=self._hex_excerpts(mm, "sample"))
+            parts.append(f"--- lines {first}-{last} of {index.line_count} ---\n" + text.rstrip("\n"))
+            next_free = last + 1
+        return ToolResult(success=True, output="\n".join(parts))
+
+    def _hex_excerpts(self, mm: mmap.mmap, mode: str) -> str:
+        """Return hex dumps of the head, tail or evenly spaced windows of a binary file."""
+        size = len(mm)
+        dump_bytes = min(HEX_DUMP_BYTES, self.max_output_bytes // 5)
+        if mode == "head" or size <= dump_bytes:
+            windows = [0]
+        elif mode == "tail":
+            windows = [size - dump_bytes]
+        else:
+            dump_bytes = max(16, dump_bytes // SAMPLE_WINDOWS // 16 * 16)
+            step = (size - dump_bytes) / (SAMPLE_WINDOWS - 1)
+            windows = sorted({int(i * step) // 16 * 16 for i in range(SAMPLE_WINDOWS)})
+
+        parts = [f"[Binary file, {size} bytes]"]
+        for start in windows:
+            data = mm[start:start + dump_bytes]
+            parts.append(f"--- bytes {start}-{start + len(data) - 1} ---\n{hex_dump(data, start)}")
+        return "\n".join(parts)
+
+    def _binary_error(self, path: str) -> ToolResult:
+        """Report a file that cannot be read as UTF-8 text."""
+        return ToolResult(
+            success=False,
+            output="",
+            error=(
+                f"Cannot read file as text (binary file?): {path}. "
+                "Use mode 'head', 'tail' or 'sample' to inspect it."
+            ),
+        )
@@ -0,0 +1,184 @@
+import os
+import secrets
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable
+
+READ_CHUNK_BYTES = 64 * 1024
+KILL_GRACE_SECONDS = 2
+
+
+class ShellSession:
+    """A long-lived bash process that runs commands one at a time.
+
+    Each command is followed by a random sentinel on stdout (carrying the
+    exit code and working directory) and on stderr, which marks where its
+    output ends. The working directory, exported variables and activated
+    virtualenvs therefore carry over between commands. If the shell dies,
+    or is killed after a timeout, a new one is started on the next command
+    in the last known working directory.
+    """
+
+    def __init__(self, cwd: str | None = None, env: dict[str, str] | None = None):
+        self.cwd = cwd or os.getcwd()
+        self.env = env
+        self.starts = 0
+        self._process: subprocess.Popen | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        """Whether the shell process is running."""
+        return self._process is not None and self._process.poll() is None
+
+    def run(
+        self,
+        command: str,
+        timeout: float,
+        on_output: Callable[[str, bytes], None],
+    ) -> int:
+        """Run a command and return its exit code.
+
+        Output is passed to ``on_output`` as ``("stdout" | "stderr", bytes)``
+        chunks while the command runs. On timeout the shell is killed and
+        ``TimeoutError`` is raised.
+        """
+        with self._lock:
+            if not self.alive:
+                self._start()
+
+            sentinel = f"__SHELL_DONE_{secrets.token_hex(8)}__"
+            # The command's stdin is /dev/null so it cannot swallow the framing
+            script = (
+                f"eval {shlex.quote(command)} < /dev/null\n"
+                f"printf '%s %d %s\\n' '{sentinel}' \"$?\" \"$PWD\"\n"
+                f"printf '%s\\n' '{sentinel}' >&2\n"
+            )
+            try:
+                self._process.stdin.write(script.encode("utf-8"))
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self._start()
+                self._process.stdin.write(script.encode("utf-8"))
+                self._process.stdin.flush()
+
+            return self._collect(sentinel.encode(), timeout, on_output)
+
+    def close(self) -> None:
+        """Stop the shell and anything it started."""
+        with self._lock:
+            self._kill()
+
+    def _start(self) -> None:
+        """Start a fresh shell, replacing any previous one."""
+        if self._process is not None:
+            self._kill()
+        if not os.path.isdir(self.cwd):
+            self.cwd = os.getcwd()
+        self._process = subprocess.Popen(
+            ["bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+            # Own process group, so a timeout can kill everything it started
+            start_new_session=True,
+            bufsize=0,
+        )
+        self.starts += 1
+
+    def _collect(
+        self,
+        sentinel: bytes,
+        timeout: float,
+        on_output: Callable[[str, bytes], None],
+    ) -> int:
+        """Forward output until both streams reach the sentinel; return the exit code."""
+        streams = {"stdout": self._process.stdout, "stderr": self._process.stderr}
+        pending = {name: b"" for name in streams}
+        exit_code: int | None = None
+        deadline = time.monotonic() + timeout
+
+        with selectors.DefaultSelector() as selector:
+            for name, stream in streams.items():
+                selector.register(stream, selectors.EVENT_READ, name)
+
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._kill()
+                    raise TimeoutError(f"Command timed out after {timeout} seconds.")
+
+                for key, _ in selector.select(remaining):
+                    name = key.data
+                    chunk = os.read(key.fd, READ_CHUNK_BYTES)
+                    if not chunk:
+                        # The shell exited (e.g. the command ran `exit`)
+                        if pending[name]:
+                            on_output(name, pending[name])
+                        selector.unregister(key.fileobj)
+                        continue
+
+                    data = pending[name] + chunk
+                    index = data.find(sentinel)
+                    if index == -1:
+                        # Hold back a possible partial sentinel at the end
+                        safe = max(0, len(data) - len(sentinel) + 1)
+                        if safe:
+                            on_output(name, data[:safe])
+                        pending[name] = data[safe:]
+                        continue
+
+                    if index:
+                        on_output(name, data[:index])
+                    if name == "stdout":
+                        trailer = data[index + len(sentinel):]
+                        if b"\n" not in trailer:
+                            pending[name] = data[index:]
+                            continue
+                        fields = trailer.split(b"\n", 1)[0].decode("utf-8", errors="replace").split(" ", 2)
+                        exit_code = int(fields[1])
+                        if len(fields) > 2 and fields[2]:
+                            self.cwd = fields[2]
+                    pending[name] = b""
+                    selector.unregister(key.fileobj)
+
+        if exit_code is None:
+            exit_code = self._reap()
+        return exit_code
+
+    def _kill(self) -> None:
+        """Terminate the shell's process group, then SIGKILL whatever is left."""
+        process = self._process
+        if process is None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            process.wait(timeout=KILL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+        # The group may outlive its leader
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self._reap()
+
+    def _reap(self) -> int:
+        """Wait for the shell to exit, close its pipes and forget it."""
+        process = self._process
+        self._process = None
+        for stream in (process.stdin, process.stdout, process.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        return process.wait()
@@ -0,0 +1,350 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator
+
+from .ignore import IgnoreRules
+
+SNAPSHOT_CACHE_SIZE = 4
+# Past this many directories a snapshot stops using inotify and checks mtimes
+MAX_WATCHES = 8192
+# A directory modified this close to its scan may have changed again within the
+# same mtime tick, so it is rescanned once more
+RACY_WINDOW_NS = 2_000_000_000
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+_libc = None
+if sys.platform.startswith("linux"):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        _libc = None
+
+
+class InotifyWatcher:
+    """Reports which watched directories changed, using Linux inotify.
+
+    Raises OSError if inotify is unavailable.
+    """
+
+    def __init__(self):
+        if _libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._dirs: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._dirs)
+
+    def add(self, path: str, rel_dir: str) -> None:
+        """Watch a directory; raises OSError, e.g. when the watch limit is reached."""
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        self._dirs[wd] = rel_dir
+
+    def remove(self, rel_dir: str) -> None:
+        """Stop watching a directory, unless its watch now belongs to another path."""
+        for wd, watched in list(self._dirs.items()):
+            if watched == rel_dir:
+                del self._dirs[wd]
+                _libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self) -> tuple[set[str], bool]:
+        """Return the directories with pending events and whether events were lost."""
+        changed: set[str] = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                rel_dir = self._dirs.get(wd)
+                if rel_dir is None:
+                    continue
+                changed.add(rel_dir)
+                if mask & IN_IGNORED:
+                    del self._dirs[wd]
+        return changed, overflow
+
+    def close(self) -> None:
+        """Release the inotify descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+            self._dirs.clear()
+
+
+class DirectoryNode:
+    """The cached listing of one directory.
+
+    ``files`` maps names to ``(mtime_ns, size)``; ignored files and
+    directories and symlinks are left out. Nodes are replaced, never
+    modified, so a reference stays consistent after the lock is released.
+    ``version`` changes whenever the listing or any file's metadata does.
+    """
+
+    __slots__ = ("mtime_ns", "scanned_ns", "files", "subdirs", "rules", "gitignore", "version")
+
+    def __init__(
+        self,
+        mtime_ns: int,
+        scanned_ns: int,
+        files: dict[str, tuple[int, int]],
+        subdirs: list[str],
+        rules: IgnoreRules,
+        gitignore: tuple[int, int] | None,
+        version: int,
+    ):
+        self.mtime_ns = mtime_ns
+        self.scanned_ns = scanned_ns
+        self.files = files
+        self.subdirs = subdirs
+        self.rules = rules
+        self.gitignore = gitignore
+        self.version = version
+
+
+def _join(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+def _parent(rel_dir: str) -> str:
+    return rel_dir.rsplit("/", 1)[0] if "/" in rel_dir else ""
+
+
+class DirectorySnapshot:
+    """Cached, .gitignore-aware listing of a directory tree with stat metadata.
+
+    Directories are scanned on first use and afterwards only when they
+    change. On Linux each scanned directory gets an inotify watch, so a
+    refresh just drains pending events and rescans the directories they
+    name. Elsewhere, or past ``MAX_WATCHES`` directories, a refresh stats
+    every cached directory and rescans those whose mtime moved. Directory
+    mtimes only change when entries are added, removed or renamed, so
+    callers that need the metadata of files rewritten in place pass
+    ``verify_files=True`` to rescan everything in that mode.
+    """
+
+    def __init__(self, root: str, use_inotify: bool = True):
+        self.root = root
+        self.version = 0
+        self.lock = threading.RLock()
+        self._dirs: dict[str, DirectoryNode] = {}
+        self._watcher: InotifyWatcher | None = None
+        if use_inotify:
+            try:
+                self._watcher = InotifyWatcher()
+            except OSError:
+                self._watcher = None
+
+    @property
+    def watching(self) -> bool:
+        """Whether changes are reported by inotify rather than found by polling."""
+        return self._watcher is not None
+
+    def refresh(self, rel_dir: str = "", verify_files: bool = False) -> None:
+        """Bring the listing of ``rel_dir`` and everything below it up to date."""
+        with self.lock:
+            if rel_dir not in self._dirs:
+                self._scan(rel_dir, self._parent_rules(rel_dir), recursive=True)
+                return
+
+            if self._watcher is not None:
+                changed, overflow = self._watcher.read()
+                if overflow:
+                    changed = set(self._dirs)
+            elif verify_files:
+                changed = set(self.directories(rel_dir, nodes=False))
+            else:
+                changed = set()
+                for current, node in self.directories(rel_dir):
+                    try:
+                        mtime_ns = os.stat(os.path.join(self.root, current)).st_mtime_ns
+                    except OSError:
+                        changed.add(current)
+                        continue
+                    if mtime_ns != node.mtime_ns or node.scanned_ns - node.mtime_ns < RACY_WINDOW_NS:
+                        changed.add(current)
+
+            # Parents first, so a removed subtree is dropped before its children are visited
+            for current in sorted(changed, key=lambda d: d.count("/") if d else -1):
+                if current in self._dirs:
+                    self._scan(current, self._parent_rules(current), recursive=False)
+
+    def directories(self, rel_dir: str = "", nodes: bool = True) -> Iterator:
+        """Yield ``(relative path, DirectoryNode)`` for ``rel_dir`` and the directories below it.
+
+        With ``nodes=False`` only the paths are yielded. Hold ``lock``
+        while iterating.
+        """
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        for current, node in list(self._dirs.items()):
+            if current == rel_dir or current.startswith(prefix):
+                yield (current, node) if nodes else current
+
+    def files(self, rel_dir: str = "") -> Iterator[tuple[str, int, int]]:
+        """Yield ``(relative path, mtime_ns, size)`` for every file below ``rel_dir``."""
+        with self.lock:
+            nodes = list(self.directories(rel_dir))
+        for current, node in nodes:
+            for name, (mtime_ns, size) in node.files.items():
+                yield _join(current, name), mtime_ns, size
+
+    def close(self) -> None:
+        """Stop watching the tree."""
+        with self.lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+
+    def _parent_rules(self, rel_dir: str) -> IgnoreRules:
+        """Ignore rules in effect in the parent of ``rel_dir``."""
+        if not rel_dir:
+            return IgnoreRules.for_root(self.root)
+        parent = self._dirs.get(_parent(rel_dir))
+        if parent is not None:
+            return parent.rules
+        return IgnoreRules.for_directory(self.root, _parent(rel_dir))
+
+    def _scan(self, rel_dir: str, parent_rules: IgnoreRules, recursive: bool) -> None:
+        """List one directory and replace its node; descend into new or affected subdirectories."""
+        path = os.path.join(self.root, rel_dir)
+        if self._watcher is not None:
+            # Watch before listing, so no change can slip in between
+            try:
+                if len(self._watcher) >= MAX_WATCHES:
+                    raise OSError(errno.ENOSPC, "too many directories to watch")
+                self._watcher.add(path, rel_dir)
+            except OSError as e:
+                if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                    self._watcher.close()
+                    self._watcher = None
+
+        scanned_ns = time.time_ns()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            self._drop(rel_dir)
+            return
+
+        rules = parent_rules
+        gitignore = None
+        for entry in entries:
+            if entry.name == ".gitignore":
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    break
+                gitignore = (stat.st_mtime_ns, stat.st_size)
+                rules = parent_rules.child(rel_dir, entry.path, stat)
+                break
+
+        files: dict[str, tuple[int, int]] = {}
+        subdirs: list[str] = []
+        for entry in entries:
+            rel = _join(rel_dir, entry.name)
+            try:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir():
+                    if not rules.is_ignored(rel, True):
+                        subdirs.append(entry.name)
+                elif entry.is_file() and not rules.is_ignored(rel, False):
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        subdirs.sort()
+
+        old = self._dirs.get(rel_dir)
+        if old is not None and (old.files, old.subdirs, old.gitignore) == (files, subdirs, gitignore):
+            version = old.version
+        else:
+            self.version += 1
+            version = self.version
+        self._dirs[rel_dir] = DirectoryNode(mtime_ns, scanned_ns, files, subdirs, rules, gitignore, version)
+
+        if old is not None:
+            for name in set(old.subdirs) - set(subdirs):
+                self._drop(_join(rel_dir, name))
+        # A changed .gitignore alters what is ignored anywhere below
+        rules_changed = old is None or old.gitignore != gitignore
+        for name in subdirs:
+            child = _join(rel_dir, name)
+            if recursive or rules_changed or child not in self._dirs:
+                self._scan(child, rules, recursive=True)
+
+    def _drop(self, rel_dir: str) -> None:
+        """Forget a directory and everything below it."""
+        for current in list(self.directories(rel_dir, nodes=False)):
+            del self._dirs[current]
+            if self._watcher is not None:
+                self._watcher.remove(current)
+            self.version += 1
+
+
+_snapshots: OrderedDict[str, DirectorySnapshot] = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(directory: str) -> tuple[DirectorySnapshot, str]:
+    """Return the snapshot covering a directory and the directory's path within it.
+
+    An existing snapshot of an ancestor directory is reused; otherwise a
+    new one is created for the directory itself.
+    """
+    with _snapshots_lock:
+        for root, snapshot in _snapshots.items():
+            if directory == root or directory.startswith(root.rstrip(os.sep) + os.sep):
+                _snapshots.move_to_end(root)
+                rel_dir = os.path.relpath(directory, root)
+                return snapshot, "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+
+        snapshot = DirectorySnapshot(directory)
+        _snapshots[directory] = snapshot
+        while len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+            _, evicted = _snapshots.popitem(last=False)
+            evicted.close()
+        return snapshot, ""
@@ -0,0 +1,18 @@
+from .decode import AudioDecodeError, AudioTooLarge, decode_audio, upload_chunks
+from .speech import SentenceSplitter, SpeechPipeline
+from .transcription import TranscriptionPool, TranscriptionQueueFull
+from .tts_cache import TTSCache
+from .tts_jobs import TTSJobs
+
+__all__ = [
+    "AudioDecodeError",
+    "AudioTooLarge",
+    "decode_audio",
+    "upload_chunks",
+    "SentenceSplitter",
+    "SpeechPipeline",
+    "TranscriptionPool",
+    "TranscriptionQueueFull",
+    "TTSCache",
+    "TTSJobs",
+]
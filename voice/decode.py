@@ -0,0 +1,100 @@
+import asyncio
+import shutil
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 64 * 1024
+
+
+class AudioTooLarge(Exception):
+    """Raised when an upload, or the audio decoded from it, exceeds its limit."""
+
+
+class AudioDecodeError(Exception):
+    """Raised when an upload cannot be decoded as audio."""
+
+
+async def upload_chunks(upload: Any, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield an UploadFile's contents in chunks instead of reading it whole."""
+    while chunk := await upload.read(chunk_size):
+        yield chunk
+
+
+async def decode_audio(
+    chunks: AsyncIterator[bytes], max_bytes: int, max_seconds: float
+) -> "np.ndarray":
+    """Decode compressed audio to 16 kHz mono float32 samples without touching disk.
+
+    Chunks are piped into ffmpeg as they arrive while its PCM output is read
+    back concurrently, so neither the upload nor a temporary file is ever
+    held whole. The result is what ``whisper.load_audio`` would return for
+    the same file and can be passed straight to ``transcribe``. Raises
+    AudioTooLarge as soon as more than ``max_bytes`` arrive or the audio
+    runs past ``max_seconds``.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise AudioDecodeError("ffmpeg is not installed")
+
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    max_pcm_bytes = int(max_seconds * SAMPLE_RATE) * 2
+
+    async def feed() -> None:
+        received = 0
+        try:
+            async for chunk in chunks:
+                received += len(chunk)
+                if received > max_bytes:
+                    raise AudioTooLarge(f"Audio upload exceeds {max_bytes} bytes")
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg stopped reading; its exit status says why
+            pass
+        finally:
+            process.stdin.close()
+
+    async def collect() -> bytearray:
+        pcm = bytearray()
+        while chunk := await process.stdout.read(CHUNK_SIZE):
+            pcm += chunk
+            if len(pcm) > max_pcm_bytes:
+                raise AudioTooLarge(f"Audio is longer than {max_seconds:g} seconds")
+        return pcm
+
+    tasks = [
+        asyncio.ensure_future(feed()),
+        asyncio.ensure_future(collect()),
+        asyncio.ensure_future(process.stderr.read()),
+    ]
+    try:
+        _, pcm, errors = await asyncio.gather(*tasks)
+        returncode = await process.wait()
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    if returncode != 0:
+        message = errors.decode(errors="replace").strip()
+        raise AudioDecodeError(message or f"ffmpeg exited with status {returncode}")
+
+    import numpy as np
+
+    audio = np.frombuffer(pcm, np.int16).astype(np.float32)
+    audio /= 32768.0
+    return audio
@@ -0,0 +1,196 @@
+import asyncio
+import re
+from typing import Any, Awaitable, Callable
+
+CODE_FENCE = "```"
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc",
+    "e.g", "i.e", "approx", "fig", "inc", "ltd",
+}
+
+# Sentence-ending punctuation (plus closing quotes/brackets) followed by whitespace, or a line break
+_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+_MARKDOWN = re.compile(r"[*_`#>|]+|^\s*(?:[-+]|\d+[.)])\s+", re.MULTILINE)
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+
+
+def speakable(text: str) -> str:
+    """Strip markdown decoration so the TTS engine does not read it aloud."""
+    text = _LINK.sub(r"\1", text)
+    text = _MARKDOWN.sub(" ", text)
+    return " ".join(text.split())
+
+
+class SentenceSplitter:
+    """Cuts streamed text into sentences as soon as each one is complete.
+
+    A sentence ends at ``.``, ``!`` or ``?`` followed by whitespace, or at a
+    line break, so list items and headings are spoken separately. Periods
+    after common abbreviations, list numbers and inside numbers do not end a
+    sentence. Sentences shorter than ``min_chars`` are joined with the next
+    one, and a run of text longer than ``max_chars`` is cut at the last comma
+    or space. Fenced code blocks are skipped entirely.
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 300):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._pending = ""
+        self._in_code = False
+
+    def feed(self, text: str) -> list[str]:
+        """Add streamed text; return the sentences it completed."""
+        self._buffer += text
+        sentences = []
+        for sentence in self._split():
+            sentences.extend(self._emit(sentence))
+        return sentences
+
+    def flush(self) -> list[str]:
+        """Return whatever text is left, treating it as a complete sentence."""
+        tail = "" if self._in_code else self._buffer
+        self._buffer = ""
+        self._in_code = False
+        return self._emit(tail, force=True)
+
+    def _split(self) -> list[str]:
+        """Consume complete sentences from the buffer."""
+        sentences = []
+        while self._buffer:
+            if self._in_code:
+                end = self._buffer.find(CODE_FENCE)
+                if end == -1:
+                    # Keep a possible partial fence for the next chunk
+                    self._buffer = self._buffer[-(len(CODE_FENCE) - 1):]
+                    break
+                self._buffer = self._buffer[end + len(CODE_FENCE):]
+                self._in_code = False
+                continue
+
+            fence = self._buffer.find(CODE_FENCE)
+            search_end = fence if fence != -1 else len(self._buffer)
+            match = self._find_boundary(search_end)
+            if match is not None:
+                sentences.append(self._buffer[:match.start()])
+                self._buffer = self._buffer[match.end():]
+            elif fence != -1:
+                sentences.append(self._buffer[:fence])
+                self._buffer = self._buffer[fence + len(CODE_FENCE):]
+                self._in_code = True
+            elif len(self._buffer) > self.max_chars:
+                cut = self._soft_break(self._buffer[:self.max_chars])
+                sentences.append(self._buffer[:cut])
+                self._buffer = self._buffer[cut:]
+            else:
+                break
+        return sentences
+
+    def _find_boundary(self, end: int) -> re.Match | None:
+        """Return the first real sentence boundary before end."""
+        for match in _BOUNDARY.finditer(self._buffer, 0, end):
+            if "\n" in match.group():
+                return match
+            words = self._buffer[:match.start()].split()
+            last_word = words[-1].rstrip(".\"')]").lower() if words else ""
+            if last_word in ABBREVIATIONS or last_word.isdigit():
+                continue
+            return match
+        return None
+
+    @staticmethod
+    def _soft_break(text: str) -> int:
+        """Return where to cut an overlong run: after the last comma, else the last space."""
+        for separator in (", ", "; ", " "):
+            index = text.rfind(separator)
+            if index > 0:
+                return index + len(separator)
+        return len(text)
+
+    def _emit(self, sentence: str, force: bool = False) -> list[str]:
+        """Join short sentences with the next one and drop ones with nothing to say."""
+        text = f"{self._pending} {speakable(sentence)}".strip()
+        if not any(c.isalnum() for c in text):
+            return []
+        if len(text) < self.min_chars and not force:
+            self._pending = text
+            return []
+        self._pending = ""
+        return [text]
+
+
+class SpeechPipeline:
+    """Synthesizes a streamed reply sentence by sentence.
+
+    Text is fed in as it streams from the model; each sentence is handed to
+    ``synthesize`` as soon as it is complete, with at most ``max_concurrent``
+    syntheses running at once. Every result is reported with an ``audio``
+    event, in sentence order, so the client can start playing the first
+    sentence while the rest of the reply is still being generated.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], Awaitable[str]],
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        splitter: SentenceSplitter | None = None,
+        max_concurrent: int = 2,
+    ):
+        self._synthesize = synthesize
+        self._send = send
+        self.splitter = splitter or SentenceSplitter()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._last_segment: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.segments = 0
+
+    def feed(self, text: str) -> None:
+        """Add streamed reply text."""
+        for sentence in self.splitter.feed(text):
+            self._start_segment(sentence)
+
+    def flush(self) -> None:
+        """Speak any buffered partial sentence now, e.g. before a tool call."""
+        for sentence in self.splitter.flush():
+            self._start_segment(sentence)
+
+    async def finish(self) -> None:
+        """Flush the reply and wait until every sentence has been reported."""
+        self.flush()
+        if self._last_segment is not None:
+            await self._last_segment
+
+    def cancel(self) -> None:
+        """Abandon any outstanding synthesis."""
+        for task in self._tasks:
+            task.cancel()
+
+    def _start_segment(self, sentence: str) -> None:
+        """Synthesize a sentence, reported after the previous one."""
+        self._last_segment = asyncio.create_task(
+            self._synthesize_segment(self.segments, sentence, self._last_segment)
+        )
+        self._tasks.add(self._last_segment)
+        self._last_segment.add_done_callback(self._tasks.discard)
+        self.segments += 1
+
+    async def _synthesize_segment(
+        self, index: int, sentence: str, previous: asyncio.Task | None
+    ) -> None:
+        """Synthesize one sentence and report it once earlier ones are reported."""
+        try:
+            async with self._semaphore:
+                audio_url = await self._synthesize(sentence)
+            error = None
+        except Exception as e:
+            audio_url, error = None, str(e)
+
+        if previous is not None:
+            await previous
+
+        if error:
+            await self._send({"type": "audio_error", "index": index, "text": sentence, "error": error})
+        else:
+            await self._send({"type": "audio", "index": index, "text": sentence, "audio_url": audio_url})
@@ -0,0 +1,222 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+
+from .transcription import TranscriptionQueueFull
+
+SAMPLE_RATE = 16000
+
+
+class VoiceActivityDetector:
+    """Energy-based voice activity detector that cuts PCM audio into utterances.
+
+    Audio is analysed in fixed frames. A frame counts as speech when its RMS
+    energy exceeds both ``min_rms`` and ``noise_ratio`` times a running
+    estimate of the background noise. A segment ends after ``silence_ms`` of
+    non-speech (or once it reaches ``max_segment_ms``); trailing silence is
+    trimmed and ``padding_ms`` of context is kept on either side so Whisper
+    does not clip word edges.
+    """
+
+    def __init__(
+        self,
+        frame_ms: int = 30,
+        silence_ms: int = 600,
+        padding_ms: int = 200,
+        min_speech_ms: int = 250,
+        max_segment_ms: int = 20000,
+        min_rms: float = 0.01,
+        noise_ratio: float = 3.0,
+    ):
+        self.frame_samples = SAMPLE_RATE * frame_ms // 1000
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.padding_frames = max(0, padding_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_segment_frames = max(1, max_segment_ms // frame_ms)
+        self.min_rms = min_rms
+        self.noise_ratio = noise_ratio
+
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._preroll: deque[np.ndarray] = deque(maxlen=self.padding_frames or 1)
+        self._segment: list[np.ndarray] = []
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._noise_floor = min_rms / noise_ratio
+        self.in_speech = False
+
+    def process(self, samples: np.ndarray) -> list[np.ndarray]:
+        """Feed float32 samples in [-1, 1]; return the segments completed by them."""
+        samples = np.concatenate([self._remainder, samples])
+        usable = len(samples) - len(samples) % self.frame_samples
+        self._remainder = samples[usable:]
+
+        completed = []
+        for start in range(0, usable, self.frame_samples):
+            segment = self._process_frame(samples[start:start + self.frame_samples])
+            if segment is not None:
+                completed.append(segment)
+        return completed
+
+    def current_segment(self) -> np.ndarray | None:
+        """Return the utterance in progress, if any, for partial transcription."""
+        if not self.in_speech or not self._segment:
+            return None
+        return np.concatenate(self._segment)
+
+    def flush(self) -> np.ndarray | None:
+        """End the stream and return the final partial utterance, if it has speech."""
+        segment = None
+        if self.in_speech and self._speech_frames >= self.min_speech_frames:
+            segment = self._trimmed_segment()
+        self._reset_segment()
+        self._remainder = np.zeros(0, dtype=np.float32)
+        return segment
+
+    def _process_frame(self, frame: np.ndarray) -> np.ndarray | None:
+        """Advance the state machine by one frame."""
+        rms = float(np.sqrt(np.mean(frame * frame)))
+        is_speech = rms > max(self.min_rms, self._noise_floor * self.noise_ratio)
+
+        if not self.in_speech:
+            if is_speech:
+                self.in_speech = True
+                self._segment = list(self._preroll) if self.padding_frames else []
+                self._segment.append(frame)
+                self._speech_frames = 1
+                self._silence_run = 0
+            else:
+                self._noise_floor = 0.95 * self._noise_floor + 0.05 * rms
+                self._preroll.append(frame)
+            return None
+
+        self._segment.append(frame)
+        if is_speech:
+            self._speech_frames += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.silence_frames or len(self._segment) >= self.max_segment_frames:
+            segment = None
+            if self._speech_frames >= self.min_speech_frames:
+                segment = self._trimmed_segment()
+            self._reset_segment()
+            return segment
+        return None
+
+    def _trimmed_segment(self) -> np.ndarray:
+        """Join the current segment, keeping only padding_frames of trailing silence."""
+        keep = len(self._segment) - max(0, self._silence_run - self.padding_frames)
+        return np.concatenate(self._segment[:keep])
+
+    def _reset_segment(self) -> None:
+        """Return to the waiting-for-speech state."""
+        self.in_speech = False
+        self._segment = []
+        self._speech_frames = 0
+        self._silence_run = 0
+        self._preroll.clear()
+
+
+def pcm16_to_float32(chunk: bytes) -> np.ndarray:
+    """Convert little-endian 16-bit PCM bytes to float32 samples in [-1, 1]."""
+    usable = len(chunk) - len(chunk) % 2
+    return np.frombuffer(chunk[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+class StreamingTranscriber:
+    """Incrementally transcribes a live 16 kHz mono PCM stream.
+
+    Each utterance found by the VAD is transcribed as soon as it ends and
+    reported with a ``segment`` event, in order. While the user is still
+    speaking, the utterance in progress is transcribed every
+    ``partial_interval`` seconds and reported with a ``partial`` event.
+    ``finish`` flushes the stream and sends a ``final`` event with the full
+    transcript.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], Awaitable[str]],
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        vad: VoiceActivityDetector | None = None,
+        partial_interval: float = 1.0,
+    ):
+        self._transcribe = transcribe
+        self._send = send
+        self.vad = vad or VoiceActivityDetector()
+        self.partial_interval = partial_interval
+        self.texts: list[str] = []
+        self._last_segment: asyncio.Task | None = None
+        self._partial: asyncio.Task | None = None
+        self._samples_since_partial = 0
+
+    async def feed(self, chunk: bytes) -> None:
+        """Process a chunk of PCM audio from the client."""
+        samples = pcm16_to_float32(chunk)
+        for segment in self.vad.process(samples):
+            self._start_segment(segment)
+            self._samples_since_partial = 0
+
+        if self.vad.in_speech:
+            self._samples_since_partial += len(samples)
+            due = self._samples_since_partial >= self.partial_interval * SAMPLE_RATE
+            if due and (self._partial is None or self._partial.done()):
+                audio = self.vad.current_segment()
+                if audio is not None:
+                    self._samples_since_partial = 0
+                    self._partial = asyncio.create_task(self._send_partial(audio))
+
+    async def finish(self) -> str:
+        """Flush the stream, wait for every segment and send the final transcript."""
+        tail = self.vad.flush()
+        if tail is not None:
+            self._start_segment(tail)
+        if self._partial is not None:
+            self._partial.cancel()
+        if self._last_segment is not None:
+            await self._last_segment
+
+        text = " ".join(t for t in self.texts if t)
+        await self._send({"type": "final", "text": text})
+        return text
+
+    def cancel(self) -> None:
+        """Abandon any outstanding transcription work."""
+        for task in (self._partial, self._last_segment):
+            if task is not None:
+                task.cancel()
+
+    def _start_segment(self, audio: np.ndarray) -> None:
+        """Transcribe a completed utterance, chained after the previous one."""
+        self._last_segment = asyncio.create_task(
+            self._transcribe_segment(audio, self._last_segment)
+        )
+
+    async def _transcribe_segment(self, audio: np.ndarray, previous: asyncio.Task | None) -> None:
+        """Transcribe one utterance and report it once earlier ones are reported."""
+        try:
+            text = await self._transcribe(audio)
+            error = None
+        except Exception as e:
+            text, error = "", str(e)
+
+        if previous is not None:
+            await previous
+
+        self.texts.append(text)
+        if error:
+            await self._send({"type": "error", "error": error})
+        else:
+            await self._send({"type": "segment", "index": len(self.texts) - 1, "text": text})
+
+    async def _send_partial(self, audio: np.ndarray) -> None:
+        """Transcribe the utterance in progress; skipped when the pool is busy."""
+        try:
+            text = await self._transcribe(audio)
+        except TranscriptionQueueFull:
+            return
+        committed = " ".join(t for t in self.texts if t)
+        await self._send({"type": "partial", "text": f"{committed} {text}".strip()})
@@ -0,0 +1,127 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from metrics import TRANSCRIPTION_REJECTED, TRANSCRIPTION_SECONDS
+
+# Per-process Whisper model, loaded once by the pool initializer
+_worker_model = None
+
+
+class TranscriptionQueueFull(Exception):
+    """Raised when the transcription queue cannot accept more work."""
+
+
+def _init_worker(model_name: str) -> None:
+    """Load the Whisper model once in a freshly started worker process."""
+    global _worker_model
+    import whisper
+
+    _worker_model = whisper.load_model(model_name)
+
+
+def _warm_up() -> bool:
+    """No-op task that forces a worker process (and its model) to start."""
+    return _worker_model is not None
+
+
+def _transcribe_in_worker(audio: Any) -> tuple[str, float, float]:
+    """Transcribe audio in a worker; returns the text and wall-clock start/end."""
+    started = time.time()
+    result = _worker_model.transcribe(audio)
+    return result["text"].strip(), started, time.time()
+
+
+class TranscriptionPool:
+    """Runs Whisper in dedicated processes behind a bounded, awaitable queue.
+
+    Each worker process loads the model once at startup, so CPU-bound
+    inference never runs on the server's event loop. At most ``workers``
+    jobs run at a time and at most ``max_queue`` more may wait; beyond that
+    ``transcribe`` raises ``TranscriptionQueueFull`` immediately.
+    """
+
+    def __init__(self, model_name: str = "small", workers: int = 1, max_queue: int = 8):
+        self.model_name = model_name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name,),
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def start(self) -> None:
+        """Start every worker and block until their models are loaded."""
+        futures = [self._executor.submit(_warm_up) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    async def transcribe(self, audio: Any) -> str:
+        """Transcribe an audio file path (or anything Whisper accepts)."""
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                TRANSCRIPTION_REJECTED.inc()
+                raise TranscriptionQueueFull(
+                    f"Transcription queue is full ({self.max_queue} waiting)."
+                )
+            self._in_flight += 1
+
+        enqueued = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            text, started, finished = await loop.run_in_executor(
+                self._executor, _transcribe_in_worker, audio
+            )
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        wait = max(0.0, started - enqueued)
+        TRANSCRIPTION_SECONDS.observe(wait, phase="queue")
+        TRANSCRIPTION_SECONDS.observe(finished - started, phase="inference")
+        with self._lock:
+            self._completed += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._total_run += finished - started
+        return text
+
+    def stats(self) -> dict[str, Any]:
+        """Return queue-depth and latency counters."""
+        with self._lock:
+            completed = self._completed
+            return {
+                "model": self.model_name,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "completed": completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_seconds": self._total_wait / completed if completed else 0.0,
+                "max_wait_seconds": self._max_wait,
+                "avg_transcribe_seconds": self._total_run / completed if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
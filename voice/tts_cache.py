@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import re
+import stat as stat_module
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+_FILENAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+# Partial files written by get_or_create: <key>.<pid>.<thread id>.tmp<extension>
+_TEMP_PATTERN = re.compile(r"^[0-9a-f]{64}\.\d+\.\d+\.tmp\.[a-z0-9]+$")
+# Partial files older than this were abandoned by a crashed process
+TEMP_GRACE_SECONDS = 3600.0
+
+
+@dataclass
+class _CacheEntry:
+    """Bookkeeping for one cached audio file."""
+
+    size: int
+    last_used: float
+
+
+class TTSCache:
+    """Content-addressed cache of synthesized speech with LRU disk eviction.
+
+    Files are named by a hash of (text, engine, voice, rate), so a repeated
+    phrase is served from disk instead of being synthesized again. The
+    directory is kept under ``max_bytes`` by evicting the least recently used
+    files, and files unused for ``max_age`` seconds are dropped. Access times
+    are mirrored in file mtimes, so the LRU order survives restarts.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600,
+        extension: str = ".mp3",
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.extension = extension
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_existing()
+
+    @staticmethod
+    def make_key(text: str, engine: str, voice: str, rate: int | None) -> str:
+        """Return the content hash identifying a synthesis request."""
+        payload = json.dumps([text, engine, voice, rate], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def filename_for(self, key: str) -> str:
+        """Return the file name used for a cache key."""
+        return f"{key}{self.extension}"
+
+    def path_for(self, filename: str) -> str | None:
+        """Return the on-disk path of a cached file, or None if it is not cached."""
+        if not _FILENAME_PATTERN.match(filename):
+            return None
+        key = filename[: -len(self.extension)]
+        with self._lock:
+            if key not in self._entries:
+                return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.exists(path) else None
+
+    def get_or_create(
+        self,
+        text: str,
+        engine: str,
+        voice: str,
+        rate: int | None,
+        synthesize: Callable[[str, str], Any],
+    ) -> str:
+        """Return the file name of the audio for text, synthesizing it on a miss.
+
+        ``synthesize(text, output_path)`` is only called once per key even when
+        several requests for the same phrase arrive together.
+        """
+        key = self.make_key(text, engine, voice, rate)
+        filename = self.filename_for(key)
+        if self._lookup(key):
+            return filename
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another request may have produced it while we waited
+            if self._lookup(key):
+                return filename
+
+            path = os.path.join(self.directory, filename)
+            # Keep the real extension last; some engines pick the format from it
+            tmp_path = os.path.join(
+                self.directory,
+                f"{key}.{os.getpid()}.{threading.get_ident()}.tmp{self.extension}",
+            )
+            try:
+                synthesize(text, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+            size = os.path.getsize(path)
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = _CacheEntry(size=size, last_used=time.time())
+                self._total_bytes += size
+                self._evict()
+
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return filename
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and disk usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _lookup(self, key: str) -> bool:
+        """Record a hit and refresh recency if key is cached and fresh."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            path = os.path.join(self.directory, self.filename_for(key))
+            now = time.time()
+            if now - entry.last_used > self.max_age or not os.path.exists(path):
+                self._remove(key)
+                return False
+            self._entries.move_to_end(key)
+            entry.last_used = now
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def _load_existing(self) -> None:
+        """Index files left by a previous run, oldest access first.
+
+        The directory may be shared with other processes, so their partial
+        files are only removed once they are clearly abandoned, and files
+        that vanish mid-scan are skipped.
+        """
+        files = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            is_temp = _TEMP_PATTERN.match(name) is not None
+            if not is_temp and (not _FILENAME_PATTERN.match(name) or not name.endswith(self.extension)):
+                continue
+            try:
+                stat = os.stat(path)
+                if not stat_module.S_ISREG(stat.st_mode):
+                    continue
+                if is_temp:
+                    if now - stat.st_mtime > TEMP_GRACE_SECONDS:
+                        os.unlink(path)
+                    continue
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[: -len(self.extension)], stat))
+
+        for _, key, stat in sorted(files):
+            self._entries[key] = _CacheEntry(size=stat.st_size, last_used=stat.st_mtime)
+            self._total_bytes += stat.st_size
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop stale files, then LRU files until under max_bytes. Caller holds _lock."""
+        cutoff = time.time() - self.max_age
+        for key in [k for k, entry in self._entries.items() if entry.last_used < cutoff]:
+            self._remove(key)
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        """Forget a cache entry and delete its file. Caller holds _lock."""
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        self.evictions += 1
+        try:
+            os.unlink(os.path.join(self.directory, self.filename_for(key)))
+        except FileNotFoundError:
+            pass
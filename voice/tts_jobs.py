@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .tts_cache import TTSCache
+
+
+@dataclass
+class _Job:
+    """One background synthesis and when it started and ended."""
+
+    future: Future
+    submitted: float
+    finished: float | None = None
+    error: str | None = None
+
+
+class TTSJobs:
+    """Synthesizes speech in the background so replies need not wait for their audio.
+
+    ``submit`` returns the audio's cache file name at once: files are named
+    by a hash of the request, so the name is known before synthesis starts.
+    At most ``workers`` jobs synthesize at a time and the same phrase is only
+    synthesized once, however often it is submitted. Finished jobs are kept
+    for ``retain`` seconds so their status and errors can still be read.
+    """
+
+    def __init__(
+        self,
+        cache: TTSCache,
+        synthesize: Callable[[str, str], Any],
+        workers: int = 2,
+        retain: float = 300.0,
+    ):
+        self.cache = cache
+        self.synthesize = synthesize
+        self.retain = retain
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self._jobs: dict[str, _Job] = {}
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, text: str, engine: str, voice: str, rate: int | None) -> str:
+        """Start synthesizing text unless it is cached or underway; return its file name."""
+        filename = self.cache.filename_for(self.cache.make_key(text, engine, voice, rate))
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(filename)
+            if job is not None and job.error is None:
+                return filename
+            if self.cache.path_for(filename) is not None:
+                return filename
+            future = self._executor.submit(
+                self.cache.get_or_create, text, engine, voice, rate, self.synthesize
+            )
+            job = _Job(future=future, submitted=time.monotonic())
+            self._jobs[filename] = job
+        # Outside the lock: the callback runs at once if the job already finished
+        future.add_done_callback(lambda _: self._finish(job))
+        return filename
+
+    async def wait(self, filename: str, timeout: float) -> str | None:
+        """Return the file's path once any job producing it is done, or None if unknown.
+
+        Raises the job's exception if synthesis failed and
+        ``asyncio.TimeoutError`` if it is still running after ``timeout``.
+        """
+        with self._lock:
+            job = self._jobs.get(filename)
+        if job is not None:
+            # Shielded so a timed-out request does not cancel the job for others
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+        return self.cache.path_for(filename)
+
+    def status(self, filename: str) -> dict[str, Any]:
+        """Report whether a file is queued, synthesizing, ready, failed or unknown."""
+        with self._lock:
+            job = self._jobs.get(filename)
+        if job is None:
+            return {"status": "ready" if self.cache.path_for(filename) else "unknown"}
+        if job.finished is None:
+            return {
+                "status": "running" if job.future.running() else "queued",
+                "elapsed_seconds": time.monotonic() - job.submitted,
+            }
+        if job.error is not None:
+            return {"status": "failed", "error": job.error}
+        return {"status": "ready", "synthesis_seconds": job.finished - job.submitted}
+
+    def stats(self) -> dict[str, Any]:
+        """Return counts of jobs by state."""
+        with self._lock:
+            pending = [job for job in self._jobs.values() if job.finished is None]
+            running = sum(1 for job in pending if job.future.running())
+            return {
+                "queued": len(pending) - running,
+                "running": running,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the workers, dropping jobs that have not started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job: _Job) -> None:
+        error = None if job.future.cancelled() else job.future.exception()
+        with self._lock:
+            job.finished = time.monotonic()
+            if job.future.cancelled() or error is not None:
+                job.error = str(error) if error is not None else "cancelled"
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def _prune(self) -> None:
+        """Forget jobs finished more than ``retain`` seconds ago. Caller holds _lock."""
+        cutoff = time.monotonic() - self.retain
+        for filename in [
+            name for name, job in self._jobs.items()
+            if job.finished is not None and job.finished < cutoff
+        ]:
+            del self._jobs[filename]